@@ -14,17 +14,42 @@ Usage
     # Build index from a custom docs dir and output location
     python create_vector_db.py --docs ./my_docs --index ./vector_store/my_index
 
-Two files will be produced at the *index* prefix location:
+    # Parse documents on 8 processes
+    python create_vector_db.py --workers 8
 
-* ``<index>.faiss``   – the FAISS index with L2-normalised embedding vectors
-* ``<index>.meta.pkl`` – pickled list[Clause] containing texts + metadata
+    # Approximate index for large corpora (IVF, 16 cells probed per query)
+    python create_vector_db.py --index-type ivf_flat --nprobe 16
+
+    # One clause per page / paragraph instead of ~200-token overlapping chunks
+    python create_vector_db.py --chunk-tokens 0
+
+Four files will be produced at the *index* prefix location:
+
+* ``<index>.faiss``         – the FAISS index with L2-normalised embedding vectors
+* ``<index>.clauses.jsonl`` – one JSON record (id, text, source) per clause
+* ``<index>.clauses.idx``   – byte offsets of each record, for lazy lookup by FAISS id
+* ``<index>.index.json``    – index type, search parameters (``nprobe`` / ``efSearch``) and chunking
+
+A ``<index>.manifest.json`` records the source files, so
+``python -m hackrx_llm ingest --incremental`` can later update the index in place.
+
+Clause embeddings are also cached in ``<index>.embcache.sqlite`` (keyed by model
+and text hash), so rebuilding after a small change only embeds new text. Pass
+``--no-embed-cache`` to disable it. Likewise the text extracted from each
+document is cached in ``<index>.textcache.sqlite`` by file content hash, so
+re-chunking experiments skip PDF parsing (``--no-text-cache`` disables it).
 """
 from __future__ import annotations
 
 import argparse
 from pathlib import Path
 
-from hackrx_llm.ingestion import ingest_dir
+from hackrx_llm.embeddings import get_model
+from hackrx_llm.indexes import INDEX_TYPES, IndexSpec
+from hackrx_llm.ingestion import ingest_files, iter_supported_files
+from hackrx_llm.ingestion.chunking import Chunker, model_token_counter
+from hackrx_llm.ingestion.manifest import Manifest
+from hackrx_llm.ingestion.text_cache import ExtractedTextCache
 from hackrx_llm.retriever import Retriever
 
 
@@ -32,12 +57,23 @@ DEFAULT_DOCS_DIR = Path("documents")  # relative to repo root
 DEFAULT_INDEX_PREFIX = Path("backend_index/store")  # will create parent dirs if missing
 
 
-def build_vector_db(docs_path: Path, index_prefix: Path):
+def build_vector_db(
+    docs_path: Path,
+    index_prefix: Path,
+    index_spec: IndexSpec | None = None,
+    embed_cache: bool = True,
+    workers: int = 1,
+    chunker: Chunker | None = None,
+    text_cache: bool = True,
+):
     """Ingest *docs_path* directory and save vector DB to *index_prefix*.
 
     The *index_prefix* is the path *without* extension. The function will
-    create ``<prefix>.faiss`` and ``<prefix>.meta.pkl`` under the same parent
-    directory.
+    create ``<prefix>.faiss``, ``<prefix>.clauses.*`` and ``<prefix>.index.json``
+    under the same parent directory, plus ``<prefix>.embcache.sqlite`` unless
+    *embed_cache* is false. Documents are parsed across *workers* processes and
+    split by *chunker* if given (its settings are recorded in the index descriptor).
+    Extracted text is reused from ``<prefix>.textcache.sqlite`` unless *text_cache* is false.
     """
 
     docs_path = docs_path.expanduser().resolve()
@@ -50,15 +86,23 @@ def build_vector_db(docs_path: Path, index_prefix: Path):
     index_prefix.parent.mkdir(parents=True, exist_ok=True)
 
     print(f"[1/3] Loading documents from {docs_path} …")
-    clauses = ingest_dir(docs_path)
+    files = list(iter_supported_files(docs_path))
+    texts = ExtractedTextCache(index_prefix.with_suffix(".textcache.sqlite")) if text_cache else None
+    clauses = ingest_files(files, workers=workers, chunker=chunker, text_cache=texts)
     print(f"    → Loaded {len(clauses)} clauses")
 
     print("[2/3] Building embeddings & FAISS index …")
-    retriever = Retriever()
+    cache_path = index_prefix.with_suffix(".embcache.sqlite") if embed_cache else None
+    index_spec = index_spec or IndexSpec()
+    index_spec.chunking = chunker.config() if chunker else None
+    retriever = Retriever(index_spec=index_spec, embedding_cache=cache_path)
     retriever.fit(clauses)
+    if retriever.embedding_cache is not None:
+        print(f"    → Reused {retriever.embedding_cache.hits} cached embeddings")
 
     print(f"[3/3] Saving index to {index_prefix}.* …")
     retriever.save(index_prefix)
+    Manifest.from_clauses(docs_path, files, clauses).save(index_prefix)
     print("✓ Vector database created successfully.")
 
 
@@ -76,12 +120,70 @@ def parse_args():
         default=DEFAULT_INDEX_PREFIX,
         help="Output index *prefix* (default: ./backend_index/store)",
     )
+    parser.add_argument(
+        "--index-type",
+        choices=INDEX_TYPES,
+        default="flat",
+        help="FAISS index type (default: flat, exact search)",
+    )
+    parser.add_argument("--nlist", type=int, default=None, help="IVF cells (default: derived from corpus size)")
+    parser.add_argument("--nprobe", type=int, default=8, help="IVF cells probed per query (default: 8)")
+    parser.add_argument("--ef-search", type=int, default=64, help="HNSW search beam width (default: 64)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Parallel document-parsing processes (default: 1)",
+    )
+    parser.add_argument(
+        "--chunk-tokens",
+        type=int,
+        default=0,
+        help="Max tokens per chunk, e.g. 200; 0 keeps one clause per page / paragraph (default: 0)",
+    )
+    parser.add_argument(
+        "--chunk-overlap",
+        type=int,
+        default=32,
+        help="Tokens repeated between consecutive chunks (default: 32)",
+    )
+    parser.add_argument(
+        "--no-embed-cache",
+        dest="embed_cache",
+        action="store_false",
+        help="Re-embed every clause instead of reusing <index>.embcache.sqlite",
+    )
+    parser.add_argument(
+        "--no-text-cache",
+        dest="text_cache",
+        action="store_false",
+        help="Re-parse every document instead of reusing <index>.textcache.sqlite",
+    )
     return parser.parse_args()
 
 
 def main():
     args = parse_args()
-    build_vector_db(args.docs, args.index)
+    spec = IndexSpec(
+        index_type=args.index_type,
+        nlist=args.nlist,
+        nprobe=args.nprobe,
+        ef_search=args.ef_search,
+    )
+    chunker = (
+        Chunker(args.chunk_tokens, args.chunk_overlap, token_counter=model_token_counter(get_model()))
+        if args.chunk_tokens
+        else None
+    )
+    build_vector_db(
+        args.docs,
+        args.index,
+        spec,
+        embed_cache=args.embed_cache,
+        workers=args.workers,
+        chunker=chunker,
+        text_cache=args.text_cache,
+    )
 
 
 if __name__ == "__main__":
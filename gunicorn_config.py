@@ -7,6 +7,8 @@ port = int(os.environ.get('PORT', 10000))
 bind = f'0.0.0.0:{port}'
 
 # Worker processes
+# The index is opened memory-mapped (INDEX_MMAP=1, the default), so every worker
+# shares one page-cache copy of the vectors and clause store.
 workers = 2  # Adjust based on your Render instance's CPU
 worker_class = 'gthread'
 threads = 4  # Adjust based on your application's I/O
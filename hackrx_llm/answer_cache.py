@@ -0,0 +1,161 @@
+"""Two-tier cache of generated answers for the webhook RAG chain.
+
+The same policy questions reach ``/hackrx/run`` over and over, and each one
+costs a retrieval plus an LLM call. :class:`AnswerCache` answers repeats:
+
+* **exact** – keyed by (document hash, normalised question, retrieved clause
+  ids, prompt version);
+* **semantic** – a differently worded question about the same document whose
+  query embedding has cosine similarity ≥ *threshold* with a cached one *and*
+  retrieved the same clauses (so the answer rests on the same evidence).
+
+The embeddings are the normalised MiniLM query vectors the retriever computes
+anyway. Entries expire after *ttl* seconds and the least recently used are
+evicted beyond *maxsize*.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .embeddings import normalize_query
+
+_Key = Tuple[str, str, Tuple[str, ...], str]
+
+
+class _Entry(NamedTuple):
+    created: float
+    vector: Optional[np.ndarray]
+    answer: str
+
+
+class AnswerCache:
+    """Thread-safe exact + semantic LRU of answers, with a TTL.
+
+    ``maxsize=0`` disables caching; ``threshold=None`` disables the semantic tier;
+    ``ttl=None`` keeps entries until evicted.
+    """
+
+    def __init__(
+        self,
+        prompt_version: str,
+        maxsize: int = 1024,
+        ttl: Optional[float] = 86400.0,
+        threshold: Optional[float] = 0.95,
+    ):
+        self.prompt_version = prompt_version
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.threshold = threshold
+        self._data: "OrderedDict[_Key, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(
+        self,
+        document: str,
+        question: str,
+        clause_ids: Sequence[str],
+        vector: Optional[np.ndarray] = None,
+    ) -> Optional[str]:
+        """Cached answer to *question* about *document*, or ``None``.
+
+        *clause_ids* are the clauses retrieved for it; *vector* is its
+        normalised query embedding (needed for the semantic tier).
+        """
+        if not self.enabled:
+            return None
+        key = self._key(document, question, clause_ids)
+        with self._lock:
+            self._expire()
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+                self.exact_hits += 1
+                return entry.answer
+            match = self._similar(key, vector) if vector is not None and self.threshold is not None else None
+            if match is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(match)
+            self.semantic_hits += 1
+            return self._data[match].answer
+
+    def put(
+        self,
+        document: str,
+        question: str,
+        clause_ids: Sequence[str],
+        answer: str,
+        vector: Optional[np.ndarray] = None,
+    ):
+        if not self.enabled:
+            return
+        key = self._key(document, question, clause_ids)
+        with self._lock:
+            self._data[key] = _Entry(time.monotonic(), vector, answer)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+    def _key(self, document: str, question: str, clause_ids: Sequence[str]) -> _Key:
+        return (document, normalize_query(question), tuple(clause_ids), self.prompt_version)
+
+    def _similar(self, key: _Key, vector: np.ndarray) -> Optional[_Key]:
+        """Most similar cached question with the same document, clauses and prompt."""
+        document, _, clause_ids, _ = key
+        evidence = frozenset(clause_ids)
+        best, best_score = None, self.threshold
+        for other, entry in self._data.items():
+            if entry.vector is None or other[0] != document or frozenset(other[2]) != evidence:
+                continue
+            score = float(np.dot(entry.vector, vector))
+            if score >= best_score:
+                best, best_score = other, score
+        return best
+
+    def _expire(self):
+        if self.ttl is None:
+            return
+        cutoff = time.monotonic() - self.ttl
+        # Entries are in LRU order, not creation order: scan them all
+        for key in [k for k, e in self._data.items() if e.created < cutoff]:
+            del self._data[key]
+            self.expirations += 1
@@ -0,0 +1,139 @@
+"""Cross-request micro-batching of retrieval queries.
+
+Each ``/api/ask`` request embeds a single query, which leaves most of the
+model's batched-matmul throughput unused when requests arrive concurrently.
+:class:`QueryBatcher` sits in front of
+:meth:`hackrx_llm.retriever.Retriever.retrieve_many`: a dispatcher thread
+collects queries arriving within *window* seconds of the first one (or until
+*max_batch* are waiting), embeds and searches them in one call, and hands each
+waiting request its own hits.
+
+Queries in a batch are searched with the largest ``top_k`` requested and each
+result is cut back to its own ``top_k``; queries with different
+``nprobe`` / ``ef_search`` overrides are searched separately.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from .retriever import Retriever
+from .schema import Clause
+
+logger = logging.getLogger(__name__)
+
+
+class _Pending(NamedTuple):
+    query: str
+    top_k: int
+    nprobe: Optional[int]
+    ef_search: Optional[int]
+    future: Future
+
+
+class QueryBatcher:
+    """Coalesce concurrent :meth:`retrieve` calls into batched searches of *retriever*."""
+
+    def __init__(self, retriever: Retriever, window: float = 0.003, max_batch: int = 32):
+        self.retriever = retriever
+        self.window = window
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker: Optional[threading.Thread] = None
+        self._batch_sizes: Counter = Counter()
+
+    # ------------------------------------------------------------------
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Clause]:
+        """Same as :meth:`Retriever.retrieve`, batched with concurrent callers."""
+        return [clause for clause, _ in self.retrieve_scored(query, top_k, nprobe, ef_search)]
+
+    def retrieve_scored(
+        self,
+        query: str,
+        top_k: int = 5,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Tuple[Clause, float]]:
+        """``(clause, score)`` hits for *query*; blocks until its batch has run."""
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put(_Pending(query, top_k, nprobe, ef_search, future))
+        return future.result()
+
+    def stats(self) -> Dict[str, object]:
+        """Batch count, query count and batch-size histogram (``{size: batches}``)."""
+        with self._lock:
+            sizes = dict(sorted(self._batch_sizes.items()))
+        batches = sum(sizes.values())
+        queries = sum(size * count for size, count in sizes.items())
+        return {
+            "batches": batches,
+            "queries": queries,
+            "mean_batch_size": queries / batches if batches else 0.0,
+            "batch_size_histogram": {str(size): count for size, count in sizes.items()},
+        }
+
+    # ------------------------------------------------------------------
+    # Dispatcher
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        # Started lazily: threads do not survive gunicorn's fork of the master
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop, name="query-batcher", daemon=True)
+                self._worker.start()
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._run(batch)
+            except Exception as exc:  # never let one batch kill the dispatcher
+                logger.exception("Query batch of %d failed", len(batch))
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(exc)
+
+    def _run(self, batch: List[_Pending]):
+        with self._lock:
+            self._batch_sizes[len(batch)] += 1
+        groups: Dict[Tuple[Optional[int], Optional[int]], List[_Pending]] = {}
+        for item in batch:
+            groups.setdefault((item.nprobe, item.ef_search), []).append(item)
+
+        for (nprobe, ef_search), items in groups.items():
+            try:
+                hits = self.retriever.retrieve_many(
+                    [item.query for item in items],
+                    top_k=max(item.top_k for item in items),
+                    nprobe=nprobe,
+                    ef_search=ef_search,
+                )
+            except Exception as exc:  # every caller in the group gets the error
+                logger.warning("Batched retrieval of %d queries failed: %s", len(items), exc)
+                for item in items:
+                    item.future.set_exception(exc)
+                continue
+            for item, item_hits in zip(items, hits):
+                item.future.set_result(item_hits[: item.top_k])
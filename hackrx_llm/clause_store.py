@@ -0,0 +1,197 @@
+"""Offset-indexed, lazily decoded clause storage.
+
+A store is two files next to the FAISS index:
+
+* ``<prefix>.clauses.jsonl`` – one UTF-8 JSON record (``id``, ``text``, ``source``) per line
+* ``<prefix>.clauses.idx``   – ``n + 1`` little-endian ``uint64`` byte offsets into the blob
+
+Stores are written incrementally with :class:`ClauseStoreWriter`, so building
+one never needs every clause in memory.
+
+Record *i* is ``blob[offsets[i]:offsets[i + 1]]``, so resolving a FAISS id to a
+:class:`~hackrx_llm.schema.Clause` touches only that record and opening a store
+costs the same regardless of corpus size. By default records are read on demand
+from an open file handle; with ``mmap=True`` both files are memory-mapped
+read-only and shared through the page cache by every process that maps them.
+"""
+from __future__ import annotations
+
+import json
+import mmap as _mmap
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Sequence, overload
+
+import numpy as np
+
+from .schema import Clause
+
+_BLOB_SUFFIX = ".clauses.jsonl"
+_OFFSETS_SUFFIX = ".clauses.idx"
+_OFFSET_DTYPE = np.dtype("<u8")
+
+
+@contextmanager
+def atomic_output(path: Path) -> Iterator[Path]:
+    """Yield a temporary sibling of *path* and move it into place on success.
+
+    Replacing (rather than truncating) keeps readers that still have the old
+    file memory-mapped valid.
+    """
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    finally:
+        if tmp.exists():
+            tmp.unlink()
+
+
+class _FileBlob:
+    """Slice-only view of a file that reads the requested byte range on demand."""
+
+    def __init__(self, path: Path):
+        self._fp = open(path, "rb")
+        self._lock = threading.Lock()
+
+    def __getitem__(self, span: slice) -> bytes:
+        with self._lock:
+            self._fp.seek(span.start)
+            return self._fp.read(span.stop - span.start)
+
+
+class ClauseStore(Sequence[Clause]):
+    """Read-only on-disk records plus an in-memory tail of appended clauses."""
+
+    def __init__(self, blob: bytes | _mmap.mmap | _FileBlob = b"", offsets: np.ndarray | None = None):
+        self._blob = blob
+        self._offsets = offsets if offsets is not None else np.zeros(1, dtype=_OFFSET_DTYPE)
+        self._tail: List[Clause] = []
+
+    # ------------------------------------------------------------------
+    @staticmethod
+    def exists(path: Path) -> bool:
+        return path.with_suffix(_BLOB_SUFFIX).exists() and path.with_suffix(_OFFSETS_SUFFIX).exists()
+
+    @staticmethod
+    def count(path: Path) -> int:
+        """Number of clauses in the store at *path* prefix, from its offsets file alone."""
+        return path.with_suffix(_OFFSETS_SUFFIX).stat().st_size // _OFFSET_DTYPE.itemsize - 1
+
+    @classmethod
+    def open(cls, path: Path, mmap: bool = False) -> "ClauseStore":
+        """Open the store at *path* prefix (``mmap=True`` maps both files read-only)."""
+        blob_path = path.with_suffix(_BLOB_SUFFIX)
+        offsets = np.memmap(path.with_suffix(_OFFSETS_SUFFIX), dtype=_OFFSET_DTYPE, mode="r")
+        if not mmap:
+            return cls(_FileBlob(blob_path), offsets)
+
+        blob: bytes | _mmap.mmap = b""
+        if blob_path.stat().st_size:
+            with open(blob_path, "rb") as fp:
+                blob = _mmap.mmap(fp.fileno(), 0, access=_mmap.ACCESS_READ)
+        return cls(blob, offsets)
+
+    @staticmethod
+    def write(path: Path, clauses: Iterable[Clause]) -> int:
+        """Stream *clauses* to the store at *path* prefix; return record count."""
+        with ClauseStoreWriter(path) as writer:
+            writer.extend(clauses)
+        return writer.count
+
+    # ------------------------------------------------------------------
+    # Sequence protocol
+    # ------------------------------------------------------------------
+    def __len__(self) -> int:
+        return self._n_stored + len(self._tail)
+
+    @overload
+    def __getitem__(self, i: int) -> Clause: ...
+
+    @overload
+    def __getitem__(self, i: slice) -> List[Clause]: ...
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("clause index out of range")
+        if i >= self._n_stored:
+            return self._tail[i - self._n_stored]
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        return Clause(**json.loads(self._blob[start:end]))
+
+    def __iter__(self) -> Iterator[Clause]:
+        for i in range(len(self)):
+            yield self[i]
+
+    # ------------------------------------------------------------------
+    def extend(self, clauses: Iterable[Clause]):
+        """Append *clauses* in memory (persisted on the next :meth:`write`)."""
+        self._tail.extend(clauses)
+
+    def extended(self, clauses: Iterable[Clause]) -> "ClauseStore":
+        """A new store over the same files with *clauses* appended; this one is unchanged."""
+        store = ClauseStore(self._blob, self._offsets)
+        store._tail = [*self._tail, *clauses]
+        return store
+
+    # ------------------------------------------------------------------
+    @property
+    def _n_stored(self) -> int:
+        return len(self._offsets) - 1
+
+
+class ClauseStoreWriter:
+    """Append clauses to a new store; files are moved into place on :meth:`commit`.
+
+    Used as a context manager it commits on success and discards the partial
+    files if the block raises.
+    """
+
+    def __init__(self, path: Path):
+        self._targets = (path.with_suffix(_BLOB_SUFFIX), path.with_suffix(_OFFSETS_SUFFIX))
+        self._tmps = tuple(t.with_name(f".{t.name}.{os.getpid()}.tmp") for t in self._targets)
+        self._blob = open(self._tmps[0], "wb")
+        self._offsets = open(self._tmps[1], "wb")
+        self._offsets.write(np.uint64(0).astype(_OFFSET_DTYPE).tobytes())
+        self.count = 0
+
+    def __enter__(self) -> "ClauseStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.abort()
+
+    def append(self, clause: Clause):
+        self._blob.write(_encode(clause))
+        self._offsets.write(np.uint64(self._blob.tell()).astype(_OFFSET_DTYPE).tobytes())
+        self.count += 1
+
+    def extend(self, clauses: Iterable[Clause]):
+        for clause in clauses:
+            self.append(clause)
+
+    def commit(self):
+        self._blob.close()
+        self._offsets.close()
+        for tmp, target in zip(self._tmps, self._targets):
+            os.replace(tmp, target)
+
+    def abort(self):
+        self._blob.close()
+        self._offsets.close()
+        for tmp in self._tmps:
+            tmp.unlink(missing_ok=True)
+
+
+def _encode(clause: Clause) -> bytes:
+    record = {"id": clause.id, "text": clause.text, "source": clause.source}
+    return json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n"
@@ -7,17 +7,36 @@ Build vector index from documents in *docs* folder::
 
     python -m hackrx_llm ingest --docs docs/ --index index/store
 
+Re-parse only files added, modified or deleted since the last build::
+
+    python -m hackrx_llm ingest --docs docs/ --index index/store --incremental
+
+Index a very large corpus in bounded memory (parse → embed → add, batch by batch)::
+
+    python -m hackrx_llm ingest --docs docs/ --index index/store --stream --workers 8
+
+Split pages into ~120-token windows overlapping by 24 tokens, counted with the
+embedding model's tokenizer (the default, ``--chunk-tokens 0``, keeps one clause
+per page / paragraph)::
+
+    python -m hackrx_llm ingest --docs docs/ --index index/store --chunk-tokens 120 --chunk-overlap 24
+
 Ask a question using an existing index::
 
     python -m hackrx_llm ask --query "46M knee surgery Pune 3-month policy" --index index/store --top-k 5
 
 If *--index* is not provided, *ask* will fallback to building an ephemeral
 index from *--docs*.
+
+Answer many queries (one per line) with a single batched retrieval::
+
+    python -m hackrx_llm ask-many --queries queries.txt --index index/store
 """
 from __future__ import annotations
 
 import json
 import sys
+from collections import Counter
 from pathlib import Path
 from typing import Optional
 
@@ -26,7 +45,12 @@ from rich import print
 from rich.progress import Progress
 
 from .decision_engine import evaluate
-from .ingestion import ingest_dir
+from .indexes import INDEX_TYPES, IndexSpec
+from .ingestion import ingest_dir, ingest_files, iter_clauses, iter_supported_files
+from .embeddings import get_model
+from .ingestion.chunking import Chunker, model_token_counter
+from .ingestion.manifest import Manifest, update_index
+from .ingestion.text_cache import ExtractedTextCache
 from .parser import parse_query
 from .retriever import Retriever
 
@@ -40,6 +64,22 @@ def _resolve_path(p: str | Path | None) -> Optional[Path]:
     return Path(p).expanduser().resolve() if p else None
 
 
+def _open_retriever(index: Optional[Path], docs: Optional[Path]) -> Retriever:
+    """Load *index* if present, else build an ephemeral index from *docs*."""
+
+    index = _resolve_path(index)
+    docs = _resolve_path(docs)
+
+    if index and index.with_suffix(".faiss").exists():
+        return Retriever(index_path=index)
+    if docs and docs.is_dir():
+        retr = Retriever()
+        retr.fit(ingest_dir(docs))
+        return retr
+    typer.echo("[red]Error: Provide either --index or --docs.", err=True)
+    raise typer.Exit(1)
+
+
 # ---------------------------------------------------------------------------
 # Commands
 # ---------------------------------------------------------------------------
@@ -51,23 +91,96 @@ def ingest(
         "index/store",
         help="Path *prefix* for output FAISS + metadata files (without extension).",
     ),
+    index_type: str = typer.Option("flat", help=f"FAISS index type: {', '.join(INDEX_TYPES)}"),
+    nlist: Optional[int] = typer.Option(None, help="IVF cells (default: derived from corpus size)"),
+    nprobe: int = typer.Option(8, help="Default IVF cells probed per query"),
+    ef_search: int = typer.Option(64, help="Default HNSW search beam width"),
+    embed_cache: bool = typer.Option(
+        True,
+        "--embed-cache/--no-embed-cache",
+        help="Reuse embeddings of previously seen clause text (<index>.embcache.sqlite)",
+    ),
+    text_cache: bool = typer.Option(
+        True,
+        "--text-cache/--no-text-cache",
+        help="Reuse text extracted from unchanged documents (<index>.textcache.sqlite)",
+    ),
+    incremental: bool = typer.Option(
+        False,
+        help="Update an existing index using <index>.manifest.json; only changed files are parsed",
+    ),
+    workers: int = typer.Option(1, min=1, help="Parallel document-parsing processes"),
+    stream: bool = typer.Option(
+        False,
+        help="Stream parse → embed → index in batches (bounded memory for very large corpora)",
+    ),
+    batch_size: int = typer.Option(256, min=1, help="Clauses per embedding batch with --stream"),
+    chunk_tokens: int = typer.Option(
+        0, min=0, help="Max tokens per chunk, e.g. 200 (0: one clause per page / paragraph)"
+    ),
+    chunk_overlap: int = typer.Option(32, min=0, help="Tokens repeated between consecutive chunks"),
 ):
     """Ingest *DOCS* directory, build vector index, and save to *INDEX*."""
 
     docs = docs.expanduser().resolve()
     index = index.expanduser().with_suffix("")  # strip ext if provided
+    index.parent.mkdir(parents=True, exist_ok=True)
+    cache_path = index.with_suffix(".embcache.sqlite") if embed_cache else None
+    texts = ExtractedTextCache(index.with_suffix(".textcache.sqlite")) if text_cache else None
+
+    manifest = Manifest.load(index) if incremental else None
+    if manifest is not None and index.with_suffix(".faiss").exists():
+        retr = Retriever(index_path=index, embedding_cache=cache_path)
+        changes = update_index(retr, docs, manifest, workers=workers, text_cache=texts)
+        if not changes.is_empty:
+            retr.save(index)
+        manifest.save(index)
+        print(
+            f"[bold green]✓ Index {index}.faiss updated: "
+            f"{len(changes.added)} added, {len(changes.modified)} modified, "
+            f"{len(changes.deleted)} deleted, {len(changes.unchanged)} unchanged"
+        )
+        return
+    if incremental:
+        print("[yellow]No manifest found for this index; doing a full build.")
+
+    chunker = Chunker(chunk_tokens, chunk_overlap, token_counter=model_token_counter(get_model())) if chunk_tokens else None
+    spec = IndexSpec(
+        index_type=index_type,
+        nlist=nlist,
+        nprobe=nprobe,
+        ef_search=ef_search,
+        chunking=chunker.config() if chunker else None,
+    )
+    if stream:
+        files = list(iter_supported_files(docs))
+        counts: Counter[str] = Counter()
+
+        def _counted(clauses):
+            for clause in clauses:
+                counts[clause.source] += 1
+                yield clause
+
+        retr = Retriever(index_spec=spec, embedding_cache=cache_path)
+        clauses = iter_clauses(files, workers=workers, chunker=chunker, text_cache=texts)
+        total = retr.build_stream(_counted(clauses), index, batch_size=batch_size)
+        Manifest.from_counts(docs, files, counts).save(index)
+        print(f"[bold green]✓ Streamed {total} clauses; index saved to {index}.faiss")
+        return
 
     with Progress() as progress:
         task = progress.add_task("[green]Loading documents…", start=False)
-        clauses = ingest_dir(docs)
+        files = list(iter_supported_files(docs))
+        clauses = ingest_files(files, workers=workers, chunker=chunker, text_cache=texts)
         progress.update(task, completed=1)
 
         progress.add_task("[cyan]Building embeddings…", start=False)
-        retr = Retriever()
+        retr = Retriever(index_spec=spec, embedding_cache=cache_path)
         retr.fit(clauses)
 
         progress.add_task("[magenta]Saving index…", start=False)
         retr.save(index)
+        Manifest.from_clauses(docs, files, clauses).save(index)
 
     print(f"[bold green]✓ Index saved to {index}.faiss")
 
@@ -76,33 +189,46 @@ def ingest(
 def ask(
     query: str = typer.Option(..., prompt="Your query", help="Natural language question"),
     docs: Optional[Path] = typer.Option(None, help="Docs directory (if no index)", exists=True),
-    index: Optional[Path] = typer.Option(None, help="Existing index prefix (.faiss + .meta.pkl)"),
+    index: Optional[Path] = typer.Option(None, help="Existing index prefix (.faiss + .clauses.*)"),
     top_k: int = typer.Option(5, help="Number of clauses to retrieve"),
+    nprobe: Optional[int] = typer.Option(None, help="Override IVF cells probed (IVF indexes only)"),
+    ef_search: Optional[int] = typer.Option(None, help="Override HNSW beam width (HNSW indexes only)"),
 ):
     """Answer *QUERY* using semantic search over documents or an existing index."""
 
-    index = _resolve_path(index)
-    docs = _resolve_path(docs)
-
-    retr = None
-    if index and index.with_suffix(".faiss").exists():
-        retr = Retriever(index_path=index)
-    elif docs and docs.is_dir():
-        clauses = ingest_dir(docs)
-        retr = Retriever()
-        retr.fit(clauses)
-    else:
-        typer.echo("[red]Error: Provide either --index or --docs.", err=True)
-        raise typer.Exit(1)
+    retr = _open_retriever(index, docs)
 
     # Process query
     q_struct = parse_query(query)
-    clauses = retr.retrieve(query, top_k=top_k)
+    clauses = retr.retrieve(query, top_k=top_k, nprobe=nprobe, ef_search=ef_search)
     decision = evaluate(q_struct, clauses)
     json_resp = decision.to_json(indent=2)
     print(json_resp)
 
 
+@app.command("ask-many")
+def ask_many(
+    queries: Path = typer.Option(..., exists=True, dir_okay=False, help="Text file with one query per line"),
+    docs: Optional[Path] = typer.Option(None, help="Docs directory (if no index)", exists=True),
+    index: Optional[Path] = typer.Option(None, help="Existing index prefix (.faiss + .clauses.*)"),
+    top_k: int = typer.Option(5, help="Number of clauses to retrieve per query"),
+    nprobe: Optional[int] = typer.Option(None, help="Override IVF cells probed (IVF indexes only)"),
+    ef_search: Optional[int] = typer.Option(None, help="Override HNSW beam width (HNSW indexes only)"),
+):
+    """Answer every line of *QUERIES* with one batched retrieval; prints a JSON list."""
+
+    lines = [line.strip() for line in queries.read_text(encoding="utf-8").splitlines()]
+    texts = [line for line in lines if line]
+    retr = _open_retriever(index, docs)
+
+    hits = retr.retrieve_many(texts, top_k=top_k, nprobe=nprobe, ef_search=ef_search)
+    results = [
+        evaluate(parse_query(text), [clause for clause, _ in query_hits]).model_dump(mode="json")
+        for text, query_hits in zip(texts, hits)
+    ]
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+
+
 @app.callback(invoke_without_command=True)
 def _main(ctx: typer.Context):  # noqa: D401
     """Entry point when called without subcommand."""
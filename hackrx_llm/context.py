@@ -0,0 +1,141 @@
+"""Token-budgeted assembly of the RAG prompt context.
+
+Joining the full text of every retrieved clause makes prompt size (and so LLM
+latency and cost) swing with page length. :class:`ContextBuilder` fits the
+context to ``max_tokens``:
+
+* clauses are split into sentences and repeated sentences are dropped (chunk
+  overlap and near-identical pages otherwise appear twice);
+* if the rest still does not fit, sentences sharing the most terms with the
+  question are kept first (ties go to higher-ranked clauses), the others are cut;
+* kept sentences are emitted in their original order, grouped per clause under
+  ``Document i:`` headers (the context layout of the webhook prompt).
+
+Tokens are counted with *tiktoken* when its encoding is available and with the
+offline estimate :func:`hackrx_llm.ingestion.chunking.approx_token_count`
+otherwise.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, Field
+
+from .ingestion.chunking import approx_token_count, split_sentences
+from .schema import Clause
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by do does for from has have how i if in is it its of on or the this to under "
+    "what when which who will with my me can any there their".split()
+)
+
+
+@lru_cache(maxsize=None)
+def get_token_counter(encoding: str = "cl100k_base") -> Callable[[str], int]:
+    """Token counter for *encoding*; falls back to an estimate if tiktoken cannot load it."""
+    try:
+        import tiktoken
+
+        enc = tiktoken.get_encoding(encoding)
+    except Exception as e:  # not installed, or the BPE file cannot be downloaded
+        logger.warning("tiktoken encoding %r unavailable (%s); estimating token counts", encoding, e)
+        return approx_token_count
+    return lambda text: len(enc.encode(text, disallowed_special=()))
+
+
+class Context(BaseModel):
+    """A prompt context and what went into it."""
+
+    text: str
+    tokens: int = Field(..., description="Tokens in text, by the builder's counter.")
+    clause_ids: List[str] = Field(..., description="Clauses with at least one sentence kept, in order.")
+    sentences: int = Field(..., description="Sentences kept.")
+    dropped: int = Field(0, description="Sentences dropped as duplicates or to fit the budget.")
+
+
+class ContextBuilder:
+    """Build prompt contexts of at most *max_tokens* tokens (``0`` disables the budget).
+
+    Tokens are counted with *token_counter*, by default the tiktoken *encoding*
+    (loaded on first use).
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 1500,
+        token_counter: Optional[Callable[[str], int]] = None,
+        encoding: str = "cl100k_base",
+    ):
+        self.max_tokens = max_tokens
+        self.encoding = encoding
+        self._token_counter = token_counter
+
+    @property
+    def token_counter(self) -> Callable[[str], int]:
+        return self._token_counter or get_token_counter(self.encoding)
+
+    def build(self, question: str, clauses: Sequence[Clause]) -> Context:
+        """Context for *question* from *clauses* (best first)."""
+        seen = set()
+        candidates: List[Tuple[int, int, str]] = []  # (clause rank, position, sentence)
+        n_sentences = 0
+        for rank, clause in enumerate(clauses):
+            for position, sentence in enumerate(split_sentences(clause.text)):
+                n_sentences += 1
+                key = " ".join(sentence.lower().split())
+                if key in seen:
+                    continue
+                seen.add(key)
+                candidates.append((rank, position, sentence))
+
+        count = self.token_counter
+        costs = {(r, p): count(s) + 1 for r, p, s in candidates}
+        headers = {rank: count(f"Document {rank + 1}:\n") + 2 for rank in range(len(clauses))}
+        total = sum(costs.values()) + sum(headers[r] for r in {r for r, _, _ in candidates})
+        if not self.max_tokens or total <= self.max_tokens:
+            kept = candidates
+        else:
+            kept = self._select(question, candidates, costs, headers)
+
+        by_clause: Dict[int, List[str]] = {}
+        for rank, _, sentence in sorted(kept):
+            by_clause.setdefault(rank, []).append(sentence)
+        text = "\n\n".join(
+            f"Document {i + 1}:\n{' '.join(sentences)}" for i, sentences in enumerate(by_clause.values())
+        )
+        return Context(
+            text=text,
+            tokens=count(text),
+            clause_ids=[clauses[rank].id for rank in by_clause],
+            sentences=len(kept),
+            dropped=n_sentences - len(kept),
+        )
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+    def _select(self, question, candidates, costs, headers) -> List[Tuple[int, int, str]]:
+        """Greedily keep the sentences most relevant to *question* within the budget."""
+        terms = _terms(question)
+        ranked = sorted(candidates, key=lambda c: (-len(terms & _terms(c[2])), c[0], c[1]))
+        budget = self.max_tokens
+        opened = set()
+        kept = []
+        for rank, position, sentence in ranked:
+            cost = costs[(rank, position)] + (0 if rank in opened else headers[rank])
+            if cost > budget:
+                continue
+            budget -= cost
+            opened.add(rank)
+            kept.append((rank, position, sentence))
+        return kept
+
+
+def _terms(text: str) -> set:
+    return {w for w in _WORD_RE.findall(text.lower()) if w not in _STOPWORDS}
@@ -0,0 +1,165 @@
+"""Append-only log of clauses added since an index was last saved in full.
+
+Rewriting ``<prefix>.faiss`` and the clause store after every upload costs time
+proportional to the whole corpus. Instead, new clauses and their (already
+normalised) vectors are appended to three files next to the index:
+
+* ``<prefix>.delta.json``  – header: ``base`` clause count it extends, vector ``dim``
+* ``<prefix>.delta.jsonl`` – one clause record per line (clause-store encoding)
+* ``<prefix>.delta.f32``   – the matching ``float32`` vectors, row after row
+
+so persisting an upload costs time proportional to the upload. Loading an index
+replays the log on top of it; :meth:`hackrx_llm.retriever.Retriever.save`
+*compacts* by writing a new base and deleting the log.
+
+A log whose ``base`` differs from the clause count of the index on disk was
+already folded into it (e.g. a crash between compaction and deletion) and is
+ignored. Vectors are written before clause records; a torn tail left by a crash
+is trimmed to the last complete pair.
+
+Several server processes may persist uploads to the same index. Writers hold
+:meth:`DeltaLog.locked` (an exclusive ``flock`` on ``<prefix>.delta.lock``) for
+the whole append / compaction sequence, and first read whatever the others
+appended or compacted since (:class:`IndexChangedError` if they cannot).
+"""
+from __future__ import annotations
+
+import json
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+from .clause_store import _encode, atomic_output
+from .schema import Clause
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, run a single writer process there
+    fcntl = None
+
+_HEADER_SUFFIX = ".delta.json"
+_CLAUSES_SUFFIX = ".delta.jsonl"
+_VECTORS_SUFFIX = ".delta.f32"
+_LOCK_SUFFIX = ".delta.lock"
+_VECTOR_DTYPE = np.dtype("<f4")
+
+
+class IndexChangedError(RuntimeError):
+    """The index on disk was changed by another process since this one loaded or saved it."""
+
+
+class DeltaLog:
+    """The delta files at index prefix *path*."""
+
+    def __init__(self, path: Path):
+        self.header_path = path.with_suffix(_HEADER_SUFFIX)
+        self.clauses_path = path.with_suffix(_CLAUSES_SUFFIX)
+        self.vectors_path = path.with_suffix(_VECTORS_SUFFIX)
+        self.lock_path = path.with_suffix(_LOCK_SUFFIX)
+
+    def exists(self) -> bool:
+        return self.header_path.exists()
+
+    @contextmanager
+    def locked(self) -> Iterator[None]:
+        """Hold the exclusive inter-process lock on this index's files (not re-entrant)."""
+        try:
+            fp = open(self.lock_path, "a")
+        except OSError:
+            # Read-only (or missing) index directory: no process can write the index either
+            yield
+            return
+        with fp:
+            if fcntl is not None:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
+
+    def count(self, base: int) -> int:
+        """Complete clauses logged on top of an index holding *base* clauses."""
+        header = self._header()
+        if header is None or header["base"] != base:
+            return 0
+        row_bytes = header["dim"] * _VECTOR_DTYPE.itemsize
+        n_vectors = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        return min(len(self._records()), n_vectors)
+
+    # ------------------------------------------------------------------
+    def append(self, clauses: Sequence[Clause], embeddings: np.ndarray, base: int):
+        """Append *clauses* and their *embeddings* to a log extending *base* clauses.
+
+        Starts a new log if there is none or the existing one extends a
+        different base.
+        """
+        if len(clauses) != len(embeddings):
+            raise ValueError("clauses and embeddings differ in length")
+        if not clauses:
+            return
+        dim = embeddings.shape[1]
+        header = self._header()
+        if header != {"base": base, "dim": dim}:
+            self.clear()
+            with atomic_output(self.header_path) as tmp:
+                tmp.write_text(json.dumps({"base": base, "dim": dim}))
+        self._trim(dim)
+
+        with open(self.vectors_path, "ab") as fp:
+            fp.write(np.ascontiguousarray(embeddings, dtype=_VECTOR_DTYPE).tobytes())
+            fp.flush()
+            os.fsync(fp.fileno())
+        with open(self.clauses_path, "ab") as fp:
+            fp.write(b"".join(_encode(c) for c in clauses))
+            fp.flush()
+            os.fsync(fp.fileno())
+
+    def read(self, base: int) -> Tuple[List[Clause], np.ndarray | None]:
+        """Clauses and vectors logged on top of an index holding *base* clauses.
+
+        Returns ``([], None)`` when there is no log or it belongs to another base.
+        """
+        header = self._header()
+        if header is None or header["base"] != base:
+            return [], None
+        records = self._records()
+        vectors = np.fromfile(self.vectors_path, dtype=_VECTOR_DTYPE) if self.vectors_path.exists() else np.zeros(0)
+        vectors = vectors[: len(vectors) - len(vectors) % header["dim"]].reshape(-1, header["dim"])
+        n = min(len(records), len(vectors))
+        clauses = [Clause(**json.loads(line)) for line in records[:n]]
+        return clauses, np.ascontiguousarray(vectors[:n])
+
+    def clear(self):
+        for path in (self.header_path, self.clauses_path, self.vectors_path):
+            path.unlink(missing_ok=True)
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+    def _header(self) -> dict | None:
+        if not self.header_path.exists():
+            return None
+        return json.loads(self.header_path.read_text())
+
+    def _records(self) -> List[bytes]:
+        if not self.clauses_path.exists():
+            return []
+        # The piece after the last newline is empty, or a torn write
+        return self.clauses_path.read_bytes().split(b"\n")[:-1]
+
+    def _trim(self, dim: int):
+        """Cut both files back to the last complete (vector, record) pair."""
+        records = self._records()
+        row_bytes = dim * _VECTOR_DTYPE.itemsize
+        n_vectors = self.vectors_path.stat().st_size // row_bytes if self.vectors_path.exists() else 0
+        n = min(len(records), n_vectors)
+        for path, size in (
+            (self.vectors_path, n * row_bytes),
+            (self.clauses_path, sum(len(r) + 1 for r in records[:n])),
+        ):
+            if path.exists() and path.stat().st_size != size:
+                os.truncate(path, size)
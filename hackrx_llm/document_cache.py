@@ -0,0 +1,148 @@
+"""Ready-built per-document indexes for the webhook, cached by URL and content.
+
+A ``/hackrx/run`` request names one policy document and asks questions about
+it. Downloading, parsing and embedding that document dominates the request, and
+the same documents are sent again and again. :class:`DocumentIndexCache` keeps
+the :class:`~hackrx_llm.retriever.Retriever` built for each document:
+
+* by URL – a URL fetched less than *ttl* seconds ago is served without
+  downloading it again;
+* by content hash – a stale URL (or a different URL) whose download turns out
+  to be a document already indexed reuses that index without parsing or
+  embedding.
+
+Documents that could not be indexed (unsupported type, no text) are remembered
+by content hash for *ttl* seconds too, so a repeat is rejected without parsing
+it again.
+
+Entries are evicted least recently used once more than *maxsize* documents are
+held.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from .retriever import Retriever
+
+
+class DocumentIndexCache:
+    """Thread-safe LRU of content hash → retriever, plus URL → content hash with a TTL.
+
+    ``maxsize=0`` disables caching; ``ttl=None`` trusts a URL until evicted.
+    """
+
+    def __init__(self, maxsize: int = 16, ttl: Optional[float] = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._indexes: "OrderedDict[str, Retriever]" = OrderedDict()
+        self._urls: Dict[str, Tuple[float, str]] = {}  # url -> (fetched at, content hash)
+        self._failures: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()  # hash -> (failed at, reason)
+        self._lock = threading.Lock()
+        self.hits = 0  # served by URL, no download
+        self.content_hits = 0  # downloaded, but already indexed
+        self.misses = 0
+        self.evictions = 0
+        self.failure_hits = 0  # downloaded, known not to be indexable
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, url: str) -> Optional[Tuple[str, Retriever]]:
+        """``(content hash, index)`` of *url* if it was fetched within the TTL, else ``None``."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._urls.get(url)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+                return None
+            retriever = self._touch(entry[1])
+            if retriever is None:
+                return None
+            self.hits += 1
+            return entry[1], retriever
+
+    def get_by_content(self, url: str, digest: str) -> Optional[Retriever]:
+        """Index of a document with content hash *digest*, just downloaded from *url*.
+
+        A hit re-validates *url* for another TTL period.
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            retriever = self._touch(digest)
+            if retriever is None:
+                self.misses += 1
+                return None
+            self._urls[url] = (time.monotonic(), digest)
+            self.content_hits += 1
+            return retriever
+
+    def put(self, url: str, digest: str, retriever: Retriever):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._indexes[digest] = retriever
+            self._indexes.move_to_end(digest)
+            self._urls[url] = (time.monotonic(), digest)
+            while len(self._indexes) > self.maxsize:
+                evicted, _ = self._indexes.popitem(last=False)
+                self._urls = {u: e for u, e in self._urls.items() if e[1] != evicted}
+                self.evictions += 1
+
+    def get_failure(self, digest: str) -> Optional[str]:
+        """Why the document with content hash *digest* could not be indexed, if that is known and recent."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._failures.get(digest)
+            if entry is None:
+                return None
+            if self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._failures[digest]
+                return None
+            self.failure_hits += 1
+            return entry[1]
+
+    def put_failure(self, digest: str, reason: str):
+        """Remember that the document with content hash *digest* cannot be indexed."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._failures[digest] = (time.monotonic(), reason)
+            self._failures.move_to_end(digest)
+            while len(self._failures) > self.maxsize:
+                self._failures.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+            self._urls.clear()
+            self._failures.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.content_hits + self.misses
+        return {
+            "size": len(self._indexes),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "content_hits": self.content_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "failures": len(self._failures),
+            "failure_hits": self.failure_hits,
+            "hit_rate": (self.hits + self.content_hits) / lookups if lookups else 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    def _touch(self, digest: str) -> Optional[Retriever]:
+        retriever = self._indexes.get(digest)
+        if retriever is not None:
+            self._indexes.move_to_end(digest)
+        return retriever
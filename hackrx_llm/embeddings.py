@@ -0,0 +1,200 @@
+"""Process-wide registry of *sentence-transformers* embedding models.
+
+Loading MiniLM costs seconds and tens of MB, so every
+:class:`hackrx_llm.retriever.Retriever` in a process shares one instance per
+``(model_name, device)`` via :func:`get_model`. Servers call :func:`warmup` at
+startup so the first request does not pay for the load and first forward pass.
+
+:class:`QueryEmbeddingCache` memoises query vectors so repeated questions skip
+the model forward pass entirely, and :class:`EmbeddingCache` persists clause
+vectors on disk by ``(model, sha256(text))`` so index rebuilds only embed new text.
+"""
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+from sentence_transformers import SentenceTransformer
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+
+_models: Dict[Tuple[str, Optional[str]], SentenceTransformer] = {}
+_lock = threading.Lock()
+
+
+def get_model(model_name: str = DEFAULT_MODEL_NAME, device: Optional[str] = None) -> SentenceTransformer:
+    """Return the shared model for *model_name* on *device*, loading it once."""
+
+    key = (model_name, device)
+    model = _models.get(key)
+    if model is None:
+        with _lock:
+            model = _models.get(key)
+            if model is None:
+                model = SentenceTransformer(model_name, device=device)
+                _models[key] = model
+    return model
+
+
+def warmup(model_name: str = DEFAULT_MODEL_NAME, device: Optional[str] = None) -> SentenceTransformer:
+    """Load the model and run one forward pass so lazy initialisation happens now."""
+
+    model = get_model(model_name, device)
+    model.encode(["warm-up"], convert_to_numpy=True, show_progress_bar=False)
+    return model
+
+
+def loaded_models() -> Tuple[Tuple[str, Optional[str]], ...]:
+    """Keys of the models currently held by the registry."""
+
+    return tuple(_models)
+
+
+# ---------------------------------------------------------------------------
+# Query embedding cache
+# ---------------------------------------------------------------------------
+
+
+def normalize_query(text: str) -> str:
+    """Cache key for *text*: case-folded with whitespace collapsed.
+
+    MiniLM's tokenizer lower-cases input, so this does not change the embedding.
+    """
+
+    return " ".join(text.lower().split())
+
+
+class QueryEmbeddingCache:
+    """Thread-safe LRU of normalised query text → embedding, with a TTL.
+
+    ``maxsize=0`` disables caching; ``ttl=None`` keeps entries until evicted.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = 3600.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    @property
+    def enabled(self) -> bool:
+        return self.maxsize > 0
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached vector for *key* (already normalised) or ``None``."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[0] > self.ttl:
+                del self._data[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: str, vector: np.ndarray):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), vector)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+# ---------------------------------------------------------------------------
+# Persistent clause embedding cache
+# ---------------------------------------------------------------------------
+
+
+def text_digest(text: str) -> bytes:
+    """Content address of *text* (SHA-256 of its UTF-8 bytes)."""
+
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """SQLite-backed store of normalised clause vectors keyed by model + text hash.
+
+    Safe to share between threads; one file can hold vectors for several models.
+    """
+
+    _BATCH = 500  # stay well below SQLite's bound-parameter limit
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL, digest BLOB NOT NULL, vector BLOB NOT NULL,"
+                " PRIMARY KEY (model, digest))"
+            )
+        self.hits = 0
+        self.misses = 0
+
+    def get_many(self, model_name: str, digests: Sequence[bytes]) -> Dict[bytes, np.ndarray]:
+        """Return the cached vectors among *digests* (missing ones are omitted)."""
+        found: Dict[bytes, np.ndarray] = {}
+        unique = list(dict.fromkeys(digests))
+        with self._lock:
+            for start in range(0, len(unique), self._BATCH):
+                chunk = unique[start:start + self._BATCH]
+                marks = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT digest, vector FROM embeddings WHERE model = ? AND digest IN ({marks})",
+                    [model_name, *chunk],
+                )
+                for digest, blob in rows:
+                    found[bytes(digest)] = np.frombuffer(blob, dtype="float32")
+        self.hits += len(found)
+        self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model_name: str, items: Iterable[Tuple[bytes, np.ndarray]]):
+        rows = [(model_name, digest, np.asarray(vec, dtype="float32").tobytes()) for digest, vec in items]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, digest, vector) VALUES (?, ?, ?)", rows
+            )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,266 @@
+"""Pooled, conditional HTTP fetching of documents for the webhook.
+
+:class:`DocumentFetcher` downloads through one :class:`requests.Session`, so
+connections to the same host are kept alive and reused across requests. Each
+download:
+
+* has a (connect, read) timeout and is streamed to disk, aborting once it
+  exceeds *max_bytes* (:class:`DocumentTooLarge`);
+* lands in a local blob cache: ``<cache_dir>/<content hash>_<name>`` plus a
+  ``<url key>.json`` record of ``ETag`` / ``Last-Modified`` and the content hash;
+* is revalidated on the next fetch of the same URL with ``If-None-Match`` /
+  ``If-Modified-Since``, so an unchanged document costs one ``304`` round-trip.
+
+The URL key leaves out signing parameters (Azure SAS ``sig`` / ``se`` / ...,
+S3 and GCS presigned ``X-Amz-*`` / ``X-Goog-*``), which change on every request
+for the same document. Blobs are named by content, so identical documents share
+one file, and the least recently used ones are deleted once the cache holds more
+than *max_cache_bytes*.
+
+:meth:`DocumentFetcher.fetch_many` fetches several URLs concurrently.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple, Union
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+import requests
+from pydantic import BaseModel, Field
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from werkzeug.utils import secure_filename
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 64 * 1024
+
+# Query parameters that sign or expire a URL rather than name a document
+_SIGNATURE_PARAMS = frozenset(
+    {"sig", "se", "st", "sv", "sp", "spr", "sr", "srt", "ss", "si", "skoid", "sktid", "skt", "ske", "sks", "skv"}
+    | {"signature", "expires", "awsaccesskeyid"}
+)
+_SIGNATURE_PREFIXES = ("x-amz-", "x-goog-")
+# Files this cache owns: blobs (key + "_" + name) and records (key + ".json")
+_BLOB_RE = re.compile(r"^[0-9a-f]{12,16}_.")
+_RECORD_RE = re.compile(r"^[0-9a-f]{12}\.json$")
+
+
+class DocumentTooLarge(ValueError):
+    """The response body exceeded the fetcher's ``max_bytes``."""
+
+
+class FetchResult(BaseModel):
+    """A fetched document in the blob cache."""
+
+    url: str
+    path: Path = Field(..., description="Local copy of the document.")
+    sha256: str = Field(..., description="Hex SHA-256 of the content.")
+    size: int
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    not_modified: bool = Field(False, description="True if the server answered 304 and the cached copy was used.")
+
+
+class DocumentFetcher:
+    """Download documents into *cache_dir* over a pooled, keep-alive session.
+
+    *timeout* is seconds (or a ``(connect, read)`` pair); *max_bytes* caps one
+    document; *max_workers* bounds :meth:`fetch_many` and the connection pool;
+    *max_cache_bytes* bounds the blob cache (``None``: unbounded). Eviction only
+    touches files named like the cache's own, so *cache_dir* may be shared.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Path,
+        timeout: Union[float, Tuple[float, float]] = (5.0, 30.0),
+        max_bytes: int = 100 * 1024 * 1024,
+        max_workers: int = 4,
+        retries: int = 2,
+        max_cache_bytes: Optional[int] = 1024 * 1024 * 1024,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_workers = max_workers
+        self.max_cache_bytes = max_cache_bytes
+        self._evict_lock = threading.Lock()
+        self.session = requests.Session()
+        retry = Retry(total=retries, backoff_factor=0.3, status_forcelist=(502, 503, 504), allowed_methods=("GET",))
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers, max_retries=retry)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    # ------------------------------------------------------------------
+    def fetch(self, url: str) -> FetchResult:
+        """Local copy of *url*, revalidating a cached copy instead of downloading it again."""
+        cached = self._cached(url)
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        with self.session.get(url, headers=headers, stream=True, timeout=self.timeout) as response:
+            if response.status_code == 304 and cached is not None:
+                logger.debug("%s not modified", url)
+                _touch(cached.path)
+                return cached.model_copy(update={"url": url, "not_modified": True})
+            response.raise_for_status()
+            tmp, digest, size = self._stream(response)
+            path = self.cache_dir / _blob_name(url, digest)
+            os.replace(tmp, path)
+            result = FetchResult(
+                url=url,
+                path=path,
+                sha256=digest,
+                size=size,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified"),
+            )
+        _replace_text(self._record_path(url), result.model_dump_json())
+        self._evict(keep=path)
+        return result
+
+    def fetch_many(self, urls: Sequence[str]) -> List[FetchResult]:
+        """:meth:`fetch` every URL in *urls* concurrently; results keep their order.
+
+        The first failure is raised once all fetches have finished.
+        """
+        if len(urls) <= 1:
+            return [self.fetch(url) for url in urls]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(urls))) as pool:
+            futures = [pool.submit(self.fetch, url) for url in urls]
+        return [future.result() for future in futures]
+
+    def download(self, url: str, save_path: Path) -> Path:
+        """Unconditionally download *url* to *save_path* (same limits, no blob cache)."""
+        with self.session.get(url, stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            tmp, _, _ = self._stream(response, Path(save_path).parent)
+        os.replace(tmp, save_path)
+        return save_path
+
+    def close(self):
+        self.session.close()
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+    def _stream(self, response: requests.Response, directory: Optional[Path] = None) -> Tuple[Path, str, int]:
+        """Write *response* to a temporary file in *directory* (default: the cache); return (path, sha256, size).
+
+        The caller moves the file into place; it is removed if the download fails.
+        """
+        declared = response.headers.get("Content-Length")
+        if declared and declared.isdigit() and int(declared) > self.max_bytes:
+            raise DocumentTooLarge(f"{response.url} is {declared} bytes (limit {self.max_bytes})")
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp = tempfile.mkstemp(dir=directory or self.cache_dir, prefix=".fetch.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fp:
+                for chunk in response.iter_content(chunk_size=_CHUNK_SIZE):
+                    size += len(chunk)
+                    if size > self.max_bytes:
+                        raise DocumentTooLarge(f"{response.url} exceeds {self.max_bytes} bytes")
+                    digest.update(chunk)
+                    fp.write(chunk)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return Path(tmp), digest.hexdigest(), size
+
+    def _evict(self, keep: Path):
+        """Delete least recently used blobs (never *keep*) until the cache fits *max_cache_bytes*.
+
+        Records left pointing at a deleted blob are deleted too.
+        """
+        if self.max_cache_bytes is None:
+            return
+        with self._evict_lock:
+            blobs = []
+            for path in self.cache_dir.iterdir():
+                if _BLOB_RE.match(path.name):
+                    try:
+                        st = path.stat()
+                    except FileNotFoundError:
+                        continue
+                    blobs.append((st.st_mtime_ns, st.st_size, path))
+            total = sum(size for _, size, _ in blobs)
+            if total <= self.max_cache_bytes:
+                return
+            for _, size, path in sorted(blobs, key=lambda b: b[0]):
+                if total <= self.max_cache_bytes:
+                    break
+                if path == keep:
+                    continue
+                path.unlink(missing_ok=True)
+                total -= size
+                logger.debug("Evicted %s from the fetch cache", path.name)
+            for record in self.cache_dir.iterdir():
+                if _RECORD_RE.match(record.name) and self._load_record(record) is None:
+                    record.unlink(missing_ok=True)
+
+    def _cached(self, url: str) -> Optional[FetchResult]:
+        return self._load_record(self._record_path(url))
+
+    @staticmethod
+    def _load_record(record: Path) -> Optional[FetchResult]:
+        """The record at *record*, or ``None`` if it is missing, unreadable or its blob is gone."""
+        try:
+            result = FetchResult(**json.loads(record.read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+        return result if result.path.exists() else None
+
+    def _record_path(self, url: str) -> Path:
+        return self.cache_dir / f"{_url_key(url)}.json"
+
+
+def _url_key(url: str) -> str:
+    """Cache key of *url*: its hash without signing parameters or fragment."""
+    parts = urlparse(url)
+    query = [
+        (name, value)
+        for name, value in parse_qsl(parts.query, keep_blank_values=True)
+        if name.lower() not in _SIGNATURE_PARAMS and not name.lower().startswith(_SIGNATURE_PREFIXES)
+    ]
+    unsigned = parts._replace(query=urlencode(query), fragment="").geturl()
+    return hashlib.sha1(unsigned.encode("utf-8")).hexdigest()[:12]
+
+
+def _blob_name(url: str, digest: str) -> str:
+    """Cache file name for content *digest* fetched from *url*: content key + the URL path's base name.
+
+    Keeping the extension lets the loader registry pick a loader.
+    """
+    name = secure_filename(Path(urlparse(url).path).name) or "document"
+    return f"{digest[:16]}_{name}"
+
+
+def _touch(path: Path):
+    """Mark *path* as just used (eviction is least recently used first)."""
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        pass
+
+
+def _replace_text(path: Path, text: str):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as fp:
+        fp.write(text)
+    os.replace(tmp, path)
@@ -0,0 +1,167 @@
+"""FAISS index construction and the persisted *index descriptor*.
+
+:class:`IndexSpec` describes which FAISS index a :class:`hackrx_llm.retriever.Retriever`
+builds (exact ``flat`` scan or one of the approximate IVF / HNSW variants), how it
+is trained and which recall knobs (``nprobe`` / ``efSearch``) apply at query time.
+
+FAISS does not serialise query-time parameters, so the spec is written next to
+the index as ``<prefix>.index.json`` and restored on load. It also records the
+chunker settings the clauses were produced with, so incremental updates and
+uploads split new documents the same way.
+
+IVF types need enough vectors to train their centroids (``nlist * 39``, and 256
+for 8-bit PQ codes). With fewer, :meth:`IndexSpec.build` returns an exact flat
+index instead; :meth:`IndexSpec.is_built` tells the two apart so callers can
+rebuild once the corpus has grown. A derived ``nlist`` is never written back to
+the spec, so every rebuild sizes it for the corpus at hand.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import math
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import faiss
+import numpy as np
+from pydantic import BaseModel, Field, validator
+
+from .clause_store import atomic_output
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw_flat")
+
+# FAISS k-means warns below ~39 training points per centroid.
+_MIN_POINTS_PER_CENTROID = 39
+
+
+class IndexSpec(BaseModel):
+    """Index type + build / search parameters (inner-product metric throughout)."""
+
+    index_type: str = Field("flat", description="One of: flat, ivf_flat, ivf_pq, hnsw_flat.")
+    dim: Optional[int] = Field(None, description="Embedding dimension (filled in on build).")
+
+    # IVF family
+    nlist: Optional[int] = Field(None, description="Number of IVF cells; derived from corpus size if unset.")
+    nprobe: int = Field(8, description="IVF cells visited per query (recall vs. latency).")
+    pq_m: int = Field(16, description="IVF-PQ sub-quantizers; must divide *dim*.")
+    pq_nbits: int = Field(8, description="Bits per IVF-PQ sub-quantizer code.")
+
+    # HNSW
+    hnsw_m: int = Field(32, description="HNSW graph degree.")
+    ef_construction: int = Field(40, description="HNSW build-time beam width.")
+    ef_search: int = Field(64, description="HNSW query-time beam width (recall vs. latency).")
+
+    train_size: int = Field(50_000, description="Max vectors sampled for IVF training.")
+
+    chunking: Optional[Dict[str, Any]] = Field(
+        None,
+        description="Chunker settings the clauses were split with (None: one clause per loader unit).",
+    )
+
+    @validator("index_type")
+    def _check_index_type(cls, v: str):  # noqa: N805
+        v = v.lower().replace("-", "_")
+        if v not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {v!r}; expected one of {', '.join(INDEX_TYPES)}")
+        return v
+
+    # ------------------------------------------------------------------
+    @property
+    def is_ivf(self) -> bool:
+        return self.index_type.startswith("ivf")
+
+    @property
+    def min_train_size(self) -> int:
+        """Vectors needed before this index type can be trained (0: no training)."""
+        if not self.is_ivf:
+            return 0
+        needed = (self.nlist or 1) * _MIN_POINTS_PER_CENTROID
+        if self.index_type == "ivf_pq":
+            needed = max(needed, 2 ** self.pq_nbits)
+        return needed
+
+    def is_built(self, index: faiss.Index) -> bool:
+        """False if *index* is the flat stand-in for an IVF index that could not be trained yet."""
+        return not self.is_ivf or faiss.try_extract_index_ivf(index) is not None
+
+    # ------------------------------------------------------------------
+    def build(self, embeddings: np.ndarray) -> faiss.Index:
+        """Create (and train, if required) an empty index sized for *embeddings*.
+
+        The vectors are only used for training; callers still ``add`` them.
+        The spec itself is not modified. IVF types get a flat index while
+        *embeddings* are fewer than :attr:`min_train_size`.
+        """
+        n, dim = embeddings.shape
+        metric = faiss.METRIC_INNER_PRODUCT
+
+        if self.index_type == "flat":
+            return faiss.IndexFlatIP(dim)
+
+        if self.index_type == "hnsw_flat":
+            index = faiss.IndexHNSWFlat(dim, self.hnsw_m, metric)
+            index.hnsw.efConstruction = self.ef_construction
+            index.hnsw.efSearch = self.ef_search
+            return index
+
+        if self.index_type == "ivf_pq" and dim % self.pq_m:
+            raise ValueError(f"pq_m={self.pq_m} must divide embedding dim {dim}")
+        if n < self.min_train_size:
+            logger.info(
+                "%d vectors are too few to train %s (need %d); using a flat index for now",
+                n, self.index_type, self.min_train_size,
+            )
+            return faiss.IndexFlatIP(dim)
+
+        nlist = self._resolve_nlist(n)
+        quantizer = faiss.IndexFlatIP(dim)
+        if self.index_type == "ivf_flat":
+            index = faiss.IndexIVFFlat(quantizer, dim, nlist, metric)
+        else:
+            index = faiss.IndexIVFPQ(quantizer, dim, nlist, self.pq_m, self.pq_nbits, metric)
+        index.train(self._training_sample(embeddings))
+        index.nprobe = min(self.nprobe, nlist)
+        return index
+
+    def search_params(self, nprobe: int | None = None, ef_search: int | None = None):
+        """Return per-query :class:`faiss.SearchParameters` (``None`` for flat)."""
+        if self.is_ivf:
+            return faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe)
+        if self.index_type == "hnsw_flat":
+            return faiss.SearchParametersHNSW(efSearch=ef_search or self.ef_search)
+        return None
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+    def save(self, path: Path):
+        """Write descriptor to ``<path>.index.json``."""
+        with atomic_output(path.with_suffix(".index.json")) as tmp:
+            tmp.write_text(json.dumps(self.model_dump(), indent=2))
+
+    @classmethod
+    def load(cls, path: Path) -> "IndexSpec":
+        """Read ``<path>.index.json``; indexes saved before descriptors existed are flat."""
+        desc = path.with_suffix(".index.json")
+        if not desc.exists():
+            return cls()
+        return cls(**json.loads(desc.read_text()))
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+    def _resolve_nlist(self, n: int) -> int:
+        """IVF cells for *n* training vectors: the configured ``nlist``, or one derived from *n*."""
+        if self.nlist:
+            return self.nlist
+        return max(1, min(4 * int(math.sqrt(n)), n // _MIN_POINTS_PER_CENTROID))
+
+    def _training_sample(self, embeddings: np.ndarray) -> np.ndarray:
+        if len(embeddings) <= self.train_size:
+            return embeddings
+        rng = np.random.default_rng(0)
+        rows = np.sort(rng.choice(len(embeddings), self.train_size, replace=False))
+        return np.ascontiguousarray(embeddings[rows])
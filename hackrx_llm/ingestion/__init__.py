@@ -4,66 +4,232 @@ Each loader returns an iterator of tuples ``(text, metadata)`` where:
 - *text*   – extracted plain-text str.
 - *metadata* – dict with keys such as *source*, *page*, *chunk_id* …
 
-Use :func:`ingest_dir` to recursively load supported documents from a directory.
+Use :func:`ingest_dir` to recursively load supported documents from a directory,
+or :func:`iter_clauses` to stream them with bounded memory. Pass a
+:class:`~hackrx_llm.ingestion.chunking.Chunker` to split loader output into
+token-bounded, overlapping chunks, and an
+:class:`~hackrx_llm.ingestion.text_cache.ExtractedTextCache` to skip re-parsing
+files whose content has not changed.
+:mod:`hackrx_llm.ingestion.manifest` tracks which files an index was built from
+so later runs only re-parse what changed.
 """
 from __future__ import annotations
 
 import itertools
+import logging
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from importlib.metadata import entry_points
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple, Type
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Type
 
 from ..schema import Clause
+from .chunking import Chunker
+from .text_cache import ExtractedTextCache, file_sha256
+
+try:  # needs the libmagic system library
+    import magic
+except ImportError:  # pragma: no cover
+    magic = None
+
+logger = logging.getLogger(__name__)
 
 
 class BaseLoader:
     """Abstract base-class for document loaders."""
 
     extensions: List[str] = []  # override in subclasses
+    mime_types: List[str] = []  # used for files without an extension
 
-    def __init__(self, path: Path):
+    # Identifies the extraction code + library versions; loaders that set it
+    # have their output cached by ExtractedTextCache (bump it when load() changes)
+    extractor_version: Optional[str] = None
+
+    def __init__(
+        self,
+        path: Path,
+        chunker: Optional[Chunker] = None,
+        text_cache: Optional[ExtractedTextCache] = None,
+    ):
         self.path = path
+        self.chunker = chunker
+        self.text_cache = text_cache
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Only loaders that declare formats themselves; a subclass inheriting
+        # PDFLoader's extensions must not silently take over *.pdf
+        if "extensions" in cls.__dict__ or "mime_types" in cls.__dict__:
+            register_loader(cls)
 
     def __iter__(self):
-        yield from self.load()
+        units = self._units()
+        if self.chunker is None:
+            yield from units
+            return
+        for text, meta in units:
+            for n, chunk in enumerate(self.chunker.split(text)):
+                yield chunk, {**meta, "chunk": n}
 
     # ---------------------------------------------------------------------
     def load(self) -> Iterable[Tuple[str, Dict]]:  # noqa: D401
         """Yield ``(text, metadata)`` for each chunk."""
         raise NotImplementedError
 
+    def _units(self) -> Iterator[Tuple[str, Dict]]:
+        """:meth:`load` output, replayed from / recorded into the text cache if any."""
+        if self.text_cache is None or self.extractor_version is None:
+            yield from self.load()
+            return
+        digest = file_sha256(self.path)
+        cached = self.text_cache.get(digest, self.extractor_version)
+        if cached is not None:
+            yield from cached
+            return
+        units = []
+        for unit in self.load():
+            units.append(unit)
+            yield unit
+        self.text_cache.put(digest, self.extractor_version, units)
+
 
 # -------------------------------------------------------------------------
-# Loader registry helpers
+# Loader registry
 # -------------------------------------------------------------------------
 
+# Extension (lower-case, no dot) / MIME type → loader; later registrations win
+_BY_EXTENSION: Dict[str, Type[BaseLoader]] = {}
+_BY_MIME: Dict[str, Type[BaseLoader]] = {}
+
+PLUGIN_GROUP = "hackrx_llm.loaders"
+_plugins_loaded = False
+
+
+def register_loader(loader_cls: Type[BaseLoader]) -> Type[BaseLoader]:
+    """Route the extensions and MIME types *loader_cls* declares to it.
 
-def _iter_subclasses(cls):
-    for sub in cls.__subclasses__():
-        yield sub
-        yield from _iter_subclasses(sub)
+    Subclasses of :class:`BaseLoader` register themselves when defined; this is
+    also usable as a class decorator. Returns *loader_cls*.
+    """
+    for ext in loader_cls.extensions:
+        _BY_EXTENSION[ext.lower().lstrip(".")] = loader_cls
+    for mime in loader_cls.mime_types:
+        _BY_MIME[mime.lower()] = loader_cls
+    return loader_cls
+
+
+def load_plugins():
+    """Import loaders advertised under the ``hackrx_llm.loaders`` entry-point group.
+
+    Runs once, on the first lookup. A third-party package registers a loader with::
+
+        [project.entry-points."hackrx_llm.loaders"]
+        pptx = "my_package.loaders:PPTXLoader"
+    """
+    global _plugins_loaded
+    if _plugins_loaded:
+        return
+    _plugins_loaded = True
+    for ep in entry_points(group=PLUGIN_GROUP):
+        try:
+            loader_cls = ep.load()
+        except Exception as exc:
+            logger.warning("Skipping loader plugin %s: %s", ep.name, exc)
+            continue
+        if isinstance(loader_cls, type) and issubclass(loader_cls, BaseLoader):
+            register_loader(loader_cls)
+        else:
+            logger.warning("Skipping loader plugin %s: %r is not a BaseLoader subclass", ep.name, loader_cls)
 
 
 def get_loader_for(path: Path) -> Type[BaseLoader] | None:
-    ext = path.suffix.lower().lstrip(".")
-    for loader_cls in _iter_subclasses(BaseLoader):
-        if ext in loader_cls.extensions:
-            return loader_cls
-    return None
+    """Loader for *path* by extension; extensionless files are MIME-sniffed."""
+    load_plugins()
+    if path.suffix:
+        return _BY_EXTENSION.get(path.suffix.lower().lstrip("."))
+    if magic is None or not path.is_file():
+        return None
+    try:
+        mime = magic.from_file(str(path), mime=True)
+    except Exception as exc:  # unreadable file, libmagic error
+        logger.debug("MIME sniffing failed for %s: %s", path, exc)
+        return None
+    return _BY_MIME.get(mime.lower())
+
+
+def iter_supported_files(dir_path: Path) -> Iterator[Path]:
+    """Yield files under *dir_path* that have a loader, in sorted (stable) order."""
+    for file in sorted(dir_path.rglob("*")):
+        # Dict lookup first: unsupported files are skipped without a stat
+        if get_loader_for(file) and file.is_file():
+            yield file
 
 
-def ingest_dir(dir_path: Path) -> List[Clause]:
+def iter_clauses(
+    files: Iterable[Path],
+    workers: int = 1,
+    chunker: Optional[Chunker] = None,
+    text_cache: Optional[ExtractedTextCache] = None,
+) -> Iterator[Clause]:
+    """Lazily yield Clause objects for *files* (all supported), in the given order.
+
+    With ``workers > 1`` files are parsed in a process pool. At most
+    ``2 * workers`` files are in flight ahead of the consumer, so a slow
+    consumer (e.g. embedding) throttles parsing instead of buffering output.
+    Results are yielded in input order, so clause order and ids do not depend
+    on *workers*.
+    """
+    if workers <= 1:
+        for file in files:
+            yield from _to_clauses(file, _load_texts(file, chunker, text_cache))
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending: deque = deque()
+        for file in files:
+            pending.append((file, pool.submit(_load_texts, file, chunker, text_cache)))
+            if len(pending) >= 2 * workers:
+                done_file, future = pending.popleft()
+                yield from _to_clauses(done_file, future.result())
+        while pending:
+            done_file, future = pending.popleft()
+            yield from _to_clauses(done_file, future.result())
+
+
+def ingest_files(
+    files: Iterable[Path],
+    workers: int = 1,
+    chunker: Optional[Chunker] = None,
+    text_cache: Optional[ExtractedTextCache] = None,
+) -> List[Clause]:
+    """Load *files* (all supported) into Clause objects, in the given order.
+
+    See :func:`iter_clauses` for how *workers* is used.
+    """
+    return list(iter_clauses(files, workers=workers, chunker=chunker, text_cache=text_cache))
+
+
+def ingest_dir(
+    dir_path: Path,
+    workers: int = 1,
+    chunker: Optional[Chunker] = None,
+    text_cache: Optional[ExtractedTextCache] = None,
+) -> List[Clause]:
     """Load **all** supported files in *dir_path* into Clause objects."""
-    clauses: List[Clause] = []
-    for file in dir_path.rglob("*"):
-        if not file.is_file():
-            continue
-        loader_cls = get_loader_for(file)
-        if not loader_cls:
-            continue
-        for idx, (text, meta) in enumerate(loader_cls(file)):
-            clause_id = f"{file.name}:{idx}"
-            clauses.append(Clause(id=clause_id, text=text, source=str(file)))
-    return clauses
+    return ingest_files(iter_supported_files(dir_path), workers=workers, chunker=chunker, text_cache=text_cache)
+
+
+def _load_texts(
+    file: Path, chunker: Optional[Chunker] = None, text_cache: Optional[ExtractedTextCache] = None
+) -> List[str]:
+    # Module-level so it can be pickled into pool workers
+    return [text for text, _meta in get_loader_for(file)(file, chunker, text_cache)]
+
+
+def _to_clauses(file: Path, texts: List[str]) -> Iterator[Clause]:
+    for idx, text in enumerate(texts):
+        clause_id = f"{file.name}:{idx}"
+        yield Clause(id=clause_id, text=text, source=str(file))
 
 # -------------------------------------------------------------------------
 # Loader module imports (deferred to avoid circular import)
@@ -76,14 +242,16 @@ from .email_loader import EmailLoader  # noqa: F401
 # Single-file helper
 # -------------------------------------------------------------------------
 
-def ingest_file(file_path: Path) -> List[Clause]:
+def ingest_file(
+    file_path: Path, chunker: Optional[Chunker] = None, text_cache: Optional[ExtractedTextCache] = None
+) -> List[Clause]:
     """Ingest a **single** file and return a list of :class:`Clause`."""
 
     loader_cls = get_loader_for(file_path)
     if not loader_cls:
         raise ValueError(f"Unsupported file type: {file_path.suffix}")
     clauses: List[Clause] = []
-    for idx, (text, meta) in enumerate(loader_cls(file_path)):
+    for idx, (text, meta) in enumerate(loader_cls(file_path, chunker, text_cache)):
         clause_id = f"{file_path.name}:{idx}"
         clauses.append(Clause(id=clause_id, text=text, source=str(file_path)))
     return clauses
@@ -0,0 +1,186 @@
+"""Token-aware text chunking shared by all loaders.
+
+MiniLM only embeds the first 256 word-pieces of its input, so a whole policy
+page mostly goes unseen. :class:`Chunker` splits each loader unit (page,
+paragraph, e-mail body) into windows of at most ``max_tokens`` tokens:
+
+* headings (numbered clauses, ``SECTION …``, all-caps lines) start a new chunk,
+  unless the current one is still tiny (under 1/8 of the budget);
+* chunks are packed from whole sentences where possible;
+* the last ``overlap`` tokens of sentences are repeated at the start of the next
+  chunk, so a clause cut at a boundary is still retrievable from either side.
+
+Tokens are counted with the embedding model's own tokenizer when the caller
+passes :func:`model_token_counter` (every index build and upload does), so a
+chunk never exceeds the window for number- or symbol-heavy text. Without it the
+count is a fast word-piece estimate (:func:`approx_token_count`) and the default
+budget leaves headroom below the model limit for estimation error.
+"""
+from __future__ import annotations
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+
+_TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?;:])\s+(?=[\"'“(\[]?[A-Z0-9])")
+_HEADING_RE = re.compile(
+    r"""^(
+        (SECTION|PART|CHAPTER|ANNEXURE|SCHEDULE)\b.*     # SECTION B) DEFINITIONS
+      | \d{1,2}(\.\d{1,2})*[.)]\s+\S.{0,80}             # 1. Accident:-   /  2.3) Waiting period
+      | [A-Z][A-Z0-9 ,&/()\-]{3,80}                     # GENERAL EXCLUSIONS
+    )$""",
+    re.X,
+)
+
+# Words longer than this are assumed to split into several word-pieces
+_CHARS_PER_PIECE = 6
+
+
+def approx_token_count(text: str) -> int:
+    """Estimate BERT word-piece count: one per punctuation mark, ~6 chars per piece."""
+    return sum(max(1, -(-len(tok) // _CHARS_PER_PIECE)) for tok in _TOKEN_RE.findall(text))
+
+
+class TokenizerCounter:
+    """Exact word-piece count with a Hugging Face *tokenizer* (picklable, so parse workers can use it)."""
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+
+    def __call__(self, text: str) -> int:
+        return len(self.tokenizer.tokenize(text))
+
+
+def model_token_counter(model) -> Callable[[str], int]:
+    """Token counter for an embedding *model*: its tokenizer, or :func:`approx_token_count` if it has none."""
+    tokenizer = getattr(model, "tokenizer", None)
+    return TokenizerCounter(tokenizer) if tokenizer is not None else approx_token_count
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split *text* into sentences (line breaks are treated as spaces)."""
+    return [s.strip() for s in _SENTENCE_END_RE.split(" ".join(text.split())) if s.strip()]
+
+
+class Chunker:
+    """Split text into overlapping, heading- and sentence-aligned token windows."""
+
+    def __init__(
+        self,
+        max_tokens: int = 200,
+        overlap: int = 32,
+        respect_headings: bool = True,
+        token_counter: Callable[[str], int] = approx_token_count,
+    ):
+        if max_tokens <= 0:
+            raise ValueError("max_tokens must be positive")
+        if not 0 <= overlap < max_tokens:
+            raise ValueError("overlap must be in [0, max_tokens)")
+        self.max_tokens = max_tokens
+        self.overlap = overlap
+        self.respect_headings = respect_headings
+        self.token_counter = token_counter
+
+    # ------------------------------------------------------------------
+    def config(self) -> Dict[str, object]:
+        """Settings recorded in the index descriptor (see :class:`hackrx_llm.indexes.IndexSpec`)."""
+        return {
+            "max_tokens": self.max_tokens,
+            "overlap": self.overlap,
+            "respect_headings": self.respect_headings,
+        }
+
+    @classmethod
+    def from_config(
+        cls,
+        config: Optional[Dict[str, object]],
+        token_counter: Callable[[str], int] = approx_token_count,
+    ) -> "Chunker | None":
+        """Inverse of :meth:`config`; ``None`` means the index was built unchunked."""
+        return cls(**config, token_counter=token_counter) if config else None
+
+    # ------------------------------------------------------------------
+    def split(self, text: str) -> List[str]:
+        """Return the chunks of *text* (empty list for blank input)."""
+        chunks: List[str] = []
+        current: List[Tuple[str, int]] = []  # (sentence, tokens)
+        size = 0
+
+        def flush(carry: bool):
+            nonlocal current, size
+            if current:
+                chunks.append(" ".join(s for s, _ in current))
+            kept: List[Tuple[str, int]] = []
+            if carry and self.overlap:
+                budget = self.overlap
+                for sentence, n in reversed(current):
+                    if n > budget:
+                        break
+                    kept.insert(0, (sentence, n))
+                    budget -= n
+            current, size = kept, sum(n for _, n in kept)
+
+        for sentence, starts_section in self._sentences(text):
+            n = self.token_counter(sentence)
+            if starts_section and size >= self.max_tokens // 8:
+                flush(carry=False)
+            if n > self.max_tokens:
+                flush(carry=False)
+                chunks.extend(self._split_long(sentence))
+                continue
+            if size + n > self.max_tokens:
+                flush(carry=True)
+                if size + n > self.max_tokens:  # carried overlap + sentence still too big
+                    current, size = [], 0
+            current.append((sentence, n))
+            size += n
+        flush(carry=False)
+        return chunks
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+    def _sentences(self, text: str):
+        """Yield ``(sentence, starts_section)``; wrapped lines are re-joined first."""
+        paragraph: List[str] = []
+        heading_pending = False
+
+        def emit():
+            joined = " ".join(paragraph)
+            for i, sentence in enumerate(_SENTENCE_END_RE.split(joined)):
+                if sentence.strip():
+                    yield sentence.strip(), heading_pending and i == 0
+
+        for raw in text.splitlines():
+            line = raw.strip()
+            is_heading = self.respect_headings and bool(line) and bool(_HEADING_RE.match(line))
+            if not line or is_heading:
+                yield from emit()
+                paragraph, heading_pending = [], is_heading
+            if line:
+                paragraph.append(line)
+        yield from emit()
+
+    def _split_long(self, sentence: str) -> List[str]:
+        """Hard-wrap an over-long sentence into overlapping word windows."""
+        words = sentence.split()
+        windows: List[str] = []
+        start = 0
+        while start < len(words):
+            end, size = start, 0
+            while end < len(words):
+                n = self.token_counter(words[end])
+                if size + n > self.max_tokens and end > start:
+                    break
+                size += n
+                end += 1
+            windows.append(" ".join(words[start:end]))
+            if end >= len(words):
+                break
+            # Step back so the next window starts ~overlap tokens earlier
+            back, budget = end, self.overlap
+            while back > start + 1 and budget - self.token_counter(words[back - 1]) >= 0:
+                budget -= self.token_counter(words[back - 1])
+                back -= 1
+            start = back
+        return windows
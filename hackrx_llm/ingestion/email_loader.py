@@ -14,6 +14,7 @@ class EmailLoader(BaseLoader):
     """Load plain-text body from .eml files (skip attachments)."""
 
     extensions = ["eml"]
+    mime_types = ["message/rfc822"]
 
     # ------------------------------------------------------------------
     def load(self) -> Iterable[Tuple[str, Dict]]:  # noqa: D401
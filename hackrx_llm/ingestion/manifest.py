@@ -0,0 +1,206 @@
+"""Source-file manifest enabling incremental index updates.
+
+The manifest (``<index>.manifest.json``) records, for every file an index was
+built from, its fingerprint (mtime, size, SHA-256) and the contiguous range of
+clause positions it produced. :func:`update_index` compares the manifest with
+the documents directory, removes clauses of deleted or modified files and
+parses only added or modified ones.
+"""
+from __future__ import annotations
+
+import json
+from bisect import bisect_left
+from itertools import groupby
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Sequence
+
+from pydantic import BaseModel, Field
+
+from ..schema import Clause
+from . import ingest_files, iter_supported_files
+from .chunking import Chunker, model_token_counter
+from .text_cache import ExtractedTextCache, file_sha256
+
+if TYPE_CHECKING:  # pragma: no cover
+    from ..retriever import Retriever
+
+_SUFFIX = ".manifest.json"
+
+
+class FileEntry(BaseModel):
+    """Fingerprint of one source file plus the clause positions it occupies."""
+
+    mtime_ns: int
+    size: int
+    sha256: str
+    start: int = Field(..., description="Position of the file's first clause in the index.")
+    count: int = Field(..., description="Number of clauses produced by the file.")
+
+
+class ManifestDiff(BaseModel):
+    """Files (relative paths) grouped by how they changed since the last build."""
+
+    added: List[str] = []
+    modified: List[str] = []
+    deleted: List[str] = []
+    unchanged: List[str] = []
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.modified or self.deleted)
+
+
+class Manifest(BaseModel):
+    """Mapping of documents-directory-relative path → :class:`FileEntry`."""
+
+    files: Dict[str, FileEntry] = {}
+
+    # ------------------------------------------------------------------
+    @classmethod
+    def load(cls, index_prefix: Path) -> "Manifest | None":
+        path = index_prefix.with_suffix(_SUFFIX)
+        if not path.exists():
+            return None
+        return cls(**json.loads(path.read_text(encoding="utf-8")))
+
+    def save(self, index_prefix: Path):
+        index_prefix.with_suffix(_SUFFIX).write_text(
+            json.dumps(self.model_dump(), indent=2), encoding="utf-8"
+        )
+
+    @classmethod
+    def from_clauses(
+        cls,
+        docs_dir: Path,
+        files: Sequence[Path],
+        clauses: Sequence[Clause],
+        offset: int = 0,
+    ) -> "Manifest":
+        """Build a manifest for an ingest of *files* that produced *clauses*.
+
+        *offset* is the index position of the first clause. Relies on loaders
+        emitting each file's clauses contiguously, with ``Clause.source == str(file)``.
+        """
+        counts = {source: sum(1 for _ in group) for source, group in groupby(clauses, key=lambda c: c.source)}
+        return cls.from_counts(docs_dir, files, counts, offset=offset)
+
+    @classmethod
+    def from_counts(
+        cls,
+        docs_dir: Path,
+        files: Sequence[Path],
+        counts: Dict[str, int],
+        offset: int = 0,
+    ) -> "Manifest":
+        """Like :meth:`from_clauses` but from per-source clause counts.
+
+        Lets streaming builds record ranges without keeping the clauses; *files*
+        must be in the order their clauses were indexed.
+        """
+        manifest = cls()
+        pos = offset
+        for file in files:
+            count = counts.get(str(file), 0)
+            manifest.files[_rel(docs_dir, file)] = _fingerprint(file, pos, count)
+            pos += count
+        return manifest
+
+    # ------------------------------------------------------------------
+    def diff(self, docs_dir: Path) -> ManifestDiff:
+        """Compare against the supported files currently in *docs_dir*.
+
+        Files whose mtime and size are unchanged are not read; otherwise the
+        content hash decides (a touched but identical file stays unchanged).
+        """
+        result = ManifestDiff()
+        seen = set()
+        for file in iter_supported_files(docs_dir):
+            rel = _rel(docs_dir, file)
+            seen.add(rel)
+            entry = self.files.get(rel)
+            if entry is None:
+                result.added.append(rel)
+                continue
+            stat = file.stat()
+            if stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size:
+                result.unchanged.append(rel)
+            elif file_sha256(file) == entry.sha256:
+                entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+                result.unchanged.append(rel)
+            else:
+                result.modified.append(rel)
+        result.deleted = sorted(set(self.files) - seen)
+        return result
+
+    def drop(self, rels: Sequence[str]) -> List[int]:
+        """Forget *rels* and return their clause positions; later ranges shift down."""
+        positions: List[int] = []
+        for rel in rels:
+            entry = self.files.pop(rel)
+            positions.extend(range(entry.start, entry.start + entry.count))
+        removed = sorted(positions)
+        for entry in self.files.values():
+            entry.start -= bisect_left(removed, entry.start)
+        return positions
+
+
+# ---------------------------------------------------------------------------
+# Incremental update
+# ---------------------------------------------------------------------------
+
+
+def update_index(
+    retriever: "Retriever",
+    docs_dir: Path,
+    manifest: Manifest,
+    workers: int = 1,
+    text_cache: Optional[ExtractedTextCache] = None,
+) -> ManifestDiff:
+    """Bring *retriever* (loaded from a saved index) in line with *docs_dir*.
+
+    Clauses of deleted and modified files are removed, then added and modified
+    files are parsed (across *workers* processes, with the chunking recorded in
+    the index descriptor) and appended. *manifest* is updated in place; the
+    caller saves both it and the retriever.
+    """
+    changes = manifest.diff(docs_dir)
+    retriever.remove_clauses(manifest.drop(changes.deleted + changes.modified))
+
+    files = [docs_dir / rel for rel in changes.modified + changes.added]
+    chunker = Chunker.from_config(retriever.index_spec.chunking, model_token_counter(retriever.model))
+    clauses = ingest_files(files, workers=workers, chunker=chunker, text_cache=text_cache)
+    start = len(retriever.clauses)
+    retriever.add_clauses(clauses)
+    manifest.files.update(Manifest.from_clauses(docs_dir, files, clauses, offset=start).files)
+    return changes
+
+
+def record_appended(index_prefix: Path, docs_dir: Path, clauses: Sequence[Clause], start: int) -> bool:
+    """Record the files of *clauses*, appended to the index at position *start*, in its manifest.
+
+    For clauses added outside :func:`update_index` (e.g. web uploads persisted
+    to the delta log), so a later incremental update does not add them again.
+    Does nothing (and returns ``False``) if the index has no manifest. The
+    caller serialises writers, e.g. with the index's delta-log lock.
+    """
+    manifest = Manifest.load(index_prefix)
+    if manifest is None:
+        return False
+    files = [Path(source) for source in dict.fromkeys(c.source for c in clauses)]
+    manifest.files.update(Manifest.from_clauses(docs_dir, files, clauses, offset=start).files)
+    manifest.save(index_prefix)
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _rel(docs_dir: Path, file: Path) -> str:
+    return file.relative_to(docs_dir).as_posix()
+
+
+def _fingerprint(file: Path, start: int, count: int) -> FileEntry:
+    stat = file.stat()
+    return FileEntry(mtime_ns=stat.st_mtime_ns, size=stat.st_size, sha256=file_sha256(file), start=start, count=count)
@@ -1,31 +1,186 @@
-"""PDF document loader using **pdfplumber**.
+"""PDF document loader with a fast **PyPDF2** path and **pdfplumber** fallback.
 
 Splits each page of the PDF into a single clause (chunk).
+
+PyPDF2 only decodes the content stream, which is several times faster per page
+than pdfplumber's full character-layout analysis. Pages where its output is
+empty or looks garbled (unmapped glyphs, run-together words) are re-extracted
+with pdfplumber. Per-backend page counts and timings are kept in
+:attr:`PDFLoader.stats` and logged once per file.
+
+pdfplumber keeps every character and layout object of each page it has
+touched; pages are closed right after extraction, and PyPDF2's object cache is
+dropped after every :attr:`PDFLoader.pages_per_range` pages, so memory stays
+flat regardless of document length.
 """
 from __future__ import annotations
 
+import logging
+import os
+import re
+import time
+import unicodedata
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Iterable, Tuple
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
 
 import pdfplumber
+import PyPDF2
+from PyPDF2 import PdfReader
 
 from . import BaseLoader
+from .chunking import Chunker
+from .text_cache import ExtractedTextCache
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("auto", "pypdf2", "pdfplumber")
+
+_SPACES_RE = re.compile(r"[ \t\u00a0]+")
+_CID_RE = re.compile(r"\(cid:\d+\)")
+# Share of characters that must be letters, digits, punctuation, symbols or spaces
+# (garbled fonts decode to control / private-use code points instead)
+_MIN_CLEAN_RATIO = 0.85
+# Longer average "word" length means spaces were lost (letters run together)
+_MAX_AVG_WORD_LEN = 20
+
+
+def normalize_text(text: str) -> str:
+    """Collapse runs of spaces and drop blank lines (PyPDF2 pads with both)."""
+    lines = (_SPACES_RE.sub(" ", line).strip() for line in text.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def looks_garbled(text: str) -> bool:
+    """Heuristic check for failed extraction; empty text counts as garbled."""
+    if not text:
+        return True
+    if "\ufffd" in text or _CID_RE.search(text):
+        return True
+    clean = sum(ch.isspace() or unicodedata.category(ch)[0] in "LNPSZ" for ch in text)
+    if clean / len(text) < _MIN_CLEAN_RATIO:
+        return True
+    words = text.split()
+    return sum(map(len, words)) / len(words) > _MAX_AVG_WORD_LEN
 
 
 class PDFLoader(BaseLoader):
     """Load PDF files into text chunks per page."""
 
     extensions = ["pdf"]
+    mime_types = ["application/pdf"]
+
+    # "auto": PyPDF2 with pdfplumber fallback; or force a single backend.
+    # Read from the environment so parsing worker processes inherit it.
+    backend: str = os.getenv("PDF_BACKEND", "auto")
+
+    # PyPDF2 caches decoded objects for every page it touches, so memory grows
+    # with document length. The cache (and the fallback pdfplumber document) is
+    # dropped after each range of this many pages (None keeps it for the file).
+    pages_per_range: Optional[int] = 32
+
+    def __init__(
+        self,
+        path: Path,
+        chunker: Optional[Chunker] = None,
+        text_cache: Optional[ExtractedTextCache] = None,
+        backend: Optional[str] = None,
+    ):
+        super().__init__(path, chunker, text_cache)
+        self.backend = backend or self.backend
+        if self.backend not in BACKENDS:
+            raise ValueError(f"Unknown PDF backend {self.backend!r}; expected one of {', '.join(BACKENDS)}")
+        self.stats: Dict[str, Dict[str, float]] = {
+            name: {"pages": 0, "seconds": 0.0} for name in BACKENDS[1:]
+        }
+
+    @property
+    def extractor_version(self) -> str:  # type: ignore[override]
+        return f"pdf/1/{self.backend}/PyPDF2-{PyPDF2.__version__}/pdfplumber-{pdfplumber.__version__}"
 
     # ------------------------------------------------------------------
     def load(self) -> Iterable[Tuple[str, Dict]]:  # noqa: D401
         """Yield ``(text, metadata)`` for each page in the PDF."""
 
-        with pdfplumber.open(self.path) as pdf:
-            for page_num, page in enumerate(pdf.pages, start=1):
-                text = page.extract_text() or ""
-                text = text.strip()
+        if self.backend == "pdfplumber":
+            pages = self._pdfplumber_pages()
+        else:
+            pages = self._pypdf2_pages()
+        try:
+            for page_num, text in enumerate(pages, start=1):
                 if not text:
                     continue  # skip blank pages
                 meta = {"source": str(self.path), "page": page_num}
                 yield text, meta
+        finally:
+            self._log_stats()
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+    def _pypdf2_pages(self) -> Iterable[str]:
+        plumber: Optional[pdfplumber.PDF] = None
+        # A file handle makes PyPDF2 seek on demand instead of copying the file
+        with open(self.path, "rb") as fp:
+            reader = PdfReader(fp)
+            n_pages = len(reader.pages)
+            step = self.pages_per_range or n_pages or 1
+            try:
+                for idx in range(n_pages):
+                    if idx and idx % step == 0:
+                        # Drop the previous range's decoded streams and fonts
+                        reader.resolved_objects.clear()
+                        if plumber is not None:
+                            plumber.close()
+                            plumber = None
+                    with self._timed("pypdf2"):
+                        try:
+                            text = normalize_text(reader.pages[idx].extract_text() or "")
+                        except Exception as exc:  # malformed content stream
+                            logger.debug("PyPDF2 failed on %s page %d: %s", self.path, idx + 1, exc)
+                            text = ""
+                    if self.backend == "auto" and looks_garbled(text):
+                        if plumber is None:
+                            first = idx - idx % step
+                            plumber = pdfplumber.open(self.path, pages=range(first + 1, first + step + 1))
+                        with self._timed("pdfplumber"):
+                            text = _plumber_text(plumber.pages[idx % step])
+                    yield text
+            finally:
+                if plumber is not None:
+                    plumber.close()
+
+    def _pdfplumber_pages(self) -> Iterable[str]:
+        with pdfplumber.open(self.path) as pdf:
+            for page in pdf.pages:
+                with self._timed("pdfplumber"):
+                    text = _plumber_text(page)
+                yield text
+
+    # ------------------------------------------------------------------
+    # Private helpers
+    # ------------------------------------------------------------------
+    @contextmanager
+    def _timed(self, backend: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stats[backend]["pages"] += 1
+            self.stats[backend]["seconds"] += time.perf_counter() - start
+
+    def _log_stats(self):
+        parts: List[str] = [
+            f"{name} {int(s['pages'])} pages in {s['seconds']:.2f}s"
+            for name, s in self.stats.items()
+            if s["pages"]
+        ]
+        if parts:
+            logger.info("Extracted %s: %s", self.path.name, ", ".join(parts))
+
+
+def _plumber_text(page: "pdfplumber.page.Page") -> str:
+    try:
+        return (page.extract_text() or "").strip()
+    finally:
+        page.close()  # drop the page's cached chars / layout objects
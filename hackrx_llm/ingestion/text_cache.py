@@ -0,0 +1,117 @@
+"""On-disk cache of loader output keyed by file content hash.
+
+Parsing is the slowest part of an ingest, yet the documents rarely change
+between runs that only try a different chunker or embedding model.
+:class:`ExtractedTextCache` stores every ``(text, metadata)`` unit a loader
+produced (PDF page, DOCX paragraph) under ``(sha256(file), extractor version,
+unit number)``. Loaders that declare an ``extractor_version`` replay cached
+units instead of re-parsing; changing extraction code or libraries changes the
+version and so invalidates old entries.
+
+The cache is a single SQLite file in WAL mode, so parsing worker processes can
+share it. Instances pickle as their path and reconnect lazily.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+def file_sha256(path: Path) -> str:
+    """Hex SHA-256 of the file at *path*, read in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fp:
+        for block in iter(lambda: fp.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ExtractedTextCache:
+    """SQLite store of per-unit extracted text; safe across threads and processes."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Pickle as the path only (pool workers open their own connection)
+    def __getstate__(self):
+        return {"path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["path"])
+
+    # ------------------------------------------------------------------
+    def get(self, digest: str, extractor: str) -> Optional[List[Tuple[str, Dict]]]:
+        """Return all units cached for the file, or ``None`` if it was never fully parsed."""
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT units FROM files WHERE digest = ? AND extractor = ?", (digest, extractor)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            rows = conn.execute(
+                "SELECT text, meta FROM units WHERE digest = ? AND extractor = ? ORDER BY seq",
+                (digest, extractor),
+            ).fetchall()
+        if len(rows) != row[0]:  # partially written by an interrupted run
+            self.misses += 1
+            return None
+        self.hits += 1
+        return [(text, json.loads(meta)) for text, meta in rows]
+
+    def put(self, digest: str, extractor: str, units: List[Tuple[str, Dict]]):
+        """Store *units* for the file, replacing anything cached under the same key."""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM units WHERE digest = ? AND extractor = ?", (digest, extractor))
+                conn.executemany(
+                    "INSERT INTO units (digest, extractor, seq, text, meta) VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (digest, extractor, seq, text, json.dumps(meta, ensure_ascii=False))
+                        for seq, (text, meta) in enumerate(units)
+                    ],
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO files (digest, extractor, units) VALUES (?, ?, ?)",
+                    (digest, extractor, len(units)),
+                )
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self.path), timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            with conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS units ("
+                    " digest TEXT NOT NULL, extractor TEXT NOT NULL, seq INTEGER NOT NULL,"
+                    " text TEXT NOT NULL, meta TEXT NOT NULL,"
+                    " PRIMARY KEY (digest, extractor, seq))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS files ("
+                    " digest TEXT NOT NULL, extractor TEXT NOT NULL, units INTEGER NOT NULL,"
+                    " PRIMARY KEY (digest, extractor))"
+                )
+            self._conn = conn
+        return self._conn
@@ -1,6 +1,7 @@
 """DOCX document loader using **python-docx** (aka *docx*)."""
 from __future__ import annotations
 
+from importlib.metadata import version
 from pathlib import Path
 from typing import Dict, Iterable, Tuple
 
@@ -13,6 +14,8 @@ class WordLoader(BaseLoader):
     """Load .docx files into one chunk per paragraph (non-empty)."""
 
     extensions = ["docx"]
+    mime_types = ["application/vnd.openxmlformats-officedocument.wordprocessingml.document"]
+    extractor_version = f"docx/1/python-docx-{version('python-docx')}"
 
     # ------------------------------------------------------------------
     def load(self) -> Iterable[Tuple[str, Dict]]:  # noqa: D401
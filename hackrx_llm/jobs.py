@@ -0,0 +1,235 @@
+"""Background ingestion of uploaded documents.
+
+Parsing and embedding a large PDF can take longer than a web worker should be
+tied up (and than gunicorn's request timeout). :class:`IngestJobQueue` runs
+uploads on a background thread instead: :meth:`~IngestJobQueue.submit` returns
+a :class:`JobStatus` immediately, progress is polled with
+:meth:`~IngestJobQueue.get`, and the clauses of a finished job are merged into
+the live :class:`~hackrx_llm.retriever.Retriever` in one step, so queries never
+see a partly ingested upload.
+
+Jobs run one at a time in submission order; the retriever has a single writer.
+
+Job statuses live in a :class:`JobStore`. Backed by a SQLite file next to the
+index, it lets every gunicorn worker answer a poll for a job another worker is
+running.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .ingestion import ingest_file
+from .ingestion.chunking import Chunker, model_token_counter
+from .retriever import Retriever
+from .schema import Clause
+
+logger = logging.getLogger(__name__)
+
+
+class JobStatus(BaseModel):
+    """Progress and outcome of one upload job."""
+
+    id: str
+    state: str = Field("queued", description="One of: queued, running, done, failed (nothing merged or saved).")
+    files: List[str] = Field(..., description="Names of the uploaded files, in processing order.")
+    files_done: int = Field(0, description="Files parsed and embedded so far (including failed ones).")
+    clauses_added: int = Field(0, description="Clauses merged into the index (set when the job finishes).")
+    errors: List[str] = []
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def progress(self) -> float:
+        return self.files_done / len(self.files) if self.files else 1.0
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("done", "failed")
+
+
+class JobStore:
+    """Job statuses in SQLite, readable by every process that opens the same *path*.
+
+    Each call uses its own connection, so a store created before gunicorn forks
+    its workers is safe to use in all of them. ``path=None`` keeps the table in
+    memory (one process only). At most *max_history* finished jobs are kept.
+    """
+
+    def __init__(self, path: Optional[Path] = None, max_history: int = 256):
+        self.path = Path(path) if path is not None else None
+        self.max_history = max_history
+        self._lock = threading.Lock()
+        self._memory = sqlite3.connect(":memory:", check_same_thread=False) if self.path is None else None
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                " id TEXT PRIMARY KEY, created_at REAL NOT NULL, finished INTEGER NOT NULL, status TEXT NOT NULL)"
+            )
+
+    def put(self, job: JobStatus):
+        """Insert or replace *job*; dropping the oldest finished jobs beyond *max_history*."""
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO jobs (id, created_at, finished, status) VALUES (?, ?, ?, ?)",
+                (job.id, job.created_at, int(job.finished), job.model_dump_json()),
+            )
+            if job.finished:
+                conn.execute(
+                    "DELETE FROM jobs WHERE finished = 1 AND id NOT IN"
+                    " (SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)",
+                    (self.max_history,),
+                )
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return JobStatus.model_validate_json(row[0]) if row else None
+
+    @contextmanager
+    def _connect(self):
+        with self._lock:
+            conn = self._memory or sqlite3.connect(str(self.path), timeout=30)
+            try:
+                with conn:
+                    yield conn
+            finally:
+                if conn is not self._memory:
+                    conn.close()
+
+
+class IngestJobQueue:
+    """Single-worker queue that ingests uploaded files into *retriever*.
+
+    *merge(retriever, clauses, embeddings)* adds a job's clauses to the index on
+    the worker thread (default: :meth:`Retriever.add_clauses`); the webapp's
+    also persists them, so a job is done only once its clauses are saved.
+    ``inline=True`` runs jobs inside :meth:`submit` – for serverless hosts that
+    freeze background threads.
+    Statuses go to *store* (default: an in-memory :class:`JobStore` remembering
+    *max_history* finished jobs).
+    """
+
+    def __init__(
+        self,
+        retriever: Retriever,
+        merge: Optional[Callable[[Retriever, List[Clause], np.ndarray], None]] = None,
+        inline: bool = False,
+        max_history: int = 256,
+        store: Optional[JobStore] = None,
+    ):
+        self.retriever = retriever
+        self.merge = merge or (lambda retriever, clauses, embeddings: retriever.add_clauses(clauses, embeddings))
+        self.inline = inline
+        self.store = store or JobStore(max_history=max_history)
+        self._paths: dict = {}  # job id -> files, for jobs this process has yet to run
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    def submit(self, paths: Sequence[Path]) -> JobStatus:
+        """Queue *paths* (already saved to disk) for ingestion; returns the new job."""
+        job = JobStatus(id=uuid.uuid4().hex, files=[p.name for p in paths], created_at=time.time())
+        with self._lock:
+            self.store.put(job)
+            self._paths[job.id] = list(paths)
+        if self.inline:
+            self._run(job.id)
+        else:
+            self._ensure_worker()
+            self._queue.put(job.id)
+        return self.get(job.id)
+
+    def get(self, job_id: str) -> Optional[JobStatus]:
+        """Snapshot of job *job_id* (submitted in any process sharing the store), or ``None`` if unknown."""
+        return self.store.get(job_id)
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every job submitted here has finished; ``False`` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if self._queue.unfinished_tasks == 0:
+                return True
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.01)
+
+    # ------------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------------
+    def _ensure_worker(self):
+        # Started lazily: threads do not survive gunicorn's fork of the master
+        with self._lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop, name="ingest-jobs", daemon=True)
+                self._worker.start()
+
+    def _loop(self):
+        while True:
+            job_id = self._queue.get()
+            try:
+                self._run(job_id)
+            except Exception:  # never let one job kill the worker
+                logger.exception("Ingest job %s crashed", job_id)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, job_id: str):
+        with self._lock:
+            paths = self._paths.pop(job_id, [])
+        self._update(job_id, state="running", started_at=time.time())
+
+        chunker = Chunker.from_config(self.retriever.index_spec.chunking, model_token_counter(self.retriever.model))
+        clauses: List[Clause] = []
+        vectors: List[np.ndarray] = []
+        errors: List[str] = []
+        for done, path in enumerate(paths, start=1):
+            try:
+                file_clauses = ingest_file(path, chunker=chunker)
+                if file_clauses:
+                    vectors.append(self.retriever.embed_clauses(file_clauses))
+                    clauses.extend(file_clauses)
+            except Exception as exc:
+                logger.warning("Failed to ingest %s: %s", path, exc)
+                errors.append(f"Error processing {path.name}: {exc}")
+                path.unlink(missing_ok=True)
+            self._update(job_id, files_done=done, errors=list(errors))
+
+        merged = 0
+        if clauses:
+            try:
+                # Single writer: everything embedded above, merged (and saved) in one call
+                self.merge(self.retriever, clauses, np.concatenate(vectors))
+                merged = len(clauses)
+            except Exception as exc:
+                logger.exception("Failed to merge job %s", job_id)
+                errors.append(f"Error updating index: {exc}")
+
+        self._update(
+            job_id,
+            state="failed" if errors and not merged else "done",
+            clauses_added=merged,
+            errors=errors,
+            finished_at=time.time(),
+        )
+
+    def _update(self, job_id: str, **changes):
+        # Only the process running a job writes its status
+        with self._lock:
+            job = self.store.get(job_id)
+            if job is not None:
+                self.store.put(job.model_copy(update=changes))
@@ -1,79 +1,602 @@
 """Semantic retrieval over document clauses.
 
-Embeds text with *sentence-transformers* and stores vectors in a FAISS index.
+Embeds text with *sentence-transformers* (one shared model per process, see
+:mod:`hackrx_llm.embeddings`) and stores vectors in a FAISS index. An optional
+on-disk :class:`~hackrx_llm.embeddings.EmbeddingCache` lets rebuilds skip
+clauses whose text was embedded before.
+
+The index type (exact flat scan or approximate IVF / HNSW) is selected with an
+:class:`hackrx_llm.indexes.IndexSpec`, persisted next to the index.
+
+Clause texts live in an offset-indexed :class:`hackrx_llm.clause_store.ClauseStore`
+and are decoded only for the ids a search returns. With ``mmap=True`` a saved
+index is opened read-only through memory maps so that several server workers
+share one page-cache copy of vectors and clauses.
+
+Clauses added after a full :meth:`Retriever.save` can be persisted cheaply with
+:meth:`Retriever.append_delta` (see :mod:`hackrx_llm.delta_log`); loading replays
+the log and the next full save compacts it away. Loads, saves and appends hold
+the log's inter-process lock. Several processes may append to one index: each
+first catches up with what the others logged or compacted, and readers pick
+that up with :meth:`Retriever.refresh`.
+
+The index and its clauses form one immutable snapshot. Searches read whichever
+snapshot is current and never take a lock; writers (:meth:`Retriever.add_clauses`,
+:meth:`Retriever.remove_clauses`, rebuilds) serialise on a lock and publish a new
+snapshot with a single attribute assignment. A search therefore never waits for
+an ingest and never sees an index id without a clause behind it.
+
+The base index is never modified or copied by additions: clauses added after it
+was built or loaded (uploads, a replayed delta log) go to a small exact *delta*
+index that searches query alongside it, merging the two result lists by score.
+Only the delta is copied per write, so an upload costs time and memory
+proportional to the delta, and a memory-mapped base stays shared. A full save
+merges the delta into a new base (and, with ``mmap=True``, maps the result).
 """
 from __future__ import annotations
 
+import logging
 import pickle
+import threading
+from itertools import islice
 from pathlib import Path
-from typing import List, Sequence
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
 
 import faiss
-from sentence_transformers import SentenceTransformer
+import numpy as np
 
+from .clause_store import ClauseStore, ClauseStoreWriter, atomic_output
+from .delta_log import DeltaLog, IndexChangedError
+from .embeddings import (
+    DEFAULT_MODEL_NAME,
+    EmbeddingCache,
+    QueryEmbeddingCache,
+    get_model,
+    normalize_query,
+    text_digest,
+)
+from .indexes import IndexSpec
 from .schema import Clause
 
-_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+logger = logging.getLogger(__name__)
+
+_MODEL_NAME = DEFAULT_MODEL_NAME
+_LEGACY_META_SUFFIX = ".meta.pkl"
+
+
+class _Snapshot(NamedTuple):
+    """An index and the clauses its ids refer to; published and replaced together."""
+
+    index: faiss.Index | None  # the base; never mutated once published
+    clauses: Sequence[Clause]
+    mapped: bool = False  # index views a memory-mapped file
+    delta: faiss.IndexFlat | None = None  # vectors of clauses[index.ntotal:], exact search
+
+    @property
+    def ntotal(self) -> int:
+        if self.index is None:
+            return 0
+        return self.index.ntotal + (self.delta.ntotal if self.delta is not None else 0)
 
 
 class Retriever:
     """Vector-store wrapper (embeddings + FAISS) for fast semantic search."""
 
-    def __init__(self, model_name: str = _MODEL_NAME, index_path: Path | None = None):
-        self.model = SentenceTransformer(model_name)
-        self.clauses: List[Clause] = []
-        self.index: faiss.IndexFlatIP | None = None
+    def __init__(
+        self,
+        model_name: str = _MODEL_NAME,
+        index_path: Path | None = None,
+        index_spec: IndexSpec | None = None,
+        mmap: bool = False,
+        device: str | None = None,
+        query_cache_size: int = 1024,
+        query_cache_ttl: float | None = 3600.0,
+        embedding_cache: EmbeddingCache | Path | None = None,
+    ):
+        self.model_name = model_name
+        self.model = get_model(model_name, device)
+        if embedding_cache is not None and not isinstance(embedding_cache, EmbeddingCache):
+            embedding_cache = EmbeddingCache(embedding_cache)
+        self.embedding_cache: EmbeddingCache | None = embedding_cache
+        # query_cache_size=0 disables the query-embedding cache
+        self.query_cache = QueryEmbeddingCache(query_cache_size, query_cache_ttl)
+        self.index_spec = index_spec or IndexSpec()
+        self.mmap = mmap
+        self._snapshot = _Snapshot(None, [])
+        self._write_lock = threading.RLock()  # writers only; readers never take it
         self.index_path = Path(index_path) if index_path else None
+        # Prefix + clause count of the full save that the delta log extends
+        self._base: Tuple[Path, int] | None = None
+        self.delta_count = 0  # clauses persisted only in the delta log
+        self._disk: Optional[tuple] = None  # _disk_state() of the files the snapshot reflects
         # Load existing index if associated *.faiss file is present (prefix itself may not exist)
         if self.index_path and self.index_path.with_suffix(".faiss").exists():
             self._load_index(self.index_path)
 
     # ------------------------------------------------------------------
-    def fit(self, clauses: Sequence[Clause]):
-        """Build FAISS index from *clauses*."""
-        self.clauses = list(clauses)
-        texts = [c.text for c in clauses]
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=True)
-        self.index = faiss.IndexFlatIP(embeddings.shape[1])
-        faiss.normalize_L2(embeddings)
-        self.index.add(embeddings)
+    @property
+    def index(self) -> faiss.Index | None:
+        """The base index (clauses added since it was built are held in a delta, see :attr:`ntotal`)."""
+        return self._snapshot.index
+
+    @property
+    def ntotal(self) -> int:
+        """Vectors searched: base index plus delta."""
+        return self._snapshot.ntotal
+
+    @property
+    def clauses(self) -> Sequence[Clause]:
+        return self._snapshot.clauses
+
+    # ------------------------------------------------------------------
+    def fit(self, clauses: Sequence[Clause], show_progress_bar: bool = True):
+        """Build FAISS index from *clauses* (servers pass ``show_progress_bar=False``)."""
+        clauses = list(clauses)
+        embeddings = self._embed_texts([c.text for c in clauses], show_progress_bar=show_progress_bar)
+        index = self._new_index(embeddings)
+        index.add(embeddings)
+        with self._write_lock:
+            self._snapshot = _Snapshot(index, clauses)
 
     def save(self, path: Path):
-        """Persist index + metadata to *path* (two files: *.faiss, *.pkl)."""
-        assert self.index is not None, "Index not built"
-        faiss.write_index(self.index, str(path.with_suffix(".faiss")))
-        with open(path.with_suffix(".meta.pkl"), "wb") as fp:
-            pickle.dump(self.clauses, fp)
+        """Persist index + metadata to *path*.
+
+        Writes ``*.faiss``, ``*.index.json`` and the clause store
+        (``*.clauses.jsonl`` + ``*.clauses.idx``). Files are replaced atomically,
+        so workers that have the previous version mapped keep a consistent view.
+        A legacy ``*.meta.pkl`` next to *path* is removed once superseded, and
+        so is the delta log (this is how it gets compacted).
+        """
+        with self._write_lock, DeltaLog(path).locked():
+            self._save(path)
+
+    def append_delta(
+        self,
+        path: Path,
+        clauses: Sequence[Clause],
+        embeddings: np.ndarray | None = None,
+        compact_at: int | None = None,
+    ) -> int:
+        """Add *clauses* (as :meth:`add_clauses`) and persist them by appending to the delta log.
+
+        Costs time proportional to *clauses*, not to the index. Runs under the
+        log's inter-process lock: whatever other processes logged or compacted
+        into *path* since this retriever last read it is loaded first, so every
+        writer appends to the same clause sequence. Once the log holds
+        *compact_at* clauses it is compacted with a full save, under the same
+        lock. Falls back to a full save if *path* holds no full save this
+        retriever extends (never saved, saved elsewhere, or clauses removed
+        since); an empty retriever adopts a save another process made at *path*.
+
+        Returns the index position of the first of *clauses*.
+        """
+        if not clauses:
+            return len(self.clauses)
+        if embeddings is None:
+            embeddings = self.embed_clauses(clauses)
+        path = Path(path)
+        log = DeltaLog(path)
+        with self._write_lock, log.locked():
+            if (self._base is None or self._base[0] != path) and not self.clauses and ClauseStore.exists(path):
+                self._snapshot = self._replay_delta(path, self._open(path))
+            if self._base is None or self._base[0] != path:
+                start = len(self.clauses)
+                self.add_clauses(clauses, embeddings)
+                self._save(path)
+                return start
+            self._sync(path)
+            start = len(self.clauses)
+            log.append(clauses, embeddings, base=self._base[1])
+            self.add_clauses(clauses, embeddings)
+            self.delta_count += len(clauses)
+            self._disk = _disk_state(path)
+            if compact_at is not None and self.delta_count >= compact_at:
+                logger.info("Compacting %d logged clauses into %s", self.delta_count, path)
+                self._save(path)
+            return start
+
+    def refresh(self) -> bool:
+        """Pick up clauses other processes appended to (or compacted into) the index this retriever persists to.
+
+        A few ``stat`` calls when nothing changed; returns whether a new
+        snapshot was published. Skipped (with a warning) while this retriever
+        holds clauses it has not persisted.
+        """
+        if self._base is None:
+            return False
+        path = self._base[0]
+        if _disk_state(path) == self._disk:
+            return False
+        with self._write_lock, DeltaLog(path).locked():
+            before = self._snapshot
+            try:
+                self._sync(path)
+            except IndexChangedError as exc:
+                logger.warning("Not refreshing from %s: %s", path, exc)
+                return False
+            return self._snapshot is not before
+
+    def build_stream(self, clauses: Iterable[Clause], path: Path, batch_size: int = 256) -> int:
+        """Build and save an index from a clause *stream* with bounded memory.
+
+        Clauses are pulled from *clauses* (e.g. :func:`hackrx_llm.ingestion.iter_clauses`)
+        *batch_size* at a time, embedded, added to the index and appended to the
+        on-disk clause store at *path*; nothing upstream runs ahead of the
+        embedding step. Apart from the FAISS vectors themselves, memory does not
+        grow with corpus size. IVF indexes are trained on the first
+        ``index_spec.train_size`` vectors rather than a random sample.
+
+        Returns the number of clauses indexed; afterwards :attr:`clauses` is the
+        lazily read store at *path*.
+        """
+        with self._write_lock, DeltaLog(path).locked():
+            index: faiss.Index | None = None
+            min_train = self.index_spec.train_size if self.index_spec.is_ivf else 1
+            untrained: List[np.ndarray] = []  # vectors held back until the index can be built
+            held = 0
+
+            with ClauseStoreWriter(path) as writer:
+                for batch in _batched(clauses, batch_size):
+                    embeddings = self._embed_texts([c.text for c in batch])
+                    writer.extend(batch)
+                    if index is None:
+                        untrained.append(embeddings)
+                        held += len(embeddings)
+                        if held < min_train:
+                            continue
+                        embeddings = np.concatenate(untrained)
+                        untrained = []
+                        index = self._new_index(embeddings)
+                    index.add(embeddings)
+                if index is None:
+                    if not untrained:
+                        raise ValueError("No clauses to index")
+                    embeddings = np.concatenate(untrained)
+                    index = self._new_index(embeddings)
+                    index.add(embeddings)
+
+            self._write_index(path, index)
+            self._snapshot = _Snapshot(index, ClauseStore.open(path, mmap=self.mmap))
+            self._reset_delta(path, writer.count)
+            return writer.count
 
     # ------------------------------------------------------------------
-    def add_clauses(self, new_clauses: Sequence[Clause]):
-        """Incrementally add *new_clauses* to the index in-memory."""
+    def embed_clauses(self, clauses: Sequence[Clause]) -> np.ndarray:
+        """Normalised embeddings of *clauses*, for a later :meth:`add_clauses`.
+
+        Lets callers do the slow part without touching the live index.
+        """
+        return self._embed_texts([c.text for c in clauses])
+
+    def embed_queries(self, queries: Sequence[str]) -> np.ndarray:
+        """L2-normalised query matrix (for ``retrieve_many(embeddings=...)``); only cache misses go through the model.
+
+        The normalised query is only the cache key; the model encodes the query
+        text as given (first spelling seen per key), so cased models embed it as
+        :meth:`_embed_texts` would.
+        """
+        keys = [normalize_query(q) for q in queries]
+        cached = [self.query_cache.get(k) for k in keys]
+        missing = {}  # key -> query text to encode
+        for query, key, vec in zip(queries, keys, cached):
+            if vec is None:
+                missing.setdefault(key, query)
+        fresh = {}
+        if missing:
+            emb = self.model.encode(list(missing.values()), convert_to_numpy=True, show_progress_bar=False)
+            faiss.normalize_L2(emb)
+            for key, vec in zip(missing, emb):
+                fresh[key] = vec
+                self.query_cache.put(key, vec)
+        rows = [vec if vec is not None else fresh[k] for k, vec in zip(keys, cached)]
+        return np.ascontiguousarray(np.stack(rows), dtype="float32")
+
+    def add_clauses(self, new_clauses: Sequence[Clause], embeddings: np.ndarray | None = None):
+        """Incrementally add *new_clauses* to the index in-memory.
+
+        *embeddings* (from :meth:`embed_clauses`) skips embedding them again.
+        The clauses go to the delta index; the base is left as it is. Searches
+        keep using the previous snapshot until the new one is published. An IVF
+        index kept flat for lack of training data is trained as soon as the
+        clauses suffice.
+        """
 
         if not new_clauses:
             return
-        texts = [c.text for c in new_clauses]
-        embeddings = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
-        faiss.normalize_L2(embeddings)
+        if embeddings is None:
+            embeddings = self.embed_clauses(new_clauses)
 
-        if self.index is None:
-            # Fresh index
-            self.index = faiss.IndexFlatIP(embeddings.shape[1])
-        self.index.add(embeddings)
-        self.clauses.extend(new_clauses)
+        with self._write_lock:
+            snap = self._snapshot
+            clauses = _extended(snap.clauses, new_clauses)
+            if snap.index is None:
+                # Fresh index (flat until there is enough to train IVF types)
+                index = self._new_index(embeddings)
+                index.add(embeddings)
+                self._snapshot = _Snapshot(index, clauses)
+            elif (
+                not self.index_spec.is_built(snap.index)
+                and snap.ntotal + len(embeddings) >= self.index_spec.min_train_size
+            ):
+                # Enough vectors now: train the configured index on all of them
+                held = [snap.index] if snap.delta is None else [snap.index, snap.delta]
+                embeddings = np.concatenate([*map(_vectors, held), embeddings])
+                index = self._new_index(embeddings)
+                index.add(embeddings)
+                self._snapshot = _Snapshot(index, clauses)
+            else:
+                delta = faiss.clone_index(snap.delta) if snap.delta is not None else faiss.IndexFlatIP(snap.index.d)
+                delta.add(embeddings)
+                self._snapshot = snap._replace(clauses=clauses, delta=delta)
+
+    def remove_clauses(self, positions: Iterable[int]):
+        """Drop the clauses at *positions*; later clauses shift down to stay aligned.
+
+        Flat indexes compact in place. Other index types keep their training and
+        are refilled from the remaining clauses (cheap with an embedding cache).
+        """
+        drop = set(positions)
+        if not drop:
+            return
+        with self._write_lock:
+            snap = self._snapshot
+            assert snap.index is not None, "Index not built"
+            kept = [c for i, c in enumerate(snap.clauses) if i not in drop]
+            index = self._merged_copy(snap)
+            if isinstance(index, faiss.IndexFlat):
+                index.remove_ids(faiss.IDSelectorBatch(np.fromiter(drop, dtype="int64")))
+            else:
+                index.reset()
+                if kept:
+                    index.add(self._embed_texts([c.text for c in kept]))
+            self._snapshot = _Snapshot(index, kept)
+            self._base = None  # positions changed: the next persist must be a full save
 
     # ------------------------------------------------------------------
-    def retrieve(self, query: str, top_k: int = 5) -> List[Clause]:
-        """Return top-*k* most similar clauses to *query*."""
-        assert self.index is not None, "Index not built. Call fit() or load index first."
-        q_emb = self.model.encode([query], convert_to_numpy=True)
-        faiss.normalize_L2(q_emb)
-        scores, idxs = self.index.search(q_emb, top_k)
-        return [self.clauses[i] for i in idxs[0] if i < len(self.clauses)]
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ) -> List[Clause]:
+        """Return top-*k* most similar clauses to *query*.
+
+        *nprobe* (IVF) and *ef_search* (HNSW) override the recall settings from
+        :attr:`index_spec` for this call only; they are ignored for flat indexes.
+        """
+        hits = self.retrieve_many([query], top_k=top_k, nprobe=nprobe, ef_search=ef_search)[0]
+        return [clause for clause, _ in hits]
+
+    def retrieve_many(
+        self,
+        queries: Sequence[str],
+        top_k: int = 5,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+        embeddings: np.ndarray | None = None,
+    ) -> List[List[Tuple[Clause, float]]]:
+        """Return ``(clause, score)`` hits for every query in *queries*.
+
+        All queries are embedded in one model batch and searched with a single
+        FAISS call; results keep the order of *queries*. Scores are cosine
+        similarities (inner product of L2-normalised vectors). Queries found in
+        :attr:`query_cache` skip the model entirely, and *embeddings* (from
+        :meth:`embed_queries`) skips it for all of them.
+        """
+        snap = self._snapshot  # one consistent (index, clauses) pair for the whole call
+        assert snap.index is not None, "Index not built. Call fit() or load index first."
+        if not queries:
+            return []
+        q_emb = embeddings if embeddings is not None else self.embed_queries(queries)
+        scores, idxs = self._search(snap, q_emb, top_k, nprobe, ef_search)
+        n = len(snap.clauses)
+        # Approximate indexes pad missing results with -1
+        return [
+            [(snap.clauses[i], float(score)) for i, score in zip(row_idxs, row_scores) if 0 <= i < n]
+            for row_idxs, row_scores in zip(idxs, scores)
+        ]
 
     # ------------------------------------------------------------------
     # Private helpers
     # ------------------------------------------------------------------
+    def _new_index(self, embeddings: np.ndarray) -> faiss.Index:
+        """Empty index per :attr:`index_spec`, trained on *embeddings*; records the dimension in the spec."""
+        index = self.index_spec.build(embeddings)
+        if self.index_spec.dim != index.d:
+            self.index_spec = self.index_spec.model_copy(update={"dim": index.d})
+        return index
+
+    def _save(self, path: Path):
+        """Body of :meth:`save`; the caller holds the write lock and the delta-log lock.
+
+        A delta index is merged into the saved base, which then replaces the
+        published one (memory-mapped from *path* with ``mmap=True``).
+        """
+        snap = self._snapshot
+        assert snap.index is not None, "Index not built"
+        index = snap.index if snap.delta is None else self._merged_copy(snap)
+        ClauseStore.write(path, snap.clauses)
+        self._write_index(path, index)
+        self._reset_delta(path, len(snap.clauses))
+        if snap.delta is not None:
+            self._snapshot = self._open(path) if self.mmap else _Snapshot(index, snap.clauses)
+
+    def _sync(self, path: Path):
+        """Bring the snapshot up to date with the full save + log at *path*; the caller holds both locks.
+
+        Clauses another process logged are added to the delta, as a load would
+        replay them; a base another process rewrote is loaded afresh. Raises
+        :class:`IndexChangedError` if *path* changed while this retriever holds
+        clauses it never persisted (they have no place in the other's sequence).
+        """
+        state = _disk_state(path)
+        if state == self._disk:
+            return
+        base, logged = self._base[1], self.delta_count
+        if len(self.clauses) != base + logged:
+            raise IndexChangedError(
+                f"{path} was changed by another process, but this retriever holds "
+                f"{len(self.clauses) - base - logged} clauses it has not persisted"
+            )
+        if self._disk is None or state[0] != self._disk[0]:
+            self._snapshot = self._replay_delta(path, self._open(path))
+            return
+        clauses, embeddings = DeltaLog(path).read(base)
+        if len(clauses) < logged:
+            # The log was restarted under this base: start over from the files
+            self._snapshot = self._replay_delta(path, self._open(path))
+            return
+        if len(clauses) > logged:
+            logger.info("Loading %d clauses another process logged to %s", len(clauses) - logged, path)
+            self.add_clauses(clauses[logged:], embeddings[logged:])
+            self.delta_count = len(clauses)
+        self._disk = state
+
+    def _write_index(self, path: Path, index: faiss.Index):
+        """Write ``*.faiss`` + ``*.index.json`` and drop a superseded legacy pickle."""
+        with atomic_output(path.with_suffix(".faiss")) as tmp:
+            faiss.write_index(index, str(tmp))
+        self.index_spec.save(path)
+        path.with_suffix(_LEGACY_META_SUFFIX).unlink(missing_ok=True)
+
+    def _embed_texts(self, texts: Sequence[str], show_progress_bar: bool = False) -> np.ndarray:
+        """L2-normalised clause matrix, encoding only texts missing from the embedding cache."""
+        if self.embedding_cache is None:
+            emb = self.model.encode(list(texts), convert_to_numpy=True, show_progress_bar=show_progress_bar)
+            faiss.normalize_L2(emb)
+            return emb
+
+        digests = [text_digest(t) for t in texts]
+        known = self.embedding_cache.get_many(self.model_name, digests)
+        todo = {d: t for d, t in zip(digests, texts) if d not in known}
+        if todo:
+            emb = self.model.encode(list(todo.values()), convert_to_numpy=True, show_progress_bar=show_progress_bar)
+            faiss.normalize_L2(emb)
+            fresh = dict(zip(todo, emb))
+            self.embedding_cache.put_many(self.model_name, fresh.items())
+            known.update(fresh)
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype="float32")
+        return np.ascontiguousarray(np.stack([known[d] for d in digests]), dtype="float32")
+
+    def _search(self, snap: _Snapshot, q_emb, top_k: int, nprobe: int | None, ef_search: int | None):
+        """Top-*top_k* ``(scores, ids)`` over the base and delta indexes of *snap*."""
+        params = self.index_spec.search_params(nprobe=nprobe, ef_search=ef_search)
+        if params is None:
+            scores, idxs = snap.index.search(q_emb, top_k)
+        else:
+            scores, idxs = snap.index.search(q_emb, top_k, params=params)
+        if snap.delta is None:
+            return scores, idxs
+
+        d_scores, d_idxs = snap.delta.search(q_emb, top_k)
+        idxs = np.hstack([idxs, np.where(d_idxs >= 0, d_idxs + snap.index.ntotal, -1)])
+        scores = np.where(idxs >= 0, np.hstack([scores, d_scores]), -np.inf)
+        order = np.argsort(-scores, axis=1, kind="stable")[:, :top_k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(idxs, order, axis=1)
+
     def _load_index(self, path: Path):
-        self.index = faiss.read_index(str(path.with_suffix(".faiss")))
-        with open(path.with_suffix(".meta.pkl"), "rb") as fp:
-            self.clauses = pickle.load(fp)
+        # Locked so another process cannot compact between reading the base and the log
+        with self._write_lock, DeltaLog(path).locked():
+            self._snapshot = self._replay_delta(path, self._open(path))
+
+    def _open(self, path: Path) -> _Snapshot:
+        """Snapshot of the full save at *path* (memory-mapped with ``mmap=True``)."""
+        self.index_spec = IndexSpec.load(path)
+        if self.mmap:
+            index = faiss.read_index(str(path.with_suffix(".faiss")), self._mmap_flags())
+        else:
+            index = faiss.read_index(str(path.with_suffix(".faiss")))
+
+        if ClauseStore.exists(path):
+            clauses = ClauseStore.open(path, mmap=self.mmap)
+        else:
+            # Index saved before the clause store existed; re-save to migrate.
+            with open(path.with_suffix(_LEGACY_META_SUFFIX), "rb") as fp:
+                clauses = pickle.load(fp)
+        return _Snapshot(index, clauses, self.mmap)
+
+    def _replay_delta(self, path: Path, snap: _Snapshot) -> _Snapshot:
+        """*snap* plus the clauses logged since the last full save of *path*, in a delta index."""
+        base = len(snap.clauses)
+        self._disk = _disk_state(path)
+        clauses, embeddings = DeltaLog(path).read(base)
+        self._base = (Path(path), base)
+        self.delta_count = len(clauses)
+        if not clauses:
+            return snap
+        delta = faiss.IndexFlatIP(snap.index.d)
+        delta.add(embeddings)
+        return snap._replace(clauses=_extended(snap.clauses, clauses), delta=delta)
+
+    def _reset_delta(self, path: Path, base: int):
+        DeltaLog(path).clear()
+        self._base = (Path(path), base)
+        self.delta_count = 0
+        self._disk = _disk_state(path)
+
+    def _mmap_flags(self) -> int:
+        # IVF inverted lists and flat code arrays are mapped by different flags,
+        # and FAISS rejects the combination.
+        if self.index_spec.is_ivf:
+            return faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        return faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+
+    def _merged_copy(self, snap: _Snapshot) -> faiss.Index:
+        """Writable private copy of *snap*'s base index with its delta added."""
+        index = self._copy_index(snap)
+        if snap.delta is not None:
+            index.add(_vectors(snap.delta))
+        return index
+
+    def _copy_index(self, snap: _Snapshot) -> faiss.Index:
+        """Writable private copy of *snap*'s base index (published indexes are never mutated)."""
+        if not snap.mapped:
+            return faiss.clone_index(snap.index)
+        if faiss.try_extract_index_ivf(snap.index) is None:
+            return faiss.deserialize_index(faiss.serialize_index(snap.index))
+        # Mapped IVF lists cannot be cloned; copy the trained shell, then the lists one by one
+        index = faiss.deserialize_index(faiss.serialize_index(snap.index), faiss.IO_FLAG_SKIP_IVF_DATA)
+        ivf = faiss.extract_index_ivf(index)
+        src = faiss.extract_index_ivf(snap.index).invlists
+        lists = faiss.ArrayInvertedLists(ivf.nlist, ivf.code_size)
+        for list_no in range(ivf.nlist):
+            n = src.list_size(list_no)
+            if n:
+                lists.add_entries(list_no, n, src.get_ids(list_no), src.get_codes(list_no))
+        ivf.replace_invlists(lists, True)
+        lists.this.disown()
+        return index
+
+
+def _extended(clauses: Sequence[Clause], new: Sequence[Clause]) -> Sequence[Clause]:
+    """*clauses* followed by *new*, as a new sequence (*clauses* may be shared with readers)."""
+    if isinstance(clauses, ClauseStore):
+        return clauses.extended(new)
+    return [*clauses, *new]
+
+
+def _disk_state(path: Path) -> tuple:
+    """Cheap fingerprint of the full save and delta log at *path*; the first item identifies the full save."""
+
+    def stamp(file: Path):
+        try:
+            st = file.stat()
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_mtime_ns, st.st_size
+
+    log = DeltaLog(path)
+    return stamp(path.with_suffix(".faiss")), stamp(log.header_path), stamp(log.vectors_path)
+
+
+def _vectors(index: faiss.Index) -> np.ndarray:
+    """All vectors stored in flat *index*."""
+    return index.reconstruct_n(0, index.ntotal)
+
+
+def _batched(items: Iterable[Clause], size: int) -> Iterator[List[Clause]]:
+    it = iter(items)
+    while batch := list(islice(it, size)):
+        yield batch
@@ -136,9 +136,22 @@ document.addEventListener("DOMContentLoaded", () => {
         body: formData,
       });
       const json = await resp.json();
-      if (!resp.ok) throw new Error(json.error || resp.statusText);
-      uploadMsg.textContent = `Uploaded ${json.uploaded.length} file(s), added ${json.clauses_added} clauses.`;
-      uploadMsg.classList.remove("d-none");
+      if (!resp.ok) throw new Error((json.errors || []).join("; ") || json.error || resp.statusText);
+
+      // Indexing runs in the background; poll the job until it finishes
+      uploadMsg.classList.remove("d-none", "text-danger");
+      let job;
+      do {
+        await new Promise((resolve) => setTimeout(resolve, 1000));
+        const jobResp = await fetch(json.status_url);
+        job = await jobResp.json();
+        if (!jobResp.ok) throw new Error(job.error || jobResp.statusText);
+        uploadMsg.textContent = `Indexing… ${job.files_done}/${job.files.length} file(s) processed`;
+      } while (job.state === "queued" || job.state === "running");
+
+      if (job.state === "failed") throw new Error(job.errors.join("; ") || "indexing failed");
+      uploadMsg.textContent = `Uploaded ${job.files.length} file(s), added ${job.clauses_added} clauses.`;
+      if (job.errors.length) uploadMsg.textContent += ` Errors: ${job.errors.join("; ")}`;
       uploadMsg.classList.add("text-success");
     } catch (err) {
       uploadMsg.textContent = `Upload failed: ${err}`;
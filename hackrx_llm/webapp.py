@@ -2,11 +2,13 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
 import sys
 from pathlib import Path
-from typing import Dict, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 
+import numpy as np
 from flask import Flask, Response, jsonify, render_template, request, send_from_directory
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
@@ -19,10 +21,20 @@ if project_root not in sys.path:
 # Check if running on Vercel
 IS_VERCEL = os.environ.get('VERCEL') == '1'
 
+from hackrx_llm.batching import QueryBatcher
 from hackrx_llm.decision_engine import evaluate
+from hackrx_llm.delta_log import DeltaLog
+from hackrx_llm.embeddings import get_model, warmup
+from hackrx_llm.indexes import IndexSpec
 from hackrx_llm.ingestion import ingest_dir
+from hackrx_llm.ingestion.chunking import Chunker, model_token_counter
+from hackrx_llm.ingestion.manifest import record_appended
+from hackrx_llm.jobs import IngestJobQueue, JobStore
 from hackrx_llm.parser import parse_query
 from hackrx_llm.retriever import Retriever
+from hackrx_llm.schema import Clause
+
+logger = logging.getLogger(__name__)
 
 # ---------------------------------------------------------------------------
 # Configuration
@@ -46,6 +58,31 @@ else:
 
 TOP_K_DEFAULT = int(os.getenv("TOP_K", "5"))
 
+# Torch device for the shared embedding model (None lets sentence-transformers pick)
+EMBEDDING_DEVICE = os.getenv("EMBEDDING_DEVICE") or None
+
+# Query-embedding cache (QUERY_CACHE_SIZE=0 disables it)
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "1024"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "3600"))
+
+# Micro-batching of /api/ask queries: wait up to QUERY_BATCH_WINDOW_MS for
+# concurrent queries (at most QUERY_BATCH_MAX) and embed + search them together.
+# QUERY_BATCH_WINDOW_MS=0 searches every request on its own thread.
+QUERY_BATCH_WINDOW_MS = float(os.getenv("QUERY_BATCH_WINDOW_MS", "3"))
+QUERY_BATCH_MAX = int(os.getenv("QUERY_BATCH_MAX", "32"))
+
+# Token budget / overlap of chunks when the server builds an index itself
+# (CHUNK_TOKENS=0, the default as for the CLI, keeps one clause per page / paragraph)
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "0"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "32"))
+
+# Uploads are appended to a delta log next to the index; compact (full save)
+# once the log holds this many clauses
+DELTA_COMPACT_AT = int(os.getenv("DELTA_COMPACT_AT", "5000"))
+
+# Memory-map the saved index read-only so gunicorn workers share one page-cache copy
+INDEX_MMAP = os.getenv("INDEX_MMAP", "1").lower() in {"1", "true", "yes"}
+
 # Upload directory for user documents
 UPLOAD_DIR = DOCS_DIR / "uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -97,6 +134,19 @@ def create_app() -> Flask:  # noqa: D401
         return send_from_directory(template_folder, 'index.html')
 
     retriever = _init_retriever()
+    # Statuses in a file every gunicorn worker reads: polls may reach any of them
+    jobs = IngestJobQueue(
+        retriever,
+        merge=_persist,
+        inline=IS_VERCEL,
+        store=JobStore(INDEX_PATH.with_suffix(".jobs.sqlite")),
+    )
+    # Serverless hosts freeze background threads between requests
+    batcher = (
+        QueryBatcher(retriever, window=QUERY_BATCH_WINDOW_MS / 1000, max_batch=QUERY_BATCH_MAX)
+        if QUERY_BATCH_WINDOW_MS > 0 and not IS_VERCEL
+        else None
+    )
 
     # ------------------------------------------------------------------
     # Routes
@@ -120,7 +170,8 @@ def create_app() -> Flask:  # noqa: D401
             
             try:
                 q_struct = parse_query(query_text)
-                clauses = retriever.retrieve(query_text, top_k=top_k)
+                retriever.refresh()  # uploads other workers persisted
+                clauses = (batcher or retriever).retrieve(query_text, top_k=top_k)
                 resp = evaluate(q_struct, clauses)
                 
                 return app.response_class(
@@ -143,7 +194,7 @@ def create_app() -> Flask:  # noqa: D401
 
     @app.route("/api/upload", methods=['POST', 'OPTIONS'])
     def api_upload() -> Tuple[Response, int]:
-        """Receive one or more files via multipart/form-data and add to index."""
+        """Save uploaded files and queue them for indexing; returns a job id (202)."""
         if request.method == 'OPTIONS':
             return jsonify({}), 200
             
@@ -154,60 +205,51 @@ def create_app() -> Flask:  # noqa: D401
         if not files or all(file.filename == '' for file in files):
             return jsonify({"error": "No selected files"}), 400
             
-        uploaded, total_clauses, errors = [], 0, []
-        
+        saved, errors = [], []
         for file in files:
             if not file or file.filename == "":
                 continue
-                
+            filename = secure_filename(file.filename)
+            if not filename:
+                errors.append(f"Invalid filename: {file.filename}")
+                continue
             try:
-                filename = secure_filename(file.filename)
-                if not filename:
-                    errors.append(f"Invalid filename: {file.filename}")
-                    continue
-                    
                 save_path = UPLOAD_DIR / filename
-                
-                # Save the file
                 file.save(save_path)
-                
-                try:
-                    from hackrx_llm.ingestion import ingest_file
-                    
-                    # Process the file
-                    clauses = ingest_file(save_path)
-                    retriever.add_clauses(clauses)
-                    uploaded.append(filename)
-                    total_clauses += len(clauses)
-                    
-                except Exception as e:
-                    errors.append(f"Error processing {filename}: {str(e)}")
-                    # Clean up the saved file if there was an error
-                    if save_path.exists():
-                        save_path.unlink()
-                    
-            except Exception as e:
-                errors.append(f"Error handling {getattr(file, 'filename', 'unknown')}: {str(e)}")
-                continue
-        
-        # Save the updated index if we processed any files
-        if uploaded:
-            try:
-                retriever.save(INDEX_PATH)
+                saved.append(save_path)
             except Exception as e:
-                errors.append(f"Error saving index: {str(e)}")
-        
+                errors.append(f"Error handling {filename}: {str(e)}")
+
+        if not saved:
+            return jsonify({"uploaded": [], "success": False, "errors": errors}), 400
+
+        # Parse + embed + merge on the background worker; poll /api/jobs/<id>
+        job = jobs.submit(saved)
         response = {
-            "uploaded": uploaded,
-            "clauses_added": total_clauses,
-            "success": len(uploaded) > 0 and not errors
+            "job_id": job.id,
+            "status_url": f"/api/jobs/{job.id}",
+            "uploaded": job.files,
+            "success": True,
         }
-        
         if errors:
             response["errors"] = errors
-            
-        status_code = 200 if response["success"] else 400
-        return jsonify(response), status_code
+        return jsonify(response), 202
+
+    @app.route("/api/jobs/<job_id>", methods=['GET'])
+    def api_job(job_id: str) -> Tuple[Response, int]:
+        """Report progress of a background upload job."""
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Unknown job"}), 404
+        return jsonify({**job.model_dump(), "progress": job.progress}), 200
+
+    @app.route("/api/metrics", methods=['GET'])
+    def api_metrics() -> Tuple[Response, int]:
+        """Serving counters of this worker process."""
+        return jsonify({
+            "query_batching": batcher.stats() if batcher else None,
+            "query_cache_entries": len(retriever.query_cache),
+        }), 200
 
     return app
 
@@ -217,9 +259,47 @@ def create_app() -> Flask:  # noqa: D401
 # ---------------------------------------------------------------------------
 
 
+def _new_retriever(**kwargs: Any) -> Retriever:
+    """Construct a :class:`Retriever` with the server-wide device and cache settings."""
+    if "index_path" not in kwargs:
+        chunker = _default_chunker()
+        kwargs.setdefault("index_spec", IndexSpec(chunking=chunker.config() if chunker else None))
+    return Retriever(
+        device=EMBEDDING_DEVICE,
+        query_cache_size=QUERY_CACHE_SIZE,
+        query_cache_ttl=QUERY_CACHE_TTL,
+        embedding_cache=INDEX_PATH.with_suffix(".embcache.sqlite"),
+        **kwargs,
+    )
+
+
+def _persist(retriever: Retriever, clauses: List[Clause], embeddings: np.ndarray):
+    """Merge an upload job's clauses and persist them (runs on the job worker thread).
+
+    Appends to the delta log; once it holds DELTA_COMPACT_AT clauses the index
+    is compacted with a full save. Both happen under the index's inter-process
+    lock, after loading whatever other workers persisted meanwhile. The uploaded
+    files are then recorded in the index manifest (if the CLI wrote one), so
+    ``ingest --incremental`` does not index them twice.
+    """
+    INDEX_PATH.parent.mkdir(parents=True, exist_ok=True)
+    start = retriever.append_delta(INDEX_PATH, clauses, embeddings, compact_at=DELTA_COMPACT_AT)
+    with DeltaLog(INDEX_PATH).locked():
+        record_appended(INDEX_PATH, DOCS_DIR, clauses, start)
+
+
+def _default_chunker() -> Optional[Chunker]:
+    if not CHUNK_TOKENS:
+        return None
+    return Chunker(CHUNK_TOKENS, CHUNK_OVERLAP, token_counter=model_token_counter(get_model(device=EMBEDDING_DEVICE)))
+
+
 def _init_retriever() -> Retriever:
     """
     Load existing index or build from documents.
+
+    The shared embedding model is warmed up first, so neither the index build
+    nor the first request pays for model loading.
     
     Returns:
         Retriever: An initialized Retriever instance
@@ -228,33 +308,35 @@ def _init_retriever() -> Retriever:
         RuntimeError: If there's an error initializing the retriever
     """
     try:
+        warmup(device=EMBEDDING_DEVICE)
+
         # Check if index exists and load it
         index_file = INDEX_PATH.with_suffix(".faiss")
         if index_file.exists():
             try:
-                app.logger.info(f"Loading existing index from {index_file}")
-                return Retriever(index_path=INDEX_PATH)
+                logger.info(f"Loading existing index from {index_file}")
+                return _new_retriever(index_path=INDEX_PATH, mmap=INDEX_MMAP)
             except Exception as e:
-                app.logger.error(f"Error loading existing index: {e}")
+                logger.error(f"Error loading existing index: {e}")
                 # Continue to rebuild the index if loading fails
                 pass
 
         # Ensure documents directory exists
         if not DOCS_DIR.exists():
-            app.logger.info(f"Creating documents directory at {DOCS_DIR}")
+            logger.info(f"Creating documents directory at {DOCS_DIR}")
             DOCS_DIR.mkdir(parents=True, exist_ok=True)
 
         # Build index from documents
-        current_app.logger.info(f"Building index from documents in {DOCS_DIR}")
+        logger.info(f"Building index from documents in {DOCS_DIR}")
         
         try:
-            clauses = ingest_dir(DOCS_DIR)
+            clauses = ingest_dir(DOCS_DIR, chunker=_default_chunker())
             if not clauses:
-                current_app.logger.warning(f"No documents found in {DOCS_DIR}")
+                logger.warning(f"No documents found in {DOCS_DIR}")
                 # Create an empty retriever if no documents found
-                return Retriever()
+                return _new_retriever()
                 
-            retriever = Retriever()
+            retriever = _new_retriever()
             retriever.fit(clauses)
             
             # Ensure index directory exists
@@ -262,22 +344,22 @@ def _init_retriever() -> Retriever:
             
             try:
                 retriever.save(INDEX_PATH)
-                current_app.logger.info(f"Saved index to {INDEX_PATH}.faiss")
+                logger.info(f"Saved index to {INDEX_PATH}.faiss")
                 return retriever
                 
             except Exception as save_error:
-                current_app.logger.error(f"Error saving index: {save_error}")
+                logger.error(f"Error saving index: {save_error}")
                 # Return the in-memory retriever even if save fails
                 return retriever
                 
         except Exception as ingest_error:
-            current_app.logger.error(f"Error ingesting documents: {ingest_error}")
+            logger.error(f"Error ingesting documents: {ingest_error}")
             # Return an empty retriever if there's an error
-            return Retriever()
+            return _new_retriever()
             
     except Exception as e:
         error_msg = f"Failed to initialize retriever: {str(e)}"
-        current_app.logger.error(error_msg, exc_info=True)
+        logger.error(error_msg, exc_info=True)
         raise RuntimeError(error_msg) from e
 
 
@@ -3,25 +3,29 @@ from __future__ import annotations
 
 import os
 import json
+import hashlib
 import logging
+import threading
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 
-import requests
 from flask import Flask, request, jsonify, Response
-from werkzeug.utils import secure_filename
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
-from sentence_transformers import SentenceTransformer
 from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
 
+from .answer_cache import AnswerCache
+from .context import ContextBuilder
+from .document_cache import DocumentIndexCache
+from .embeddings import get_model, normalize_query, warmup
+from .fetcher import DocumentFetcher
+from .ingestion import ingest_file
+from .ingestion.chunking import Chunker, model_token_counter
 from .retriever import Retriever
-from .schema import Clause
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,7 +36,6 @@ app = Flask(__name__)
 
 # Configuration
 MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
-INDEX_PATH = Path("backend_index/store")
 DOCS_DIR = Path("documents")
 UPLOAD_DIR = DOCS_DIR / "uploads"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
@@ -40,87 +43,292 @@ UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 # LLM Configuration
 LLM_MODEL = "moonshotai/kimi-k2-instruct"
 
-# Initialize components
-retriever = None
+# Clauses retrieved per question, and how many LLM calls of one request run at once
+TOP_K = int(os.getenv("WEBHOOK_TOP_K", "3"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+
+# Per-document indexes: at most DOC_INDEX_CACHE_SIZE documents are kept ready;
+# a URL fetched less than DOC_INDEX_CACHE_TTL seconds ago is not downloaded again
+DOC_INDEX_CACHE_SIZE = int(os.getenv("DOC_INDEX_CACHE_SIZE", "16"))
+DOC_INDEX_CACHE_TTL = float(os.getenv("DOC_INDEX_CACHE_TTL", "3600"))
+
+# Document downloads: FETCH_TIMEOUT seconds per read, at most FETCH_MAX_MB per
+# document, FETCH_CONCURRENCY documents of one request fetched at once; the
+# least recently used downloads are deleted beyond FETCH_CACHE_MB on disk
+FETCH_TIMEOUT = float(os.getenv("FETCH_TIMEOUT", "30"))
+FETCH_MAX_MB = float(os.getenv("FETCH_MAX_MB", "100"))
+FETCH_CONCURRENCY = int(os.getenv("FETCH_CONCURRENCY", "4"))
+FETCH_CACHE_MB = float(os.getenv("FETCH_CACHE_MB", "1024"))
+
+# Chunking of downloaded documents (CHUNK_TOKENS=0 keeps one clause per page / paragraph).
+# Unlike the CLI and webapp (default 0) this chunks by default: each document
+# gets an index of its own, never merged with another, and whole pages would
+# overrun the LLM context budget
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", "200"))
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "32"))
+
+PROMPT_TEMPLATE = """You are an AI assistant for answering questions about insurance policies.
+    Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know.
+    
+    Context: {context}
+    
+    Question: {question}
+    
+    Answer in a clear and concise manner. Only include information that can be directly inferred from the context.
+    """
+# Part of every answer-cache key: editing the prompt (or model) invalidates cached answers
+PROMPT_VERSION = hashlib.sha1(f"{LLM_MODEL}\n{PROMPT_TEMPLATE}".encode("utf-8")).hexdigest()[:12]
+
+# Answer cache: ANSWER_CACHE_SIZE answers kept for ANSWER_CACHE_TTL seconds; a
+# rephrased question reuses an answer when its embedding similarity reaches
+# ANSWER_CACHE_SIMILARITY and it retrieved the same clauses (0 disables that tier)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "1024"))
+ANSWER_CACHE_TTL = float(os.getenv("ANSWER_CACHE_TTL", "86400"))
+ANSWER_CACHE_SIMILARITY = float(os.getenv("ANSWER_CACHE_SIMILARITY", "0.95")) or None
+
+# Prompt context is cut to CONTEXT_MAX_TOKENS tokens (0: no limit), counted with
+# the tiktoken CONTEXT_TOKEN_ENCODING (estimated if it cannot be loaded)
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "1500"))
+CONTEXT_TOKEN_ENCODING = os.getenv("CONTEXT_TOKEN_ENCODING", "cl100k_base")
+
+FALLBACK_ANSWER = "I couldn't generate an answer for this question. Please try again or rephrase your question."
+
+# Initialize components (once, at startup: see initialize_components)
 llm = None
+answer_chain = None
+_ready = threading.Event()
+_init_lock = threading.Lock()
+_init_error: Optional[str] = None
+_init_thread: Optional[threading.Thread] = None
+_init_thread_lock = threading.Lock()
+doc_indexes = DocumentIndexCache(DOC_INDEX_CACHE_SIZE, DOC_INDEX_CACHE_TTL)
+context_builder = ContextBuilder(CONTEXT_MAX_TOKENS, encoding=CONTEXT_TOKEN_ENCODING)
+answer_cache = AnswerCache(PROMPT_VERSION, ANSWER_CACHE_SIZE, ANSWER_CACHE_TTL, ANSWER_CACHE_SIMILARITY)
+fetcher = DocumentFetcher(
+    UPLOAD_DIR,
+    timeout=(5.0, FETCH_TIMEOUT),
+    max_bytes=int(FETCH_MAX_MB * 1024 * 1024),
+    max_workers=FETCH_CONCURRENCY,
+    max_cache_bytes=int(FETCH_CACHE_MB * 1024 * 1024),
+)
+
+
+class DocumentNotIndexable(ValueError):
+    """The requested documents were downloaded but could not be indexed."""
 
 
 def download_file(url: str, save_path: Path) -> Path:
     """Download a file from URL to the specified path."""
-    response = requests.get(url, stream=True)
-    response.raise_for_status()
-    
-    with open(save_path, 'wb') as f:
-        for chunk in response.iter_content(chunk_size=8192):
-            f.write(chunk)
-    
-    return save_path
+    return fetcher.download(url, save_path)
 
 
-def initialize_components():
-    """Initialize the retriever and LLM components."""
-    global retriever, llm
-    
+def get_document_retriever(document_urls: List[str]) -> Tuple[Retriever, str]:
+    """``(retriever, content hash)`` for the documents at *document_urls*.
+
+    The retriever is built or taken from :data:`doc_indexes`. Documents are
+    fetched concurrently and revalidated against the blob cache (an unchanged
+    document is not downloaded again). Download errors propagate. Raises
+    :class:`DocumentNotIndexable` if the documents cannot be indexed
+    (unsupported type, no text); that is remembered by content hash, so a
+    repeat is rejected without parsing the documents again.
+    """
+    key = "\n".join(document_urls)
+    cached = doc_indexes.get(key)
+    if cached is not None:
+        logger.info(f"Using cached index for {document_urls}")
+        digest, doc_retriever = cached
+        return doc_retriever, digest
+
+    logger.info(f"Fetching {len(document_urls)} document(s): {document_urls}")
+    fetched = fetcher.fetch_many(document_urls)
+    for result in fetched:
+        state = "not modified" if result.not_modified else f"downloaded {result.size} bytes"
+        logger.info(f"{result.url}: {state} -> {result.path}")
+
+    if len(fetched) == 1:
+        digest = fetched[0].sha256
+    else:
+        digest = hashlib.sha256("".join(r.sha256 for r in fetched).encode("ascii")).hexdigest()
+    cached = doc_indexes.get_by_content(key, digest)
+    if cached is not None:
+        logger.info(f"Documents {document_urls} unchanged; reusing their index")
+        return cached, digest
+    reason = doc_indexes.get_failure(digest)
+    if reason is not None:
+        raise DocumentNotIndexable(reason)
+
     try:
-        logger.info("Initializing retriever...")
-        retriever = Retriever(model_name=MODEL_NAME, index_path=INDEX_PATH)
-        logger.info(f"Retriever initialized with model: {MODEL_NAME}")
-        
-        # Initialize LLM (Groq)
-        groq_api_key = os.getenv("GROQ_API_KEY")
-        if not groq_api_key:
-            raise ValueError("GROQ_API_KEY environment variable not set")
-        
-        logger.info(f"Initializing Groq LLM with {LLM_MODEL}...")
-        llm = ChatGroq(
-            temperature=0,
-            model_name=LLM_MODEL,
-            groq_api_key=groq_api_key
+        chunker = (
+            Chunker(CHUNK_TOKENS, CHUNK_OVERLAP, token_counter=model_token_counter(get_model(MODEL_NAME)))
+            if CHUNK_TOKENS
+            else None
         )
-        logger.info(f"LLM {LLM_MODEL} initialized successfully")
-        
+        clauses = [clause for result in fetched for clause in ingest_file(result.path, chunker=chunker)]
+        if not clauses:
+            raise ValueError("no text extracted")
+        doc_retriever = Retriever(model_name=MODEL_NAME)
+        doc_retriever.fit(clauses, show_progress_bar=False)
     except Exception as e:
-        logger.error(f"Error initializing components: {str(e)}", exc_info=True)
-        raise
+        logger.warning(f"Could not index {document_urls}: {e}")
+        doc_indexes.put_failure(digest, str(e))
+        raise DocumentNotIndexable(str(e)) from e
+    doc_indexes.put(key, digest, doc_retriever)
+    logger.info(f"Indexed {len(clauses)} clauses from {document_urls}")
+    return doc_retriever, digest
 
 
-def format_docs(docs: List[Clause]) -> str:
-    """Format documents for the prompt."""
-    return "\n\n".join(f"Document {i+1}:\n{doc.text}" for i, doc in enumerate(docs))
+def initialize_components():
+    """Load the embedding model, LLM and answer chain once; later calls return immediately.
 
+    Answers come only from each request's own document index, so no prebuilt
+    index is loaded.
 
-def get_rag_chain():
-    """Create a RAG chain with prompt and LLM."""
-    template = """You are an AI assistant for answering questions about insurance policies.
-    Use the following pieces of retrieved context to answer the question. If you don't know the answer, just say that you don't know.
-    
-    Context: {context}
-    
-    Question: {question}
-    
-    Answer in a clear and concise manner. Only include information that can be directly inferred from the context.
+    Sets the readiness flag reported by ``/health``; a failure is recorded there
+    and re-raised.
     """
+    global llm, answer_chain, _init_error
     
-    prompt = ChatPromptTemplate.from_template(template)
-    
-    def format_and_retrieve(question: str) -> dict:
-        """Retrieve and format documents for the question."""
-        docs = retriever.retrieve(question, top_k=3)
-        return {
-            "context": format_docs(docs),
-            "question": question
-        }
+    with _init_lock:
+        if _ready.is_set():
+            return
+        try:
+            logger.info(f"Loading embedding model {MODEL_NAME}...")
+            warmup(MODEL_NAME)
+            
+            # Initialize LLM (Groq)
+            groq_api_key = os.getenv("GROQ_API_KEY")
+            if not groq_api_key:
+                raise ValueError("GROQ_API_KEY environment variable not set")
+            
+            logger.info(f"Initializing Groq LLM with {LLM_MODEL}...")
+            llm = ChatGroq(
+                temperature=0,
+                model_name=LLM_MODEL,
+                groq_api_key=groq_api_key
+            )
+            logger.info(f"LLM {LLM_MODEL} initialized successfully")
+            
+            # Built once and shared by every request (runnables are stateless)
+            answer_chain = get_answer_chain()
+            # Load the tokenizer now rather than in the first request
+            context_builder.token_counter("warm up")
+            _init_error = None
+            _ready.set()
+            
+        except Exception as e:
+            _init_error = str(e)
+            logger.error(f"Error initializing components: {str(e)}", exc_info=True)
+            raise
+
+
+def start_background_init() -> threading.Thread:
+    """Run :func:`initialize_components` in a thread so the server can answer ``/health`` meanwhile.
+
+    At most one such thread runs at a time; while it does, it is returned.
+    """
+    global _init_thread
+
+    def run():
+        try:
+            initialize_components()
+        except Exception:
+            pass  # logged, and reported by /health
     
-    # Create the chain
-    chain = (
-        RunnablePassthrough()
-        | format_and_retrieve
-        | prompt
-        | llm
-        | StrOutputParser()
+    with _init_thread_lock:
+        if _init_thread is None or not _init_thread.is_alive():
+            _init_thread = threading.Thread(target=run, name="webhook-init", daemon=True)
+            _init_thread.start()
+        return _init_thread
+
+
+@app.before_request
+def ensure_initializing():
+    """Start loading the components on the first request, however the app was started.
+
+    Covers WSGI servers and ``flask run`` importing ``app`` directly, and routes
+    served without :func:`vercel_handler`. A failed load is not retried; ``/health``
+    reports it.
+    """
+    if not _ready.is_set() and _init_error is None:
+        start_background_init()
+
+
+def get_answer_chain():
+    """Create the prompt + LLM chain; its input is ``{"context": ..., "question": ...}``."""
+    prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
+    return prompt | llm | StrOutputParser()
+
+
+def answer_questions(
+    questions: List[str],
+    document_retriever: Retriever,
+    document_hash: str,
+) -> Tuple[List[str], int]:
+    """Answer *questions* in order, with at most LLM_MAX_CONCURRENCY LLM calls in flight.
+
+    Context comes from *document_retriever*, whose content hash *document_hash*
+    scopes :data:`answer_cache`. Retrieval for all questions is one batched
+    embed + search; only questions missing from the answer cache reach the LLM
+    (once per distinct question), each with a context cut to CONTEXT_MAX_TOKENS.
+    A question whose retrieval or LLM call fails gets :data:`FALLBACK_ANSWER`;
+    the others are unaffected.
+
+    Returns the answers and the total context tokens sent to the LLM.
+    """
+    vectors = None
+    docs: List[Any] = []
+    try:
+        vectors = document_retriever.embed_queries(questions)
+        hits = document_retriever.retrieve_many(questions, top_k=TOP_K, embeddings=vectors)
+        docs = [[clause for clause, _ in question_hits] for question_hits in hits]
+    except Exception as e:
+        # Find out which question broke the batch; retrieve the rest one by one
+        logger.warning(f"Batched retrieval failed ({e}); retrieving questions one at a time")
+        vectors = None
+        for question in questions:
+            try:
+                docs.append(document_retriever.retrieve(question, top_k=TOP_K))
+            except Exception as question_error:
+                docs.append(question_error)
+
+    results: List[Any] = list(docs)
+    todo: Dict[Tuple[str, Tuple[str, ...]], List[int]] = {}  # exact cache key -> questions asking it
+    for i, question_docs in enumerate(docs):
+        if isinstance(question_docs, Exception):
+            continue
+        clause_ids = [c.id for c in question_docs]
+        vector = vectors[i] if vectors is not None else None
+        cached = answer_cache.get(document_hash, questions[i], clause_ids, vector)
+        if cached is not None:
+            results[i] = cached
+        else:
+            # Repeats within this request share one LLM call
+            todo.setdefault((normalize_query(questions[i]), tuple(clause_ids)), []).append(i)
+
+    asked = [group[0] for group in todo.values()]
+    contexts = {i: context_builder.build(questions[i], docs[i]) for i in asked}
+    context_tokens = sum(context.tokens for context in contexts.values())
+    outputs = (answer_chain or get_answer_chain()).batch(
+        [{"context": contexts[i].text, "question": questions[i]} for i in asked],
+        config={"max_concurrency": LLM_MAX_CONCURRENCY},
+        return_exceptions=True,
     )
-    
-    return chain
+    for group, output in zip(todo.values(), outputs):
+        for i in group:
+            results[i] = output
+        i = group[0]
+        if not isinstance(output, Exception):
+            vector = vectors[i] if vectors is not None else None
+            answer_cache.put(document_hash, questions[i], [c.id for c in docs[i]], output, vector)
+
+    answers = []
+    for question, result in zip(questions, results):
+        if isinstance(result, Exception):
+            logger.error(f"Error processing question {question!r}: {result}", exc_info=result)
+            answers.append(FALLBACK_ANSWER)
+        else:
+            answers.append(result)
+    return answers, context_tokens
 
 
 @app.route('/hackrx/run', methods=['POST'])
@@ -144,46 +352,41 @@ def process_query():
         data = request.get_json()
         document_url = data.get('documents')
         questions = data.get('questions', [])
+        # One URL, or a list of URLs answered from a combined index
+        document_urls = [document_url] if isinstance(document_url, str) else list(document_url or [])
         
         logger.info(f"Received request with document: {document_url} and {len(questions)} questions")
         
-        if not document_url or not questions:
+        if not document_urls or not questions:
             error_msg = "Missing required fields: documents and questions are required"
             logger.error(error_msg)
             return jsonify({"error": error_msg}), 400
         
-        # Download document
-        filename = secure_filename(Path(document_url).name)
-        local_path = UPLOAD_DIR / filename
+        # Components are loaded once at startup; until then, ask the client to retry
+        if not _ready.is_set():
+            logger.warning("Request received before initialization finished")
+            response = jsonify({"error": "Service is starting, retry shortly"})
+            response.headers["Retry-After"] = "5"
+            return response, 503
         
+        # Download + index the document(s) (or reuse their cached index)
         try:
-            logger.info(f"Downloading document from {document_url}...")
-            download_file(document_url, local_path)
-            logger.info(f"Successfully downloaded document to {local_path}")
+            document_retriever, document_hash = get_document_retriever(document_urls)
+        except DocumentNotIndexable as e:
+            logger.warning(f"Rejecting request for unindexable document(s) {document_urls}: {e}")
+            return jsonify({"error": f"Could not index document: {str(e)}"}), 422
         except Exception as e:
             error_msg = f"Error downloading document: {str(e)}"
             logger.error(error_msg, exc_info=True)
             return jsonify({"error": f"Failed to download document: {str(e)}"}), 400
         
-        # Initialize components if not already done
-        if retriever is None or llm is None:
-            initialize_components()
-        
-        # Process questions
-        answers = []
-        rag_chain = get_rag_chain()
-        
-        for question in questions:
-            try:
-                # Generate answer using RAG chain
-                answer = rag_chain.invoke(question)
-                answers.append(answer)
-                
-            except Exception as e:
-                logger.error(f"Error processing question: {str(e)}", exc_info=True)
-                answers.append("I couldn't generate an answer for this question. Please try again or rephrase your question.")
+        # Process questions (one batched retrieval, concurrent LLM calls)
+        answers, context_tokens = answer_questions(questions, document_retriever, document_hash)
+        logger.info(f"Answered {len(questions)} questions with {context_tokens} context tokens")
         
-        return jsonify({"answers": answers})
+        response = jsonify({"answers": answers})
+        response.headers["X-Context-Tokens"] = str(context_tokens)
+        return response
     
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
@@ -192,8 +395,21 @@ def process_query():
 
 @app.route('/health')
 def health_check():
-    """Health check endpoint for Render and monitoring."""
-    return jsonify({"status": "healthy", "model": LLM_MODEL}), 200
+    """Readiness check for Render and monitoring: 200 once the components are loaded."""
+    if _ready.is_set():
+        return jsonify({"status": "healthy", "model": LLM_MODEL}), 200
+    if _init_error is not None:
+        return jsonify({"status": "error", "error": _init_error}), 503
+    return jsonify({"status": "starting"}), 503
+
+
+@app.route('/metrics')
+def metrics():
+    """Cache counters of this worker process."""
+    return jsonify({
+        "answer_cache": answer_cache.stats(),
+        "document_indexes": doc_indexes.stats(),
+    }), 200
 
 
 # Vercel serverless handler
@@ -208,10 +424,8 @@ def vercel_handler(event, context):
         headers=event.get('headers', {}),
         data=event.get('body', '')
     ):
-        # Initialize components if not already done
-        global retriever, llm
-        if retriever is None or llm is None:
-            initialize_components()
+        # Each invocation may be a cold start: load the components inline
+        initialize_components()
             
         response = app.full_dispatch_request()
         return {
@@ -242,7 +456,7 @@ if __name__ == "__main__":
         port = int(os.getenv('PORT', 3000))
         app.run(host='0.0.0.0', port=port, debug=os.getenv("FLASK_DEBUG", "false").lower() == "true")
     else:
-        # Original local development
-        initialize_components()
+        # Original local development: serve /health while the components load
+        start_background_init()
         app.run(host="0.0.0.0", port=int(os.getenv("PORT", 8080)), 
                debug=os.getenv("FLASK_DEBUG", "false").lower() == "true")
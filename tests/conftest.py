@@ -0,0 +1,153 @@
+"""Shared fixtures.
+
+The real MiniLM model needs a download from the Hugging Face hub, so unit tests
+swap in a tiny deterministic bag-of-words encoder with the same ``encode`` API.
+"""
+import hashlib
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pytest
+
+_DIM = 256
+_TOKEN_RE = re.compile(r"\w+")
+
+
+class FakeModel:
+    """Hashing bag-of-words stand-in for :class:`SentenceTransformer`."""
+
+    def __init__(self, model_name: str = "fake", device=None):
+        self.model_name = model_name
+        self.calls = 0
+        self.encoded = 0
+        self.progress_bars = 0
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return _DIM
+
+    def encode(self, texts, convert_to_numpy=True, show_progress_bar=False, batch_size=32, **_):
+        self.calls += 1
+        self.encoded += len(texts)
+        self.progress_bars += bool(show_progress_bar)
+        out = np.zeros((len(texts), _DIM), dtype="float32")
+        for row, text in enumerate(texts):
+            for tok in _TOKEN_RE.findall(text.lower()):
+                h = int(hashlib.md5(tok.encode()).hexdigest(), 16)
+                out[row, h % _DIM] += 1.0
+                out[row, (h >> 32) % _DIM] += 1.0
+        return out
+
+
+@pytest.fixture
+def fake_model(monkeypatch):
+    """Serve :class:`FakeModel` from an empty model registry; returns the class."""
+    monkeypatch.setattr("hackrx_llm.embeddings.SentenceTransformer", FakeModel)
+    monkeypatch.setattr("hackrx_llm.embeddings._models", {})
+    return FakeModel
+
+
+def make_pdf(path, pages):
+    """Write a minimal Helvetica PDF with one page per entry of *pages* (lines of text)."""
+    objects = ["<< /Type /Catalog /Pages 2 0 R >>", None, "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for lines in pages:
+        ops = ["BT /F1 11 Tf 14 TL 72 760 Td"]
+        for line in lines:
+            escaped = line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+            ops.append(f"({escaped}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops)
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n{stream}\nendstream")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects)} 0 R >>"
+        )
+        kids.append(f"{len(objects)} 0 R")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>"
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for num, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{num} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += "".join(f"{off:010d} 00000 n \n" for off in offsets).encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    path.write_bytes(bytes(out))
+    return path
+
+
+class Site:
+    """Documents served by :func:`http_site`, and a log of the requests it received."""
+
+    def __init__(self, port: int):
+        self.base = f"http://127.0.0.1:{port}"
+        self.docs = {}
+        self.requests = []
+        self.delay = 0.0
+
+    def serve(self, path, body, etag=None, last_modified=None, chunked=False):
+        self.docs[path] = (body, etag, last_modified, chunked)
+        return self.base + path
+
+
+class _SiteHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_GET(self):  # noqa: N802
+        site = self.server.site
+        path = self.path.split("?")[0]
+        site.requests.append((path, dict(self.headers), self.client_address))
+        time.sleep(site.delay)
+        if path not in site.docs:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body, etag, last_modified, chunked = site.docs[path]
+        if (etag and self.headers.get("If-None-Match") == etag) or (
+            last_modified and self.headers.get("If-Modified-Since") == last_modified
+        ):
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        if etag:
+            self.send_header("ETag", etag)
+        if last_modified:
+            self.send_header("Last-Modified", last_modified)
+        if chunked:  # no Content-Length: body runs until the connection closes
+            self.send_header("Connection", "close")
+            self.close_connection = True
+        else:
+            self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _SiteServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients hanging up mid-body (e.g. the fetcher's size cap) are expected
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+@pytest.fixture
+def http_site():
+    """Local HTTP stand-in for document hosts (ETag / Last-Modified aware)."""
+    server = _SiteServer(("127.0.0.1", 0), _SiteHandler)
+    server.daemon_threads = True
+    server.site = Site(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server.site
+    server.shutdown()
+    server.server_close()
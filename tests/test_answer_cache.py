@@ -0,0 +1,53 @@
+"""Exact + semantic answer cache."""
+import numpy as np
+
+from hackrx_llm.answer_cache import AnswerCache
+
+
+def _unit(*values):
+    v = np.array(values, dtype="float32")
+    return v / np.linalg.norm(v)
+
+
+def test_exact_and_semantic_tiers():
+    cache = AnswerCache("p1", threshold=0.9)
+    cache.put("doc", "What is the grace period?", ["c1", "c2"], "30 days", _unit(1, 0, 0))
+
+    assert cache.get("doc", "  what is the GRACE period? ", ["c1", "c2"]) == "30 days"
+    # Rephrased, same evidence (in any order), similar embedding
+    assert cache.get("doc", "Grace period length?", ["c2", "c1"], _unit(1, 0.2, 0)) == "30 days"
+    # Similar but retrieved other clauses / other document / not similar enough
+    assert cache.get("doc", "Grace period length?", ["c1", "c3"], _unit(1, 0.2, 0)) is None
+    assert cache.get("other", "Grace period length?", ["c1", "c2"], _unit(1, 0.2, 0)) is None
+    assert cache.get("doc", "Room rent cap?", ["c1", "c2"], _unit(1, 1, 0)) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 3)
+    assert stats["hit_rate"] == 2 / 5
+
+
+def test_prompt_version_and_disabled_semantic_tier():
+    cache = AnswerCache("p1", threshold=None)
+    cache.put("doc", "q", ["c1"], "a", _unit(1, 0))
+    assert cache.get("doc", "q2", ["c1"], _unit(1, 0)) is None
+
+    newer = AnswerCache("p2")
+    newer._data.update(cache._data)  # entries written under another prompt
+    assert newer.get("doc", "q", ["c1"]) is None
+
+
+def test_eviction_and_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("hackrx_llm.answer_cache.time.monotonic", lambda: now[0])
+    cache = AnswerCache("p1", maxsize=2, ttl=60)
+    cache.put("doc", "a", ["c1"], "A")
+    cache.put("doc", "b", ["c1"], "B")
+    cache.get("doc", "a", ["c1"])  # a is now most recently used
+    cache.put("doc", "c", ["c1"], "C")
+
+    assert cache.get("doc", "b", ["c1"]) is None
+    assert cache.get("doc", "a", ["c1"]) == "A"
+    now[0] += 61
+    assert cache.get("doc", "a", ["c1"]) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["expirations"] == 2
+    assert len(cache) == 0 and AnswerCache("p1", maxsize=0).get("doc", "a", ["c1"]) is None
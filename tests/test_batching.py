@@ -0,0 +1,93 @@
+"""Cross-request micro-batching of retrieval queries."""
+import importlib
+import threading
+
+import pytest
+
+from hackrx_llm.batching import QueryBatcher
+from hackrx_llm.retriever import Retriever
+from hackrx_llm.schema import Clause
+
+_CLAUSES = [
+    Clause(id=f"c{i}", text=f"{topic} clause {i}", source="p.pdf")
+    for i, topic in enumerate(["grace period", "cataract surgery", "maternity cover", "room rent", "ambulance"])
+]
+
+
+def _concurrently(fn, args):
+    barrier = threading.Barrier(len(args))
+    results = [None] * len(args)
+
+    def run(i):
+        barrier.wait()
+        try:
+            results[i] = fn(*args[i])
+        except Exception as exc:
+            results[i] = exc
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(args))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=30)
+    return results
+
+
+def test_concurrent_queries_share_one_batch(fake_model):
+    retr = Retriever(query_cache_size=0)
+    retr.fit(_CLAUSES)
+    batcher = QueryBatcher(retr, window=0.2, max_batch=8)
+    calls = retr.model.calls
+    queries = [("grace period", 1), ("cataract surgery", 3), ("maternity cover", 2), ("room rent", 1)]
+
+    results = _concurrently(batcher.retrieve, queries)
+
+    assert retr.model.calls - calls < len(queries)
+    for (query, top_k), hits in zip(queries, results):
+        assert hits == retr.retrieve(query, top_k=top_k)
+    stats = batcher.stats()
+    assert stats["queries"] == 4
+    assert sum(stats["batch_size_histogram"].values()) == stats["batches"] < 4
+
+
+def test_max_batch_and_errors(fake_model):
+    batcher = QueryBatcher(Retriever(), window=0.2, max_batch=2)  # no index built
+
+    results = _concurrently(batcher.retrieve, [("q1",), ("q2",), ("q3",)])
+
+    assert all(isinstance(r, AssertionError) for r in results)
+    assert set(batcher.stats()["batch_size_histogram"]) <= {"1", "2"}
+    with pytest.raises(AssertionError):
+        batcher.retrieve("q4")
+
+
+def test_dispatcher_survives_a_broken_batch(fake_model, monkeypatch):
+    retr = Retriever()
+    retr.fit(_CLAUSES)
+    batcher = QueryBatcher(retr, window=0.01)
+    monkeypatch.setattr(retr, "retrieve_many", lambda queries, **kwargs: None)  # unusable result
+
+    with pytest.raises(TypeError):
+        batcher.retrieve("grace period")
+
+    monkeypatch.delattr(retr, "retrieve_many")
+    assert batcher.retrieve("grace period", top_k=1)[0].id == "c0"
+
+
+def test_webapp_batches_ask_and_reports_metrics(tmp_path, monkeypatch, fake_model):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "policy.eml").write_text("Subject: policy\n\nDaycare procedures are covered.\n", encoding="utf-8")
+    monkeypatch.setenv("DOCS_DIR", str(docs))
+    monkeypatch.setenv("INDEX_PATH", str(tmp_path / "index" / "store"))
+    monkeypatch.setenv("QUERY_BATCH_WINDOW_MS", "5")
+    from hackrx_llm import webapp
+
+    webapp = importlib.reload(webapp)
+    monkeypatch.setattr(webapp, "warmup", lambda *a, **kw: None)
+    client = webapp.create_app().test_client()
+
+    assert client.post("/api/ask", json={"query": "daycare procedures"}).status_code == 200
+    metrics = client.get("/api/metrics").get_json()
+    assert metrics["query_batching"]["queries"] == 1
+    assert metrics["query_batching"]["batches"] == 1
@@ -0,0 +1,91 @@
+"""Token-aware chunking and its use by the loaders."""
+import pickle
+import re
+
+import pytest
+
+from hackrx_llm.ingestion import ingest_dir
+from hackrx_llm.ingestion.chunking import Chunker, approx_token_count, model_token_counter
+
+
+def _sentences(n, prefix="Sentence"):
+    return [f"{prefix} {i} covers hospital expenses up to the sum insured." for i in range(n)]
+
+
+def test_chunks_respect_budget_and_overlap():
+    text = " ".join(_sentences(40))
+    chunker = Chunker(max_tokens=60, overlap=15)
+
+    chunks = chunker.split(text)
+
+    assert len(chunks) > 1
+    assert all(approx_token_count(c) <= 60 for c in chunks)
+    # Every chunk ends on a sentence boundary and the next one repeats its tail
+    for prev, nxt in zip(chunks, chunks[1:]):
+        assert prev.endswith(".")
+        assert nxt.startswith(prev.split(". ")[-1])
+    # Nothing is lost
+    for sentence in _sentences(40):
+        assert any(sentence in c for c in chunks)
+
+
+def test_headings_start_new_chunk_and_wrapped_lines_are_joined():
+    text = "1. Accident:-\nAn unforeseen event\ncaused by external means.\n2. Hospital:-\nAny institution registered."
+    chunks = Chunker(max_tokens=80, overlap=10).split(text)
+
+    assert chunks == [
+        "1. Accident:- An unforeseen event caused by external means.",
+        "2. Hospital:- Any institution registered.",
+    ]
+
+
+def test_over_long_sentence_is_hard_wrapped():
+    text = " ".join(f"word{i}" for i in range(300))
+    chunks = Chunker(max_tokens=50, overlap=10).split(text)
+
+    assert all(approx_token_count(c) <= 50 for c in chunks)
+    assert chunks[0].split()[0] == "word0" and chunks[-1].split()[-1] == "word299"
+    assert set(chunks[0].split()) & set(chunks[1].split())  # windows overlap
+
+
+class _DigitTokenizer:
+    """Splits every digit into its own piece, like BERT on long numbers."""
+
+    def tokenize(self, text):
+        return re.findall(r"\d|[^\W\d]+|[^\w\s]", text)
+
+
+class _Model:
+    tokenizer = _DigitTokenizer()
+
+
+def test_model_tokenizer_counts_tokens(fake_model):
+    text = " ".join(f"Limit {i} is Rs 1234567890 per claim." for i in range(40))
+    counter = model_token_counter(_Model())
+    chunker = pickle.loads(pickle.dumps(Chunker(max_tokens=60, overlap=0, token_counter=counter)))
+
+    chunks = chunker.split(text)
+    assert all(counter(c) <= 60 for c in chunks)
+    # The estimate undercounts digit runs, so its chunks overflow the real budget
+    assert max(counter(c) for c in Chunker(max_tokens=60, overlap=0).split(text)) > 60
+    assert model_token_counter(fake_model()) is approx_token_count
+
+
+def test_config_round_trip_and_validation():
+    chunker = Chunker(max_tokens=120, overlap=24)
+    assert Chunker.from_config(chunker.config()).config() == chunker.config()
+    assert Chunker.from_config(None) is None
+    with pytest.raises(ValueError):
+        Chunker(max_tokens=10, overlap=10)
+
+
+def test_loaders_emit_chunks(tmp_path):
+    body = "\n".join(_sentences(30))
+    (tmp_path / "long.eml").write_text(f"Subject: policy\n\n{body}\n", encoding="utf-8")
+
+    whole = ingest_dir(tmp_path)
+    chunked = ingest_dir(tmp_path, chunker=Chunker(max_tokens=60, overlap=0), workers=2)
+
+    assert len(whole) == 1
+    assert len(chunked) > 1
+    assert [c.id for c in chunked] == [f"long.eml:{i}" for i in range(len(chunked))]
@@ -0,0 +1,71 @@
+"""Clause store round-trip and memory-mapped index loading."""
+from hackrx_llm.clause_store import ClauseStore
+from hackrx_llm.indexes import IndexSpec
+from hackrx_llm.retriever import Retriever
+from hackrx_llm.schema import Clause
+
+
+def _clauses(n: int):
+    return [Clause(id=f"doc.pdf:{i}", text=f"clause {i} – pré-existing disease wait {i}", source="doc.pdf") for i in range(n)]
+
+
+def test_store_roundtrip(tmp_path):
+    clauses = _clauses(50)
+    prefix = tmp_path / "store"
+    assert ClauseStore.write(prefix, clauses) == 50
+
+    for mmap in (False, True):
+        store = ClauseStore.open(prefix, mmap=mmap)
+        assert len(store) == 50
+        assert store[7] == clauses[7]
+        assert store[-1] == clauses[-1]
+        assert store[2:4] == clauses[2:4]
+        store.extend(_clauses(2))
+        assert len(store) == 52 and store[51].id == "doc.pdf:1"
+
+
+def test_empty_store(tmp_path):
+    prefix = tmp_path / "empty"
+    ClauseStore.write(prefix, [])
+    assert len(ClauseStore.open(prefix, mmap=True)) == 0
+
+
+def test_mmap_retriever_add_and_resave(fake_model, tmp_path):
+    for index_type in ("flat", "ivf_flat", "hnsw_flat"):
+        prefix = tmp_path / index_type
+        retr = Retriever(index_spec=IndexSpec(index_type=index_type))
+        retr.fit(_clauses(100))
+        retr.save(prefix)
+
+        mapped = Retriever(index_path=prefix, mmap=True)
+        assert isinstance(mapped.clauses, ClauseStore)
+        assert mapped.retrieve("clause 12 – pré-existing disease wait 12", top_k=1)[0].id == "doc.pdf:12"
+
+        # Additions go to the delta index; the mapped base stays shared
+        base = mapped.index
+        mapped.add_clauses([Clause(id="new:0", text="maternity cover after nine months", source="new.pdf")])
+        assert mapped.index is base and mapped.ntotal == 101
+        mapped.save(prefix)
+        assert len(Retriever(index_path=prefix, mmap=True).clauses) == 101
+
+
+def test_legacy_pickle_is_migrated_on_save(fake_model, tmp_path):
+    import pickle
+
+    prefix = tmp_path / "store"
+    retr = Retriever()
+    retr.fit(_clauses(10))
+    retr.save(prefix)
+    assert not prefix.with_suffix(".meta.pkl").exists()
+
+    # Simulate an index written before the clause store existed
+    for suffix in (".clauses.jsonl", ".clauses.idx"):
+        prefix.with_suffix(suffix).unlink()
+    with open(prefix.with_suffix(".meta.pkl"), "wb") as fp:
+        pickle.dump(_clauses(10), fp)
+
+    legacy = Retriever(index_path=prefix)
+    assert legacy.clauses == _clauses(10)
+    legacy.save(prefix)
+    assert not prefix.with_suffix(".meta.pkl").exists()
+    assert list(Retriever(index_path=prefix).clauses) == _clauses(10)
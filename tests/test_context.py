@@ -0,0 +1,56 @@
+"""Token-budgeted prompt context assembly."""
+import tiktoken
+
+from hackrx_llm.context import ContextBuilder, get_token_counter
+from hackrx_llm.ingestion.chunking import approx_token_count
+from hackrx_llm.schema import Clause
+
+_GRACE = "A grace period of thirty days is allowed for premium payment."
+_FILLER = [f"Clause {i} describes administrative procedure number {i} in detail." for i in range(30)]
+
+
+def _builder(max_tokens):
+    return ContextBuilder(max_tokens, token_counter=approx_token_count)
+
+
+def test_small_context_is_kept_whole_without_duplicates():
+    clauses = [
+        Clause(id="a:0", text=f"Room rent is capped. {_GRACE}", source="p"),
+        Clause(id="a:1", text=f"{_GRACE} Renewal is lifelong.", source="p"),  # chunk overlap
+    ]
+
+    built = _builder(1000).build("grace period?", clauses)
+
+    assert built.text == f"Document 1:\nRoom rent is capped. {_GRACE}\n\nDocument 2:\nRenewal is lifelong."
+    assert (built.sentences, built.dropped) == (3, 1)
+    assert built.clause_ids == ["a:0", "a:1"]
+    assert built.tokens == approx_token_count(built.text)
+
+
+def test_budget_keeps_relevant_sentences_in_order():
+    clauses = [
+        Clause(id="p:0", text=" ".join(_FILLER[:15]), source="p"),
+        Clause(id="p:1", text=" ".join(_FILLER[15:] + [_GRACE]), source="p"),
+    ]
+
+    built = _builder(60).build("What is the grace period for premium payment?", clauses)
+
+    assert built.tokens <= 60
+    assert _GRACE in built.text
+    assert built.dropped > 20
+    assert built.text.index("Document 1:") == 0
+    kept = [s for s in _FILLER if s in built.text]
+    assert kept == sorted(kept, key=_FILLER.index)  # original order
+    assert _builder(0).build("grace", clauses).sentences == 31
+
+
+def test_falls_back_to_estimate_without_tiktoken(monkeypatch):
+    def offline(name):
+        raise ConnectionError("no network")
+
+    monkeypatch.setattr(tiktoken, "get_encoding", offline)
+    get_token_counter.cache_clear()
+    try:
+        assert get_token_counter("cl100k_base") is approx_token_count
+    finally:
+        get_token_counter.cache_clear()
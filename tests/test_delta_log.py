@@ -0,0 +1,145 @@
+"""Append-only delta log persistence and compaction."""
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from hackrx_llm.delta_log import DeltaLog, IndexChangedError
+from hackrx_llm.retriever import Retriever
+from hackrx_llm.schema import Clause
+
+BASE = [
+    Clause(id="p:0", text="Room rent is capped at one percent of sum insured.", source="p"),
+    Clause(id="p:1", text="Cataract surgery has a two year waiting period.", source="p"),
+]
+NEW = [
+    Clause(id="u:0", text="Ambulance charges are covered up to 2000 rupees.", source="u"),
+    Clause(id="u:1", text="Organ donor expenses are payable.", source="u"),
+]
+
+
+def _add(retr, clauses, path, compact_at=None):
+    retr.append_delta(path, clauses, retr.embed_clauses(clauses), compact_at=compact_at)
+
+
+def _saved(path):
+    retr = Retriever()
+    retr.fit(BASE)
+    retr.save(path)
+    return retr
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_uploads_append_without_rewriting_base(tmp_path, fake_model, mmap):
+    path = tmp_path / "store"
+    retr = Retriever()
+    retr.fit(BASE)
+    retr.save(path)
+    base_files = {p.name: p.stat().st_mtime_ns for p in tmp_path.iterdir()}
+
+    _add(retr, NEW[:1], path)
+    _add(retr, NEW[1:], path)
+
+    assert {p.name: p.stat().st_mtime_ns for p in tmp_path.iterdir() if p.name in base_files} == base_files
+    assert retr.delta_count == 2
+
+    loaded = Retriever(index_path=path, mmap=mmap)
+    assert [c.id for c in loaded.clauses] == ["p:0", "p:1", "u:0", "u:1"]
+    assert loaded.delta_count == 2
+    assert loaded.retrieve("ambulance charges", top_k=1)[0].id == "u:0"
+
+    loaded.save(path)  # compaction
+    assert not DeltaLog(path).exists()
+    again = Retriever(index_path=path)
+    assert [c.id for c in again.clauses] == ["p:0", "p:1", "u:0", "u:1"]
+    assert again.delta_count == 0
+
+
+def test_torn_tail_is_ignored_and_trimmed(tmp_path):
+    log = DeltaLog(tmp_path / "store")
+    vectors = np.eye(2, 4, dtype="float32")
+    log.append(NEW, vectors, base=5)
+    # Crash mid-append: a vector row and half a record made it to disk
+    with open(log.vectors_path, "ab") as fp:
+        fp.write(np.ones(4, dtype="float32").tobytes())
+    with open(log.clauses_path, "ab") as fp:
+        fp.write(b'{"id": "u:2", "te')
+
+    clauses, read = log.read(base=5)
+    assert [c.id for c in clauses] == ["u:0", "u:1"]
+    np.testing.assert_array_equal(read, vectors)
+
+    log.append(BASE[:1], np.full((1, 4), 0.5, dtype="float32"), base=5)
+    clauses, read = log.read(base=5)
+    assert [c.id for c in clauses] == ["u:0", "u:1", "p:0"]
+    assert read.shape == (3, 4) and read[2, 0] == 0.5
+
+
+def test_log_for_another_base_is_ignored(tmp_path, fake_model):
+    path = tmp_path / "store"
+    retr = Retriever()
+    retr.fit(BASE)
+    retr.save(path)
+    # Log left over from before a compaction that already includes it
+    DeltaLog(path).append(NEW, retr.embed_clauses(NEW), base=1)
+
+    assert len(Retriever(index_path=path).clauses) == 2
+
+
+def test_append_without_base_falls_back_to_full_save(tmp_path, fake_model):
+    path = tmp_path / "store"
+    retr = Retriever()
+    _add(retr, BASE, path)
+
+    assert path.with_suffix(".faiss").exists() and not DeltaLog(path).exists()
+    retr.remove_clauses([0])
+    _add(retr, NEW[:1], path)  # positions changed: full save again
+    assert [c.id for c in Retriever(index_path=path).clauses] == ["p:1", "u:0"]
+
+
+def _ids(retr):
+    return [c.id for c in retr.clauses]
+
+
+def test_workers_append_to_one_sequence(tmp_path, fake_model):
+    path = tmp_path / "store"
+    _saved(path)
+    first, second = Retriever(index_path=path), Retriever(index_path=path)
+
+    _add(first, NEW[:1], path)
+    # The second worker's view is stale: it catches up before logging its clause
+    _add(second, NEW[1:], path)
+    assert _ids(second) == ["p:0", "p:1", "u:0", "u:1"]
+    assert _ids(Retriever(index_path=path)) == ["p:0", "p:1", "u:0", "u:1"]
+
+    # Readers pick up the log, and a base another worker compacted
+    assert first.refresh() and _ids(first) == _ids(second)
+    assert not first.refresh()
+    _add(first, BASE[:1], path, compact_at=3)
+    assert not DeltaLog(path).exists()
+    assert second.refresh()
+    assert _ids(second) == ["p:0", "p:1", "u:0", "u:1", "p:0"] and second.delta_count == 0
+    assert second.retrieve("ambulance charges", top_k=1)[0].id == "u:0"
+
+    # Clauses added but never persisted cannot be placed in another worker's sequence
+    first.add_clauses(NEW[:1])
+    _add(second, NEW[1:], path)
+    assert not first.refresh()
+    with pytest.raises(IndexChangedError):
+        _add(first, NEW[1:], path)
+    assert Retriever(index_path=path).delta_count == 1
+
+
+def test_append_waits_for_the_lock(tmp_path, fake_model):
+    path = tmp_path / "store"
+    retr = _saved(path)
+    vectors = retr.embed_clauses(NEW)
+
+    with DeltaLog(path).locked():  # e.g. another worker compacting
+        writer = threading.Thread(target=retr.append_delta, args=(path, NEW, vectors))
+        writer.start()
+        time.sleep(0.2)
+        assert writer.is_alive() and not DeltaLog(path).exists()
+    writer.join(5)
+    assert DeltaLog(path).count(len(BASE)) == 2
@@ -0,0 +1,105 @@
+"""Pooled, conditional document fetcher (against a local HTTP stand-in)."""
+import hashlib
+import time
+
+import pytest
+import requests
+
+from hackrx_llm.fetcher import DocumentFetcher, DocumentTooLarge
+
+
+def test_unchanged_document_is_revalidated_not_downloaded(tmp_path, http_site):
+    url = http_site.serve("/policy.pdf", b"version one", etag='"v1"')
+    fetcher = DocumentFetcher(tmp_path)
+
+    first = fetcher.fetch(url + "?sig=abc")
+    second = fetcher.fetch(url + "?sig=abc")
+
+    assert first.path.name.endswith("_policy.pdf")
+    assert first.path.read_bytes() == b"version one"
+    assert first.sha256 == hashlib.sha256(b"version one").hexdigest()
+    assert (first.not_modified, second.not_modified) == (False, True)
+    assert second.path == first.path and second.sha256 == first.sha256
+    assert http_site.requests[1][1]["If-None-Match"] == '"v1"'
+    # Both requests went over one kept-alive connection
+    assert len({client for _, _, client in http_site.requests}) == 1
+
+    http_site.serve("/policy.pdf", b"version two", etag='"v2"')
+    third = fetcher.fetch(url + "?sig=abc")
+    assert not third.not_modified and third.path.read_bytes() == b"version two"
+
+
+def test_resigned_urls_share_one_cache_entry(tmp_path, http_site):
+    url = http_site.serve("/policy.pdf", b"version one", etag='"v1"')
+    fetcher = DocumentFetcher(tmp_path)
+
+    first = fetcher.fetch(url + "?v=2&sv=2023-01-03&se=2025-01-01&sig=abc")
+    second = fetcher.fetch(url + "?v=2&sv=2023-01-03&se=2025-01-02&sig=def")
+    other = fetcher.fetch(url + "?v=3&X-Amz-Signature=xyz")
+
+    assert second.not_modified and second.path == first.path
+    assert not other.not_modified  # a different document version
+    assert other.path == first.path  # ...with the same bytes: one blob
+    assert sorted(p.suffix for p in tmp_path.iterdir()) == [".json", ".json", ".pdf"]
+
+
+def test_cache_evicts_least_recently_used(tmp_path, http_site):
+    urls = [http_site.serve(f"/doc{i}.pdf", bytes([i]) * 40, etag=f'"{i}"') for i in range(3)]
+    fetcher = DocumentFetcher(tmp_path, max_cache_bytes=100)
+    (tmp_path / "upload.pdf").write_bytes(b"y" * 500)  # not the cache's: never evicted
+
+    first = fetcher.fetch(urls[0])
+    time.sleep(0.01)
+    fetcher.fetch(urls[1])
+    time.sleep(0.01)
+    assert fetcher.fetch(urls[0]).not_modified  # doc0 used again: doc1 is now the oldest
+    time.sleep(0.01)
+    fetcher.fetch(urls[2])
+
+    blobs = sorted(p.name.split("_")[1] for p in tmp_path.glob("*_doc*.pdf"))
+    assert blobs == ["doc0.pdf", "doc2.pdf"]
+    assert (tmp_path / "upload.pdf").exists() and first.path.exists()
+    assert len(list(tmp_path.glob("*.json"))) == 2
+    assert not fetcher.fetch(urls[1]).not_modified  # evicted: downloaded again
+
+
+def test_last_modified_revalidation(tmp_path, http_site):
+    url = http_site.serve("/terms.docx", b"terms", last_modified="Wed, 01 Jan 2025 00:00:00 GMT")
+    fetcher = DocumentFetcher(tmp_path)
+
+    fetcher.fetch(url)
+    assert fetcher.fetch(url).not_modified
+    assert http_site.requests[1][1]["If-Modified-Since"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_size_cap(tmp_path, http_site, chunked):
+    url = http_site.serve("/big.pdf", b"x" * 300_000, chunked=chunked)
+    fetcher = DocumentFetcher(tmp_path, max_bytes=100_000)
+
+    with pytest.raises(DocumentTooLarge):
+        fetcher.fetch(url)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_timeout_and_http_errors(tmp_path, http_site):
+    url = http_site.serve("/slow.pdf", b"slow")
+    fetcher = DocumentFetcher(tmp_path, timeout=(1.0, 0.2), retries=0)
+
+    with pytest.raises(requests.HTTPError):
+        fetcher.fetch(http_site.base + "/missing.pdf")
+    http_site.delay = 0.5
+    with pytest.raises(requests.RequestException):
+        fetcher.fetch(url)
+
+
+def test_fetch_many_is_concurrent_and_ordered(tmp_path, http_site):
+    urls = [http_site.serve(f"/doc{i}.pdf", f"doc {i}".encode()) for i in range(4)]
+    http_site.delay = 0.3
+    fetcher = DocumentFetcher(tmp_path, max_workers=4)
+
+    started = time.monotonic()
+    results = fetcher.fetch_many(urls)
+
+    assert time.monotonic() - started < 4 * 0.3
+    assert [r.path.read_bytes() for r in results] == [f"doc {i}".encode() for i in range(4)]
@@ -0,0 +1,131 @@
+"""Index type selection, training and descriptor round-trip."""
+import faiss
+import pytest
+
+from hackrx_llm.indexes import IndexSpec
+from hackrx_llm.retriever import Retriever
+from hackrx_llm.schema import Clause
+
+_WORDS = "knee hip cataract surgery waiting period grace premium room rent maternity".split()
+
+
+def _corpus(n: int):
+    return [
+        Clause(
+            id=f"c{i}",
+            text=f"clause {i} {_WORDS[i % len(_WORDS)]} {_WORDS[(i * 7) % len(_WORDS)]} term{i % 50}",
+            source="pol.pdf",
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "ivf_pq", "hnsw_flat"])
+def test_index_types_roundtrip(fake_model, tmp_path, index_type):
+    clauses = _corpus(600)
+    spec = IndexSpec(index_type=index_type, pq_m=8, nprobe=4, ef_search=32)
+    retr = Retriever(index_spec=spec)
+    retr.fit(clauses)
+
+    top = retr.retrieve(clauses[42].text, top_k=3, nprobe=64, ef_search=128)
+    assert top[0].id == "c42"
+
+    prefix = tmp_path / "store"
+    retr.save(prefix)
+    loaded = Retriever(index_path=prefix)
+    assert loaded.index_spec.index_type == index_type
+    assert loaded.index_spec.nprobe == 4
+    assert loaded.index_spec.ef_search == 32
+    assert loaded.index_spec.dim == 256
+    assert [c.id for c in loaded.retrieve(clauses[42].text, top_k=3)]
+
+
+def test_nlist_derived_from_corpus_size(fake_model):
+    retr = Retriever(index_spec=IndexSpec(index_type="ivf_flat"))
+    retr.fit(_corpus(400))
+    small = faiss.extract_index_ivf(retr.index).nlist
+    assert 1 <= small <= 400 // 39
+
+    # Derived per build, never written back: a larger corpus gets more cells
+    assert retr.index_spec.nlist is None
+    retr.fit(_corpus(2000))
+    assert faiss.extract_index_ivf(retr.index).nlist > small
+
+
+def test_ivf_stays_flat_until_trainable(fake_model, tmp_path):
+    clauses = _corpus(400)
+    retr = Retriever(index_spec=IndexSpec(index_type="ivf_flat"))
+    retr.add_clauses(clauses[:10])
+    assert not retr.index_spec.is_built(retr.index)
+    assert retr.retrieve(clauses[3].text, top_k=1)[0].id == "c3"
+    retr.save(tmp_path / "store")
+    assert Retriever(index_path=tmp_path / "store", mmap=True).retrieve(clauses[3].text, top_k=1)[0].id == "c3"
+
+    retr.add_clauses(clauses[10:])
+    assert retr.index_spec.is_built(retr.index)
+    assert faiss.extract_index_ivf(retr.index).nlist > 1
+    assert retr.index.ntotal == 400
+    assert retr.retrieve(clauses[3].text, top_k=1, nprobe=64)[0].id == "c3"
+
+
+def test_unknown_index_type_rejected():
+    with pytest.raises(ValueError):
+        IndexSpec(index_type="lsh")
+
+
+def test_legacy_index_without_descriptor_is_flat(fake_model, tmp_path):
+    retr = Retriever()
+    retr.fit(_corpus(20))
+    prefix = tmp_path / "store"
+    retr.save(prefix)
+    prefix.with_suffix(".index.json").unlink()
+    assert Retriever(index_path=prefix).index_spec.index_type == "flat"
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "ivf_pq", "hnsw_flat"])
+@pytest.mark.parametrize("mmap", [False, True])
+def test_writes_publish_new_snapshot(fake_model, tmp_path, index_type, mmap):
+    clauses = _corpus(600)
+    retr = Retriever(index_spec=IndexSpec(index_type=index_type, pq_m=8))
+    retr.fit(clauses[:500])
+    retr.save(tmp_path / "store")
+    live = Retriever(index_path=tmp_path / "store", mmap=mmap)
+    before = live._snapshot
+
+    live.add_clauses(clauses[500:])
+    live.remove_clauses([0])
+
+    # Searches holding the old snapshot keep a consistent (index, clauses) pair
+    assert before.index.ntotal == len(before.clauses) == 500
+    assert live.index.ntotal == len(live.clauses) == 599
+    assert live.retrieve(clauses[550].text, top_k=3, nprobe=64, ef_search=128)[0].id == "c550"
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat", "hnsw_flat"])
+@pytest.mark.parametrize("mmap", [False, True])
+def test_additions_leave_base_untouched_until_compaction(fake_model, tmp_path, index_type, mmap):
+    clauses = _corpus(600)
+    retr = Retriever(index_spec=IndexSpec(index_type=index_type))
+    retr.fit(clauses[:500])
+    retr.save(tmp_path / "store")
+    live = Retriever(index_path=tmp_path / "store", mmap=mmap)
+    base = live._snapshot
+
+    for start in range(500, 600, 20):
+        live.add_clauses(clauses[start:start + 20])
+    # The base was neither copied nor unmapped; the uploads sit in the delta
+    assert live.index is base.index and live._snapshot.mapped == mmap
+    assert live._snapshot.delta.ntotal == 100 and live.ntotal == 600
+
+    queries = [clauses[i].text for i in (7, 350, 510, 599)]
+    hits = live.retrieve_many(queries, top_k=3, nprobe=64, ef_search=128)
+    assert [h[0][0].id for h in hits] == ["c7", "c350", "c510", "c599"]
+    assert all(h[0][1] >= h[1][1] >= h[2][1] for h in hits)
+
+    # Compaction merges the delta into a new base
+    live.save(tmp_path / "store")
+    assert live._snapshot.delta is None and live.index.ntotal == 600
+    assert live._snapshot.mapped == mmap
+    assert [h[0][0].id for h in live.retrieve_many(queries, top_k=3, nprobe=64, ef_search=128)] == [
+        "c7", "c350", "c510", "c599"
+    ]
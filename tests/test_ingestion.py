@@ -0,0 +1,93 @@
+"""Document ingestion: directory walking, loader dispatch and parallel parsing."""
+from pathlib import Path
+
+import pytest
+
+from hackrx_llm import ingestion
+from hackrx_llm.ingestion import BaseLoader, get_loader_for, ingest_dir, iter_supported_files
+from hackrx_llm.ingestion.email_loader import EmailLoader
+from hackrx_llm.ingestion.pdf_loader import PDFLoader
+
+
+def _write_emails(root, n):
+    for i in range(n):
+        sub = root / f"batch{i % 3}"
+        sub.mkdir(exist_ok=True)
+        (sub / f"mail{i:02d}.eml").write_text(f"Subject: s{i}\n\nClaim note number {i}.\n", encoding="utf-8")
+    (root / "notes.xyz").write_text("unsupported", encoding="utf-8")
+
+
+def test_parallel_ingest_is_deterministic(tmp_path):
+    _write_emails(tmp_path, 12)
+
+    serial = ingest_dir(tmp_path)
+    parallel = ingest_dir(tmp_path, workers=4)
+
+    assert parallel == serial
+    assert [c.source for c in serial] == [str(f) for f in iter_supported_files(tmp_path)]
+    assert len(serial) == 12
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    """Isolate loader registrations made by a test."""
+    monkeypatch.setattr(ingestion, "_BY_EXTENSION", dict(ingestion._BY_EXTENSION))
+    monkeypatch.setattr(ingestion, "_BY_MIME", dict(ingestion._BY_MIME))
+    return ingestion
+
+
+def test_dispatch_by_extension_and_registration(tmp_path, registry):
+    assert get_loader_for(Path("a/b/Policy.PDF")) is PDFLoader
+    assert get_loader_for(Path("notes.xyz")) is None
+
+    class QuietPDFLoader(PDFLoader):  # inherits extensions: must not take over *.pdf
+        pass
+
+    class TextLoader(BaseLoader):
+        extensions = ["txt"]
+
+        def load(self):
+            yield self.path.read_text(encoding="utf-8"), {"source": str(self.path)}
+
+    assert get_loader_for(Path("x.pdf")) is PDFLoader
+    assert get_loader_for(Path("x.txt")) is TextLoader
+
+    (tmp_path / "a.txt").write_text("Maternity cover after nine months.", encoding="utf-8")
+    assert [c.text for c in ingest_dir(tmp_path)] == ["Maternity cover after nine months."]
+
+
+def test_extensionless_files_are_sniffed(tmp_path):
+    pytest.importorskip("magic")
+    mail = tmp_path / "claim_note"
+    mail.write_text(
+        "From: a@b.com\nTo: c@d.com\nSubject: claim\nDate: Mon, 1 Jan 2024 10:00:00 +0000\n\nClaim body.\n",
+        encoding="utf-8",
+    )
+    (tmp_path / "README").write_text("just some text\n", encoding="utf-8")
+
+    assert get_loader_for(mail) is EmailLoader
+    assert list(iter_supported_files(tmp_path)) == [mail]
+
+
+def test_entry_point_plugins(registry, monkeypatch):
+    class PPTXLoader(BaseLoader):
+        def load(self):
+            return iter(())
+
+    PPTXLoader.extensions = ["pptx"]
+
+    class _EntryPoint:
+        def __init__(self, name, target):
+            self.name, self._target = name, target
+
+        def load(self):
+            if isinstance(self._target, Exception):
+                raise self._target
+            return self._target
+
+    plugins = [_EntryPoint("pptx", PPTXLoader), _EntryPoint("broken", ImportError("nope")), _EntryPoint("bad", len)]
+    monkeypatch.setattr(ingestion, "entry_points", lambda group: plugins if group == ingestion.PLUGIN_GROUP else [])
+    monkeypatch.setattr(ingestion, "_plugins_loaded", False)
+
+    assert get_loader_for(Path("deck.pptx")) is PPTXLoader
+    assert get_loader_for(Path("x.pdf")) is PDFLoader
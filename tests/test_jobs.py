@@ -0,0 +1,158 @@
+"""Background upload ingestion (job queue + webapp endpoints)."""
+import importlib
+import io
+import time
+from pathlib import Path
+
+import pytest
+
+from hackrx_llm.jobs import IngestJobQueue, JobStore
+from hackrx_llm.retriever import Retriever
+from hackrx_llm.schema import Clause
+
+
+def _eml(path, body):
+    path.write_text(f"Subject: upload\n\n{body}\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def retriever(fake_model):
+    retr = Retriever()
+    retr.fit([Clause(id="base:0", text="Room rent is capped at one percent.", source="base")])
+    return retr
+
+
+def test_job_merges_all_files_at_once(tmp_path, retriever):
+    merged = []
+    def merge(retr, clauses, embeddings):
+        retr.add_clauses(clauses, embeddings)
+        merged.append(len(retr.clauses))
+
+    jobs = IngestJobQueue(retriever, merge=merge)
+    files = [_eml(tmp_path / "a.eml", "Cataract waiting period is two years."),
+             _eml(tmp_path / "b.eml", "Ambulance charges are covered up to 2000.")]
+
+    job = jobs.submit(files)
+    assert job.state in ("queued", "running", "done")
+    assert jobs.join(timeout=30)
+
+    status = jobs.get(job.id)
+    assert status.state == "done"
+    assert (status.files_done, status.clauses_added, status.errors) == (2, 2, [])
+    assert merged == [3]  # one merge for the whole job
+    assert retriever.retrieve("ambulance charges", top_k=1)[0].source == str(files[1])
+
+
+def test_failed_files_are_reported_and_removed(tmp_path, retriever):
+    jobs = IngestJobQueue(retriever, inline=True)
+    broken = tmp_path / "broken.pdf"
+    broken.write_bytes(b"not a pdf")
+
+    status = jobs.submit([broken])
+
+    assert status.state == "failed"
+    assert status.clauses_added == 0
+    assert status.errors and "broken.pdf" in status.errors[0]
+    assert not broken.exists()
+    assert len(retriever.clauses) == 1
+    assert jobs.get("nope") is None
+
+
+def test_job_fails_when_saving_fails(tmp_path, retriever):
+    def save(retr, clauses, embeddings):
+        raise OSError("disk full")
+
+    jobs = IngestJobQueue(retriever, merge=save, inline=True)
+    status = jobs.submit([_eml(tmp_path / "a.eml", "Cataract waiting period is two years.")])
+
+    assert status.state == "failed" and status.clauses_added == 0
+    assert status.errors == ["Error updating index: disk full"]
+
+
+def test_job_status_shared_between_workers(tmp_path, retriever):
+    # Two server workers: the upload lands on one, polls may reach the other
+    db = tmp_path / "store.jobs.sqlite"
+    running = IngestJobQueue(retriever, store=JobStore(db))
+    other = IngestJobQueue(retriever, store=JobStore(db))
+
+    job = running.submit([_eml(tmp_path / "a.eml", "Cataract waiting period is two years.")])
+    assert other.get(job.id).files == ["a.eml"]
+    assert running.join(timeout=30)
+    assert other.get(job.id).state == "done"
+
+    later = running.submit([_eml(tmp_path / "b.eml", "Ambulance charges are covered.")])
+    running.join(timeout=30)
+    assert other.get(later.id).clauses_added == 1
+    assert other.get("nope") is None
+
+    # Finished jobs beyond max_history are forgotten
+    JobStore(db, max_history=1).put(running.get(later.id))
+    assert other.get(job.id) is None and other.get(later.id) is not None
+
+
+def test_upload_endpoint_returns_job(tmp_path, monkeypatch, fake_model):
+    monkeypatch.setenv("DOCS_DIR", str(tmp_path / "docs"))
+    monkeypatch.setenv("INDEX_PATH", str(tmp_path / "index" / "store"))
+    monkeypatch.setenv("INDEX_MMAP", "0")
+    from hackrx_llm import webapp
+
+    webapp = importlib.reload(webapp)
+    monkeypatch.setattr(webapp, "warmup", lambda *a, **kw: None)
+    client = webapp.create_app().test_client()
+
+    resp = client.post(
+        "/api/upload",
+        data={"files": (io.BytesIO(b"Subject: x\n\nDaycare procedures are covered.\n"), "note.eml")},
+        content_type="multipart/form-data",
+    )
+    assert resp.status_code == 202
+    url = resp.get_json()["status_url"]
+
+    deadline = time.monotonic() + 30
+    while (job := client.get(url).get_json())["state"] in ("queued", "running"):
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert job["state"] == "done" and job["clauses_added"] == 1 and job["progress"] == 1.0
+    assert (tmp_path / "index" / "store.faiss").exists()
+    assert client.get("/api/jobs/unknown").status_code == 404
+
+
+def test_uploads_on_two_workers_both_persist(tmp_path, monkeypatch, fake_model):
+    # Two gunicorn workers: separate app instances sharing one index path
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    _eml(docs / "base.eml", "Room rent is capped at one percent.")
+    monkeypatch.setenv("DOCS_DIR", str(docs))
+    monkeypatch.setenv("INDEX_PATH", str(tmp_path / "index" / "store"))
+    monkeypatch.setenv("INDEX_MMAP", "0")
+    from hackrx_llm import webapp
+
+    webapp = importlib.reload(webapp)
+    monkeypatch.setattr(webapp, "warmup", lambda *a, **kw: None)
+    first, second = webapp.create_app().test_client(), webapp.create_app().test_client()
+
+    def upload(client, name, body):
+        resp = client.post(
+            "/api/upload",
+            data={"files": (io.BytesIO(f"Subject: x\n\n{body}\n".encode()), name)},
+            content_type="multipart/form-data",
+        )
+        url = resp.get_json()["status_url"]
+        deadline = time.monotonic() + 30
+        while (job := client.get(url).get_json())["state"] in ("queued", "running"):
+            assert time.monotonic() < deadline
+            time.sleep(0.05)
+        return job
+
+    def top(client, query):
+        return client.post("/api/ask", json={"query": query, "top_k": 1}).get_json()["clauses"][0]["source"]
+
+    assert upload(first, "a.eml", "Ambulance charges are covered up to 2000.")["state"] == "done"
+    assert upload(second, "b.eml", "Organ donor expenses are payable.")["state"] == "done"
+
+    on_disk = Retriever(index_path=tmp_path / "index" / "store")
+    assert [Path(c.source).name for c in on_disk.clauses] == ["base.eml", "a.eml", "b.eml"]
+    for client in (first, second):
+        assert Path(top(client, "ambulance charges")).name == "a.eml"
+        assert Path(top(client, "organ donor expenses")).name == "b.eml"
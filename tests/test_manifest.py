@@ -0,0 +1,110 @@
+"""Incremental ingest: manifest diffing and in-place index updates."""
+import importlib
+
+import pytest
+from typer.testing import CliRunner
+
+from hackrx_llm.cli import app
+from hackrx_llm.ingestion import ingest_dir
+from hackrx_llm.ingestion.manifest import Manifest
+from hackrx_llm.retriever import Retriever
+
+
+def _encoded():
+    """Texts encoded so far by the (fake) registry models."""
+    from hackrx_llm import embeddings
+
+    return sum(m.encoded for m in embeddings._models.values())
+
+
+def _eml(path, body):
+    path.write_text(f"Subject: policy\n\n{body}\n", encoding="utf-8")
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw_flat"])
+def test_incremental_matches_full_build(fake_model, tmp_path, index_type):
+    docs, index = tmp_path / "docs", tmp_path / "idx" / "store"
+    docs.mkdir()
+    _eml(docs / "a.eml", "Knee surgery is covered after 2 years.")
+    _eml(docs / "b.eml", "Cataract surgery is covered up to Rs 40000.")
+    _eml(docs / "c.eml", "Maternity is covered after 24 months.")
+
+    runner = CliRunner()
+    base = ["ingest", "--docs", str(docs), "--index", str(index), "--index-type", index_type]
+    assert runner.invoke(app, base).exit_code == 0
+    assert set(Manifest.load(index).files) == {"a.eml", "b.eml", "c.eml"}
+
+    # Delete one, modify one, add one
+    (docs / "a.eml").unlink()
+    _eml(docs / "b.eml", "Cataract surgery is covered up to Rs 60000 per eye.")
+    _eml(docs / "d.eml", "Room rent is capped at 1% of the sum insured.")
+
+    encoded_before = _encoded()
+    result = runner.invoke(app, base + ["--incremental"])
+    assert result.exit_code == 0, result.output
+    assert "1 added, 1 modified, 1 deleted, 1 unchanged" in " ".join(result.output.split())
+    assert _encoded() - encoded_before == 2  # only b.eml and d.eml text
+
+    updated = Retriever(index_path=index)
+    full = ingest_dir(docs)
+    assert sorted(c.id for c in updated.clauses) == sorted(c.id for c in full)
+    assert updated.index.ntotal == len(full)
+    for clause in full:
+        assert updated.retrieve(clause.text, top_k=1)[0].text == clause.text
+
+    manifest = Manifest.load(index)
+    assert {rel: (e.start, e.count) for rel, e in manifest.files.items()} == {
+        "c.eml": (0, 1),
+        "b.eml": (1, 1),
+        "d.eml": (2, 1),
+    }
+
+    # Nothing changed → nothing parsed or embedded
+    encoded_before = _encoded()
+    assert "0 added, 0 modified, 0 deleted, 3 unchanged" in " ".join(runner.invoke(app, base + ["--incremental"]).output.split())
+    assert _encoded() == encoded_before
+
+
+def test_streamed_build_records_manifest(fake_model, tmp_path):
+    docs, index = tmp_path / "docs", tmp_path / "idx" / "store"
+    docs.mkdir()
+    for name in ("a", "b", "c"):
+        _eml(docs / f"{name}.eml", f"Policy clause {name}.")
+
+    runner = CliRunner()
+    base = ["ingest", "--docs", str(docs), "--index", str(index), "--no-embed-cache"]
+    result = runner.invoke(app, base + ["--stream", "--batch-size", "2"])
+    assert result.exit_code == 0, result.output
+    assert {rel: (e.start, e.count) for rel, e in Manifest.load(index).files.items()} == {
+        "a.eml": (0, 1),
+        "b.eml": (1, 1),
+        "c.eml": (2, 1),
+    }
+    output = runner.invoke(app, base + ["--incremental"]).output
+    assert "3 unchanged" in " ".join(output.split())
+
+
+def test_web_uploads_are_recorded(fake_model, tmp_path, monkeypatch):
+    docs, index = tmp_path / "docs", tmp_path / "idx" / "store"
+    docs.mkdir()
+    _eml(docs / "a.eml", "Knee surgery is covered after 2 years.")
+    runner = CliRunner()
+    base = ["ingest", "--docs", str(docs), "--index", str(index)]
+    assert runner.invoke(app, base).exit_code == 0
+
+    monkeypatch.setenv("DOCS_DIR", str(docs))
+    monkeypatch.setenv("INDEX_PATH", str(index))
+    monkeypatch.setenv("INDEX_MMAP", "0")
+    from hackrx_llm import webapp
+
+    webapp = importlib.reload(webapp)
+    monkeypatch.setattr(webapp, "warmup", lambda *a, **kw: None)
+    retriever = Retriever(index_path=index)
+    _eml(webapp.UPLOAD_DIR / "u.eml", "Ambulance charges are covered.")
+    clauses = ingest_dir(webapp.UPLOAD_DIR)
+    webapp._persist(retriever, clauses, retriever.embed_clauses(clauses))
+
+    assert Manifest.load(index).files["uploads/u.eml"].start == 1
+    output = runner.invoke(app, base + ["--incremental"]).output
+    assert "0 added, 0 modified, 0 deleted, 2 unchanged" in " ".join(output.split())
+    assert len(Retriever(index_path=index).clauses) == 2
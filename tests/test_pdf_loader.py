@@ -0,0 +1,76 @@
+"""PDF extraction backends and the pdfplumber fallback."""
+import tracemalloc
+
+import pytest
+from PyPDF2 import PageObject
+
+from hackrx_llm.ingestion.pdf_loader import PDFLoader, looks_garbled, normalize_text
+
+from .conftest import make_pdf
+
+PAGES = [
+    ["1. Accident:- An unforeseen event", "caused by external means."],
+    [],
+    ["2. Hospital:- Any institution registered", "with the local authorities."],
+]
+
+
+def test_fast_path_matches_pdfplumber(tmp_path):
+    pdf = make_pdf(tmp_path / "policy.pdf", PAGES)
+
+    fast = PDFLoader(pdf)
+    slow = PDFLoader(pdf, backend="pdfplumber")
+    fast_pages, slow_pages = list(fast), list(slow)
+
+    assert [meta["page"] for _, meta in fast_pages] == [1, 3]
+    assert fast_pages == slow_pages
+    assert fast.stats["pypdf2"]["pages"] == 3
+    assert fast.stats["pdfplumber"]["pages"] == 1  # only the blank page is retried
+    assert slow.stats["pypdf2"]["pages"] == 0
+
+
+def test_garbled_pages_fall_back_to_pdfplumber(tmp_path, monkeypatch):
+    pdf = make_pdf(tmp_path / "policy.pdf", PAGES)
+    monkeypatch.setattr(PageObject, "extract_text", lambda self, *a, **kw: "(cid:12)(cid:7)")
+
+    loader = PDFLoader(pdf)
+    texts = [text for text, _ in loader]
+
+    assert texts[0].startswith("1. Accident:-")
+    assert loader.stats["pdfplumber"]["pages"] == 3
+
+
+def test_garbled_heuristics():
+    assert looks_garbled("")
+    assert looks_garbled("abc � def")
+    assert looks_garbled("\x01\x02\x03\x04 ok")
+    assert looks_garbled("Thepolicyholdershallnotifythecompanywithinthirtydaysofdischarge")
+    assert not looks_garbled("Co-payment of 20% applies – see Table “A” • ₹5,000 limit.")
+    assert normalize_text("  A   B \n\n  \n C  D  ") == "A B\nC D"
+
+
+def test_unknown_backend_rejected(tmp_path):
+    with pytest.raises(ValueError):
+        PDFLoader(tmp_path / "x.pdf", backend="ocr")
+
+
+def _peak_bytes(pdf, backend):
+    tracemalloc.start()
+    try:
+        for _ in PDFLoader(pdf, backend=backend):
+            pass
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize("backend", ["pypdf2", "pdfplumber"])
+def test_memory_does_not_grow_with_page_count(tmp_path, backend):
+    line = "The insured shall notify the company of any claim within thirty days of discharge."
+    short = make_pdf(tmp_path / "short.pdf", [[f"{i} {line}"] * 6 for i in range(10)])
+    long = make_pdf(tmp_path / "long.pdf", [[f"{i} {line}"] * 6 for i in range(40)])
+
+    _peak_bytes(short, backend)  # warm module-level caches
+    growth_per_page = (_peak_bytes(long, backend) - _peak_bytes(short, backend)) / 30
+    # Only page-tree bookkeeping may accumulate, not per-page text or layout objects
+    assert growth_per_page < 16 * 1024
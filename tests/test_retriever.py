@@ -0,0 +1,185 @@
+"""Retriever query-side behaviour (batching, scores, ordering)."""
+from hackrx_llm.retriever import Retriever
+from hackrx_llm.schema import Clause
+
+_CLAUSES = [
+    Clause(id="grace", text="A grace period of thirty days is allowed for premium payment.", source="p.pdf"),
+    Clause(id="ped", text="Pre-existing diseases are covered after a waiting period of 36 months.", source="p.pdf"),
+    Clause(id="cataract", text="Cataract surgery is covered up to Rs 40000 per eye.", source="p.pdf"),
+    Clause(id="maternity", text="Maternity expenses are covered after 24 months of continuous cover.", source="p.pdf"),
+]
+
+
+def _fitted():
+    retr = Retriever()
+    retr.fit(_CLAUSES)
+    return retr
+
+
+def test_retrieve_many_single_batch(fake_model):
+    retr = _fitted()
+    calls_before = retr.model.calls
+
+    hits = retr.retrieve_many(["grace period premium payment", "cataract surgery eye", "maternity cover"], top_k=2)
+
+    assert retr.model.calls == calls_before + 1
+    assert [h[0][0].id for h in hits] == ["grace", "cataract", "maternity"]
+    for query_hits in hits:
+        assert len(query_hits) == 2
+        assert query_hits[0][1] >= query_hits[1][1]
+
+
+def test_retrieve_matches_retrieve_many(fake_model):
+    retr = _fitted()
+    query = "waiting period for pre-existing diseases"
+    assert retr.retrieve(query, top_k=3) == [c for c, _ in retr.retrieve_many([query], top_k=3)[0]]
+    assert retr.retrieve_many([], top_k=3) == []
+
+
+def test_retrievers_share_one_model(fake_model):
+    from hackrx_llm import embeddings
+
+    first, second = Retriever(), Retriever()
+    assert first.model is second.model
+    assert Retriever(device="cpu").model is not first.model
+    assert len(embeddings.loaded_models()) == 2
+
+    warmed = embeddings.warmup()
+    assert warmed is first.model and warmed.calls == 1
+
+
+def test_query_cache_skips_model(fake_model):
+    retr = _fitted()
+    retr.retrieve("Cataract surgery", top_k=1)
+    encoded = retr.model.encoded
+
+    # Same query modulo case/whitespace is served from the cache
+    assert retr.retrieve("  cataract   SURGERY ", top_k=1)[0].id == "cataract"
+    assert retr.model.encoded == encoded
+    assert retr.query_cache.stats()["hits"] == 1
+
+    # Mixed batch: only the unseen query reaches the model
+    retr.retrieve_many(["cataract surgery", "maternity cover"], top_k=1)
+    assert retr.model.encoded == encoded + 1
+
+
+def test_query_cache_encodes_original_text(fake_model, monkeypatch):
+    retr = _fitted()
+    seen = []
+    encode = retr.model.encode
+    monkeypatch.setattr(retr.model, "encode", lambda texts, **kw: seen.extend(texts) or encode(texts, **kw))
+
+    vectors = retr.embed_queries(["Is NCB  Applicable?", "is ncb applicable?"])
+    # Normalised only for the cache key; a cased model gets the text as asked
+    assert seen == ["Is NCB  Applicable?"]
+    assert (vectors[0] == vectors[1]).all()
+
+
+def test_query_cache_ttl_and_opt_out(fake_model, monkeypatch):
+    import hackrx_llm.embeddings as emb
+
+    now = [1000.0]
+    monkeypatch.setattr(emb.time, "monotonic", lambda: now[0])
+    cache = emb.QueryEmbeddingCache(maxsize=2, ttl=10)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.put("c", 3)
+    assert cache.get("a") is None and cache.evictions == 1
+    now[0] += 11
+    assert cache.get("c") is None
+
+    retr = Retriever(query_cache_size=0)
+    retr.fit(_CLAUSES)
+    retr.retrieve("grace period", top_k=1)
+    retr.retrieve("grace period", top_k=1)
+    assert len(retr.query_cache) == 0 and retr.query_cache.stats()["hits"] == 0
+
+
+def test_embedding_cache_skips_unchanged_clauses(fake_model, tmp_path):
+    cache_path = tmp_path / "store.embcache.sqlite"
+    first = Retriever(embedding_cache=cache_path)
+    first.fit(_CLAUSES)
+    assert first.model.encoded == len(_CLAUSES)
+
+    # A fresh process-equivalent: new registry model, same on-disk cache
+    import hackrx_llm.embeddings as emb
+
+    emb._models.clear()
+    extra = Clause(id="room", text="Room rent is capped at 1% of sum insured.", source="p.pdf")
+    second = Retriever(embedding_cache=cache_path)
+    second.fit(_CLAUSES + [extra])
+    assert second.model.encoded == 1
+    assert second.embedding_cache.stats() == {"hits": len(_CLAUSES), "misses": 1}
+    assert second.retrieve("room rent sum insured", top_k=1)[0].id == "room"
+
+
+def test_build_stream_matches_fit(fake_model, tmp_path):
+    from hackrx_llm.clause_store import ClauseStore
+    from hackrx_llm.indexes import IndexSpec
+
+    corpus = [Clause(id=f"c{i}", text=f"clause {i} covers item{i} and term{i % 7}", source="p.pdf") for i in range(300)]
+    pulled = []
+
+    def stream():
+        for clause in corpus:
+            pulled.append(clause.id)
+            yield clause
+
+    retr = Retriever(index_spec=IndexSpec(index_type="ivf_flat", train_size=100, nprobe=64))
+    assert retr.build_stream(stream(), tmp_path / "store", batch_size=32) == 300
+    assert len(pulled) == 300
+    assert isinstance(retr.clauses, ClauseStore) and list(retr.clauses) == corpus
+    assert retr.index.ntotal == 300
+    assert retr.retrieve(corpus[123].text, top_k=1)[0].id == "c123"
+
+    loaded = Retriever(index_path=tmp_path / "store")
+    assert loaded.index_spec.index_type == "ivf_flat"
+    assert loaded.retrieve(corpus[7].text, top_k=1, nprobe=64)[0].id == "c7"
+
+
+def test_build_stream_failure_leaves_no_partial_store(fake_model, tmp_path):
+    import pytest
+
+    def broken():
+        yield _CLAUSES[0]
+        raise RuntimeError("parser crashed")
+
+    with pytest.raises(RuntimeError):
+        Retriever().build_stream(broken(), tmp_path / "store", batch_size=1)
+    assert [p.name for p in tmp_path.iterdir()] == ["store.delta.lock"]  # the lock file is kept
+
+
+def test_readers_never_block_or_see_torn_state(fake_model):
+    import threading
+
+    retr = _fitted()
+    errors = []
+    stop = threading.Event()
+
+    def reader():
+        while not stop.is_set():
+            snap = retr._snapshot
+            if snap.ntotal != len(snap.clauses):
+                errors.append((snap.ntotal, len(snap.clauses)))
+            for hits in retr.retrieve_many(["grace period", "extra clause"], top_k=4):
+                if any(clause is None for clause, _ in hits):
+                    errors.append(hits)
+
+    threads = [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for i in range(50):
+        retr.add_clauses([Clause(id=f"extra{i}", text=f"extra clause number {i}", source="u.pdf")])
+    stop.set()
+    for t in threads:
+        t.join()
+    assert errors == []
+    assert len(retr.clauses) == retr.ntotal == 54
+
+    # A writer holding the lock (e.g. a long ingest) does not stall searches
+    with retr._write_lock:
+        done = []
+        t = threading.Thread(target=lambda: done.append(retr.retrieve("grace period", top_k=1)))
+        t.start()
+        t.join(timeout=10)
+        assert done and done[0][0].id == "grace"
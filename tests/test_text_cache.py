@@ -0,0 +1,71 @@
+"""Extracted-text cache shared by the PDF and DOCX loaders."""
+import pickle
+
+from hackrx_llm.ingestion import ingest_dir
+from hackrx_llm.ingestion.chunking import Chunker
+from hackrx_llm.ingestion.pdf_loader import PDFLoader
+from hackrx_llm.ingestion.text_cache import ExtractedTextCache
+
+from .conftest import make_pdf
+
+
+def _count_loads(monkeypatch):
+    calls = []
+    original = PDFLoader.load
+
+    def counting(self):
+        calls.append(self.path.name)
+        return original(self)
+
+    monkeypatch.setattr(PDFLoader, "load", counting)
+    return calls
+
+
+def test_unchanged_files_are_not_reparsed(tmp_path, monkeypatch):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    make_pdf(docs / "a.pdf", [["Room rent is capped at one percent of sum insured."], ["Second page."]])
+    make_pdf(docs / "b.pdf", [["Cataract surgery has a two year waiting period."]])
+    cache = ExtractedTextCache(tmp_path / "text.sqlite")
+    calls = _count_loads(monkeypatch)
+
+    first = ingest_dir(docs, text_cache=cache)
+    # A different chunker re-splits the cached text without parsing
+    rechunked = ingest_dir(docs, text_cache=cache, chunker=Chunker(max_tokens=5, overlap=0))
+
+    assert calls == ["a.pdf", "b.pdf"]
+    assert cache.stats() == {"hits": 2, "misses": 2}
+    assert [c.text for c in ingest_dir(docs, text_cache=cache)] == [c.text for c in first]
+    assert len(rechunked) > len(first)
+
+    make_pdf(docs / "b.pdf", [["Cataract surgery has a one year waiting period."]])
+    changed = ingest_dir(docs, text_cache=cache)
+
+    assert calls[2:] == ["b.pdf"]
+    assert "one year" in changed[-1].text
+
+
+def test_extractor_version_is_part_of_the_key(tmp_path, monkeypatch):
+    pdf = make_pdf(tmp_path / "a.pdf", [["Ambulance cover up to 2000."]])
+    cache = ExtractedTextCache(tmp_path / "text.sqlite")
+    calls = _count_loads(monkeypatch)
+
+    list(PDFLoader(pdf, text_cache=cache))
+    list(PDFLoader(pdf, text_cache=cache, backend="pdfplumber"))
+    list(PDFLoader(pdf, text_cache=cache, backend="pdfplumber"))
+
+    assert len(calls) == 2
+
+
+def test_cache_is_shared_with_worker_processes(tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(4):
+        make_pdf(docs / f"p{i}.pdf", [[f"Policy page {i}."]])
+    cache = ExtractedTextCache(tmp_path / "text.sqlite")
+
+    parallel = ingest_dir(docs, workers=2, text_cache=pickle.loads(pickle.dumps(cache)))
+    serial = ingest_dir(docs, text_cache=cache)
+
+    assert parallel == serial
+    assert cache.stats()["hits"] == 4
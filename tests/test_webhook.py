@@ -0,0 +1,254 @@
+"""/hackrx/run webhook: per-document indexes, batched retrieval, concurrent answering."""
+import threading
+import time
+
+import pytest
+from langchain_core.runnables import RunnableLambda
+
+from hackrx_llm import webhook
+from hackrx_llm.answer_cache import AnswerCache
+from hackrx_llm.context import ContextBuilder
+from hackrx_llm.document_cache import DocumentIndexCache
+from hackrx_llm.embeddings import get_model
+from hackrx_llm.fetcher import DocumentFetcher
+from hackrx_llm.ingestion.chunking import approx_token_count
+from hackrx_llm.schema import Clause
+
+from .conftest import make_pdf
+
+_CLAUSES = [
+    Clause(id="grace", text="A grace period of thirty days is allowed for premium payment.", source="p.pdf"),
+    Clause(id="ped", text="Pre-existing diseases are covered after 36 months.", source="p.pdf"),
+    Clause(id="cataract", text="Cataract surgery is covered up to Rs 40000 per eye.", source="p.pdf"),
+]
+
+
+class FakeLLM:
+    """Answers with the first context line after a delay; fails on 'boom'."""
+
+    def __init__(self, delay=0.2):
+        self.delay = delay
+        self.calls = 0
+        self.in_flight = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt_value):
+        text = prompt_value.to_string()
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak = max(self.peak, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            if "boom" in text:
+                raise RuntimeError("LLM unavailable")
+            return text.split("Document 1:\n")[1].split("\n")[0]
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+@pytest.fixture
+def client(fake_model, monkeypatch, tmp_path, http_site):
+    llm = FakeLLM()
+    # The policy, one clause per page
+    policy = make_pdf(tmp_path / "policy.pdf", [[c.text] for c in _CLAUSES]).read_bytes()
+    http_site.serve("/policy.pdf", policy, etag='"p1"')
+
+    monkeypatch.setattr(webhook, "llm", RunnableLambda(llm))
+    monkeypatch.setattr(webhook, "answer_chain", webhook.get_answer_chain())
+    ready = threading.Event()
+    ready.set()
+    monkeypatch.setattr(webhook, "_ready", ready)
+    monkeypatch.setattr(webhook, "fetcher", DocumentFetcher(tmp_path / "blobs"))
+    monkeypatch.setattr(webhook, "doc_indexes", DocumentIndexCache(maxsize=4, ttl=3600))
+    monkeypatch.setattr(webhook, "answer_cache", AnswerCache(webhook.PROMPT_VERSION, threshold=0.75))
+    monkeypatch.setattr(webhook, "context_builder", ContextBuilder(1500, token_counter=approx_token_count))
+    monkeypatch.setenv("API_AUTH_TOKEN", "secret")
+    test_client = webhook.app.test_client()
+    test_client.llm = llm
+    test_client.site = http_site
+    return test_client
+
+
+def _run(client, questions, path="/policy.pdf?sv=2023&sig=abc"):
+    return client.post(
+        "/hackrx/run",
+        json={"documents": client.site.base + path, "questions": questions},
+        headers={"Authorization": "Bearer secret"},
+    )
+
+
+def test_questions_answered_concurrently_in_order(client, monkeypatch):
+    monkeypatch.setattr(webhook, "LLM_MAX_CONCURRENCY", 4)
+    questions = ["grace period for premium", "cataract surgery limit", "pre-existing diseases"] * 2
+    _run(client, ["warm up"])  # build the document index
+    model = get_model(webhook.MODEL_NAME)
+    calls = model.calls
+
+    started = time.monotonic()
+    resp = _run(client, questions)
+    elapsed = time.monotonic() - started
+
+    assert resp.status_code == 200
+    assert resp.get_json()["answers"] == [_CLAUSES[0].text, _CLAUSES[2].text, _CLAUSES[1].text] * 2
+    assert model.calls == calls + 1  # one batched retrieval
+    assert 1 < client.llm.peak <= 4
+    assert elapsed < len(questions) * client.llm.delay
+
+
+def test_failed_question_does_not_affect_others(client):
+    resp = _run(client, ["grace period", "boom", "cataract surgery"])
+
+    answers = resp.get_json()["answers"]
+    assert answers[1] == webhook.FALLBACK_ANSWER
+    assert answers[0].startswith("A grace period") and answers[2].startswith("Cataract")
+
+
+def test_document_index_is_cached_by_url_and_content(client, monkeypatch):
+    model = get_model(webhook.MODEL_NAME)
+
+    first = _run(client, ["grace period"]).get_json()["answers"]
+    encoded = model.encoded
+    again = _run(client, ["grace period"]).get_json()["answers"]
+
+    assert first == again == [_CLAUSES[0].text]
+    assert model.progress_bars == 0  # indexing a request's document prints nothing
+    assert len(client.site.requests) == 1  # URL fetched within the TTL: no request at all
+    assert model.encoded == encoded  # ...and no embedding (query is cached)
+
+    # Another URL serving the same bytes is downloaded, but not parsed or embedded again
+    client.site.serve("/mirror/policy.pdf", client.site.docs["/policy.pdf"][0])
+    _run(client, ["grace period"], path="/mirror/policy.pdf")
+    assert len(client.site.requests) == 2
+    assert model.encoded == encoded
+    stats = webhook.doc_indexes.stats()
+    assert (stats["hits"], stats["content_hits"], stats["misses"]) == (1, 1, 1)
+
+    # Once the URL's TTL has passed it is revalidated: 304, index reused
+    monkeypatch.setattr(webhook.doc_indexes, "ttl", 0)
+    _run(client, ["grace period"])
+    assert client.site.requests[-1][1]["If-None-Match"] == '"p1"'
+    assert webhook.doc_indexes.stats()["content_hits"] == 2 and len(webhook.doc_indexes) == 1
+
+
+def test_several_documents_are_fetched_together(client):
+    client.site.serve("/addendum.eml", b"Subject: addendum\n\nDental treatment is excluded.\n")
+
+    resp = client.post(
+        "/hackrx/run",
+        json={
+            "documents": [client.site.base + "/policy.pdf", client.site.base + "/addendum.eml"],
+            "questions": ["cataract surgery", "dental treatment"],
+        },
+        headers={"Authorization": "Bearer secret"},
+    )
+
+    assert resp.get_json()["answers"] == [_CLAUSES[2].text, "Dental treatment is excluded."]
+    assert {path for path, _, _ in client.site.requests} == {"/policy.pdf", "/addendum.eml"}
+
+
+def test_download_errors_and_unindexable_documents(client, monkeypatch):
+    assert _run(client, ["anything"], path="/missing.pdf").status_code == 400
+
+    parsed = []
+    monkeypatch.setattr(webhook, "ingest_file", lambda path, **kwargs: parsed.append(path) or [])
+    client.site.serve("/broken.pdf", b"not a pdf")
+    resp = _run(client, ["anything"], path="/broken.pdf")
+
+    assert resp.status_code == 422
+    assert "Could not index document" in resp.get_json()["error"]
+    assert client.llm.calls == 0
+
+    # The same bytes under another URL are rejected without parsing them again
+    client.site.serve("/copy.pdf", b"not a pdf")
+    assert _run(client, ["anything"], path="/copy.pdf").status_code == 422
+    assert len(parsed) == 1
+    assert client.get("/metrics").get_json()["document_indexes"]["failure_hits"] == 1
+
+
+def test_repeated_and_rephrased_questions_skip_the_llm(client):
+    resp = _run(client, ["What is the grace period for premium payment?"])
+    first = resp.get_json()["answers"]
+    assert client.llm.calls == 1
+    assert int(resp.headers["X-Context-Tokens"]) > 0
+
+    again = _run(client, ["what is the  GRACE period for premium payment?", "Grace period for premium payment?"])
+
+    assert again.get_json()["answers"] == first * 2
+    assert client.llm.calls == 1
+    assert again.headers["X-Context-Tokens"] == "0"
+    stats = client.get("/metrics").get_json()["answer_cache"]
+    assert (stats["exact_hits"], stats["semantic_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_duplicate_questions_in_one_request_share_an_llm_call(client):
+    questions = ["Cataract surgery limit?", "cataract  surgery LIMIT?", "pre-existing diseases", "Cataract surgery limit?"]
+    resp = _run(client, questions)
+
+    assert resp.get_json()["answers"] == [_CLAUSES[2].text, _CLAUSES[2].text, _CLAUSES[1].text, _CLAUSES[2].text]
+    assert client.llm.calls == 2
+
+
+def _unloaded(client, monkeypatch, gate=None):
+    """Reset the webhook to "not initialized"; loading waits for *gate* if given."""
+    monkeypatch.setattr(webhook, "_ready", threading.Event())
+    monkeypatch.setattr(webhook, "_init_error", None)
+    monkeypatch.setattr(webhook, "_init_thread", None)
+    builds = []
+    monkeypatch.setattr(webhook, "warmup", lambda name: gate.wait(5) if gate else None)
+    monkeypatch.setattr(webhook, "ChatGroq", lambda **kwargs: builds.append(kwargs) or RunnableLambda(client.llm))
+    monkeypatch.setenv("GROQ_API_KEY", "key")
+    return builds
+
+
+def test_components_built_once_at_startup(client, fake_model, monkeypatch):
+    gate = threading.Event()
+    builds = _unloaded(client, monkeypatch, gate)
+    assert client.get("/health").status_code == 503
+    resp = _run(client, ["grace period"])
+    assert resp.status_code == 503 and resp.headers["Retry-After"]
+
+    gate.set()
+    webhook.start_background_init().join(5)
+    webhook.initialize_components()  # already done: no-op
+    assert len(builds) == 1  # the LLM; no prebuilt index is loaded
+    assert client.get("/health").get_json()["status"] == "healthy"
+
+    # Requests reuse the chain built at startup
+    def no_rebuild():
+        raise AssertionError("chain rebuilt per request")
+
+    monkeypatch.setattr(webhook, "get_answer_chain", no_rebuild)
+    monkeypatch.setattr(webhook, "ChatGroq", no_rebuild)
+    resp = _run(client, ["grace period for premium", "cataract surgery limit"])
+    assert resp.get_json()["answers"] == [_CLAUSES[0].text, _CLAUSES[2].text]
+
+
+def test_imported_app_initializes_on_first_request(client, monkeypatch):
+    # As under a WSGI server or `flask run`: nothing calls start_background_init()
+    gate = threading.Event()
+    builds = _unloaded(client, monkeypatch, gate)
+    assert _run(client, ["grace period"]).status_code == 503
+
+    gate.set()
+    deadline = time.monotonic() + 5
+    while client.get("/health").status_code != 200:
+        assert time.monotonic() < deadline, "never became ready"
+        time.sleep(0.05)
+
+    assert len(builds) == 1
+    assert _run(client, ["cataract surgery limit"]).get_json()["answers"] == [_CLAUSES[2].text]
+
+
+def test_health_reports_failed_initialization(client, monkeypatch):
+    monkeypatch.setattr(webhook, "_ready", threading.Event())
+    monkeypatch.setattr(webhook, "_init_error", None)
+    monkeypatch.setattr(webhook, "warmup", lambda name: None)
+    monkeypatch.delenv("GROQ_API_KEY", raising=False)
+    with pytest.raises(ValueError):
+        webhook.initialize_components()
+    resp = client.get("/health")
+    assert resp.status_code == 503
+    assert resp.get_json() == {"status": "error", "error": "GROQ_API_KEY environment variable not set"}